@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+
+"""Device code login as a background job.
+
+A device code login lasts as long as a human takes to type the code, often
+minutes. Running it inside a request would hold that request thread, and
+every search arriving meanwhile would start or wait on its own login. Here
+the login runs on a background thread as a job with an id. Routes answer
+202 with the job's status URL straight away, and data routes wait briefly on
+the job's one shared future instead of blocking a thread each.
+
+Only one job runs at a time per process. Across gunicorn workers the file lock
+in shared_auth still allows only one device code, and the active job is
+mirrored to the state directory so its status URL works from any worker.
+"""
+
+import concurrent.futures
+import logging
+import os
+import threading
+import time
+import uuid
+
+from shared_auth import create_credential, ensure_state_dir, read_json, write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+LOGIN_JOB_FILE = 'login_job.json'
+# Finished jobs kept for status lookups
+MAX_FINISHED_JOBS = 10
+
+class LoginPendingError(Exception):
+    """A Graph call needs a sign-in that is still in progress in job"""
+
+    def __init__(self, job):
+        super().__init__(f"Sign-in in progress (login job {job.id})")
+        self.job = job
+
+class LoginJob:
+    PENDING = 'pending'
+    WAITING_FOR_USER = 'waiting_for_user'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+
+    def __init__(self, device_code_state):
+        self.id = uuid.uuid4().hex
+        self.device_code_state = device_code_state
+        self.started = time.time()
+        self.finished = None
+        self.error = None
+        self.future = concurrent.futures.Future()
+
+    @property
+    def status(self):
+        if self.future.done():
+            return self.FAILED if self.error else self.SUCCEEDED
+        user_code, _ = self.device_code_state.current()
+        return self.WAITING_FOR_USER if user_code else self.PENDING
+
+    @property
+    def succeeded(self):
+        return self.future.done() and self.error is None
+
+    def wait(self, timeout):
+        """Wait up to timeout seconds for the login to finish; True when it has"""
+        try:
+            self.future.exception(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            return False
+        return True
+
+    def to_dict(self):
+        user_code, verification_uri = self.device_code_state.current()
+        waiting = not self.future.done() and user_code is not None
+        return {
+            "jobId": self.id,
+            "status": self.status,
+            "statusUrl": f"/api/auth/jobs/{self.id}",
+            "started": self.started,
+            "finished": self.finished,
+            "error": self.error,
+            "deviceCode": user_code if waiting else None,
+            "deviceCodeUrl": (verification_uri or "https://microsoft.com/devicelogin") if waiting else None
+        }
+
+class LoginManager:
+    """Starts device code logins on a background thread, one at a time"""
+
+    def __init__(self, settings, device_code_state, state_dir=None, on_success=None):
+        self.device_code_state = device_code_state
+        self.scopes = settings['graphUserScopes'].split(' ')
+        self.on_success = on_success
+        self.path = os.path.join(ensure_state_dir(state_dir), LOGIN_JOB_FILE)
+        self._credential = create_credential(settings, device_code_state, state_dir)
+        self._lock = threading.Lock()
+        self._active = None
+        self._jobs = {}
+
+    def signed_in(self):
+        return self._credential.signed_in(*self.scopes)
+
+    def active(self):
+        with self._lock:
+            job = self._active
+        return job if job is not None and not job.future.done() else None
+
+    def start(self):
+        """Return the running login job, starting one if none is running"""
+        with self._lock:
+            if self._active is not None and not self._active.future.done():
+                return self._active
+            job = LoginJob(self.device_code_state)
+            self._active = job
+            self._jobs[job.id] = job
+            while len(self._jobs) > MAX_FINISHED_JOBS + 1:
+                del self._jobs[next(iter(self._jobs))]
+        self._save(job)
+        threading.Thread(target=self._run, args=(job,), name=f'login-{job.id[:8]}', daemon=True).start()
+        logger.info(f"Started login job {job.id}")
+        return job
+
+    def get(self, job_id):
+        """Status dict for job_id, including jobs started by another worker process; None if unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        data = read_json(self.path)
+        if data and data.get('jobId') == job_id:
+            if data['status'] in (LoginJob.PENDING, LoginJob.WAITING_FOR_USER):
+                # The device code itself is shared through SharedDeviceCodeState
+                user_code, verification_uri = self.device_code_state.current()
+                data['status'] = LoginJob.WAITING_FOR_USER if user_code else LoginJob.PENDING
+                data['deviceCode'] = user_code
+                data['deviceCodeUrl'] = (verification_uri or "https://microsoft.com/devicelogin") if user_code else None
+            return data
+        return None
+
+    def _save(self, job):
+        try:
+            write_json_atomic(self.path, job.to_dict())
+        except OSError as e:
+            logger.warning(f"Could not save login job {job.id}: {e}")
+
+    def _run(self, job):
+        try:
+            # Waits on the shared file lock if another process is already logging in
+            self._credential.get_token(*self.scopes)
+        except Exception as e:
+            logger.error(f"Login job {job.id} failed: {e}")
+            job.error = f"{type(e).__name__}: {e}"
+            job.finished = time.time()
+            job.future.set_exception(e)
+            self._save(job)
+            return
+
+        self.device_code_state.mark_authenticated()
+        job.finished = time.time()
+        job.future.set_result(True)
+        self._save(job)
+        logger.info(f"Login job {job.id} succeeded in {job.finished - job.started:.1f}s")
+        if self.on_success is not None:
+            self.on_success()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+"""Benchmark the Graph engines against each other on identical routes.
+
+Start the service once per engine, e.g.
+
+    python email_service.py --engine threaded
+    python email_service.py --engine asyncio --port 5003
+    python email_service.py --engine process --port 5004
+
+authenticate each one, then run
+
+    python benchmark_engines.py --ports 5002 5003 5004 --employee "Jane Doe"
+"""
+
+import argparse
+import concurrent.futures
+import statistics
+import time
+
+import requests
+
+def run_search(base_url, employee_name, count):
+    started = time.perf_counter()
+    response = requests.post(
+        f"{base_url}/api/emails/search",
+        json={"employeeName": employee_name, "count": count},
+        headers={"Content-Type": "application/json"},
+        timeout=120
+    )
+    return time.perf_counter() - started, response.status_code
+
+def benchmark(port, employee_name, requests_total, concurrency, count):
+    base_url = f"http://127.0.0.1:{port}"
+    engine_name = requests.get(f"{base_url}/api/health", timeout=5).json().get('engine', 'unknown')
+
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: run_search(base_url, employee_name, count), range(requests_total)))
+    wall_time = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, status in results if status == 200)
+    errors = sum(1 for _, status in results if status != 200)
+    return {
+        "engine": engine_name,
+        "port": port,
+        "wall": wall_time,
+        "throughput": requests_total / wall_time,
+        "p50": statistics.median(latencies) if latencies else None,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] if latencies else None,
+        "errors": errors,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Graph engines on /api/emails/search")
+    parser.add_argument('--ports', type=int, nargs='+', default=[5002])
+    parser.add_argument('--employee', default="test")
+    parser.add_argument('--requests', type=int, default=40)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--count', type=int, default=25)
+    args = parser.parse_args()
+
+    print("🏁 Graph engine benchmark")
+    print("=" * 70)
+    print(f"{'engine':<10} {'port':>6} {'req/s':>8} {'p50 (s)':>9} {'p95 (s)':>9} {'errors':>7}")
+    for port in args.ports:
+        try:
+            result = benchmark(port, args.employee, args.requests, args.concurrency, args.count)
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Could not benchmark port {port}: {e}")
+            continue
+        p50 = f"{result['p50']:.3f}" if result['p50'] is not None else "-"
+        p95 = f"{result['p95']:.3f}" if result['p95'] is not None else "-"
+        print(f"{result['engine']:<10} {port:>6} {result['throughput']:>8.2f} {p50:>9} {p95:>9} {result['errors']:>7}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+
+"""Benchmark workbook ingestion on synthetic trackers of increasing size.
+
+Generates (once, then reuses) trackers with synthetic_workbook.py and times
+each ingestion stage in a fresh interpreter per size, so peak memory is that
+size's alone:
+
+* parse  - openpyxl read-only streaming of the "in progress" sheet
+* range  - detect_range: trailing blanks, blank rows, padding to one width
+* index  - Workbook(): employee dedupe plus the name and ticket indexes
+* suggest - the autocomplete index, built on first use
+
+    python benchmark_ingestion.py --sizes 1000 100000 1000000 --trace
+
+Peak RSS is the process high-water mark after each stage. --trace adds
+tracemalloc's peak of Python allocations per stage, at a large cost in speed.
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from synthetic_workbook import write_workbook
+from workbook_store import Workbook, detect_range, open_in_progress_sheet, sheet_values
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def measure(path, trace=False):
+    """Time each stage on path; runs in the child interpreter"""
+    import openpyxl  # keep the import itself out of the parse timing
+
+    results = {}
+
+    def stage(name, run):
+        if trace:
+            tracemalloc.start()
+        started = time.perf_counter()
+        value = run()
+        results[name] = {"seconds": time.perf_counter() - started, "peakRssMB": peak_rss_mb()}
+        if trace:
+            results[name]["tracedPeakMB"] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            tracemalloc.stop()
+        return value
+
+    def parse():
+        workbook, sheet_name = open_in_progress_sheet(path)
+        try:
+            return sheet_name, list(sheet_values(workbook[sheet_name]))
+        finally:
+            workbook.close()
+
+    sheet_name, values = stage('parse', parse)
+    rows = stage('range', lambda: detect_range(values))
+    del values
+    workbook = stage('index', lambda: Workbook('benchmark', os.path.basename(path), sheet_name,
+                                               rows[0], rows[1], rows[2:]))
+    stage('suggest', lambda: workbook.suggester)
+    results['rows'] = len(workbook.rows)
+    results['employees'] = len(workbook.employees)
+    results['tickets'] = len(workbook.ticket_index)
+    return results
+
+def workbook_path(workdir, rows, args):
+    name = f"tracker_{rows}_c{args.columns}_n{args.duplicate_names}_t{args.duplicate_tickets}_s{args.seed}.xlsx"
+    path = os.path.abspath(os.path.join(workdir, name))
+    if not os.path.exists(path):
+        started = time.perf_counter()
+        write_workbook(path, rows, args.columns, args.duplicate_names, args.duplicate_tickets, seed=args.seed)
+        print(f"📄 Generated {name} in {time.perf_counter() - started:.1f}s")
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark workbook ingestion stages")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000, 1000000])
+    parser.add_argument('--columns', type=int, default=12)
+    parser.add_argument('--duplicate-names', type=float, default=0.3)
+    parser.add_argument('--duplicate-tickets', type=float, default=0.02)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--workdir', default='benchmark_workbooks', help="Where generated workbooks are kept")
+    parser.add_argument('--trace', action='store_true', help="Also report tracemalloc peaks (slow)")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.trace)))
+        return
+
+    os.makedirs(args.workdir, exist_ok=True)
+    stages = ('parse', 'range', 'index', 'suggest')
+    print("🏁 Ingestion benchmark (fresh interpreter per size)")
+    print("=" * 100)
+    print(f"{'rows':>9} {'employees':>10} {'stage':<8} {'seconds':>9} {'rows/s':>11} {'peak RSS MB':>12}"
+          + (f" {'traced MB':>10}" if args.trace else ""))
+    for size in args.sizes:
+        path = workbook_path(args.workdir, size, args)
+        command = [sys.executable, os.path.abspath(__file__), '--child', path] + (['--trace'] if args.trace else [])
+        output = subprocess.run(command, capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        results = json.loads(output.stdout.strip().splitlines()[-1])
+        for name in stages:
+            result = results[name]
+            rate = results['rows'] / result['seconds'] if result['seconds'] else float('inf')
+            line = (f"{results['rows']:>9} {results['employees']:>10} {name:<8} {result['seconds']:>9.3f} "
+                    f"{rate:>11.0f} {result['peakRssMB']:>12.1f}")
+            if args.trace:
+                line += f" {result['tracedPeakMB']:>10.1f}"
+            print(line)
+        print("-" * 100)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+"""Measure how long the email service takes to start.
+
+Every measurement runs in a fresh interpreter so nothing is already imported:
+
+* importing email_service (what stands between launch and /api/health)
+* importing each module the warm-up thread loads later (the Graph SDK etc.)
+* launching email_service.py until /api/health answers, and until it
+  reports readiness "ready"
+
+    python benchmark_startup.py --runs 5 --port 5012
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+
+from email_service import WARM_UP_IMPORTS
+
+def import_seconds(module_name):
+    code = f"import time; started = time.perf_counter(); import {module_name}; print(time.perf_counter() - started)"
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    return float(output.stdout.strip().splitlines()[-1])
+
+def service_startup(port, timeout=60):
+    """Seconds from launch until /api/health answers and until readiness is 'ready'"""
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, 'email_service.py', '--port', str(port)],
+                               cwd=os.path.dirname(os.path.abspath(__file__)),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    healthy = ready = None
+    try:
+        while time.perf_counter() - started < timeout and ready is None:
+            try:
+                health = requests.get(f"http://127.0.0.1:{port}/api/health", timeout=1).json()
+                if healthy is None:
+                    healthy = time.perf_counter() - started
+                if health.get('ready'):
+                    ready = time.perf_counter() - started
+            except requests.exceptions.RequestException:
+                pass
+            time.sleep(0.02)
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+    return healthy, ready
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark email service startup")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--port', type=int, default=5012, help="Free port for the launched service")
+    parser.add_argument('--skip-service', action='store_true', help="Only measure imports")
+    args = parser.parse_args()
+
+    print("🏁 Startup benchmark (median of fresh interpreters)")
+    print("=" * 90)
+    print(f"{'import':<82} {'ms':>7}")
+    for module_name in ('email_service',) + WARM_UP_IMPORTS:
+        seconds = statistics.median(import_seconds(module_name) for _ in range(args.runs))
+        print(f"{module_name:<82} {seconds * 1000:>7.0f}")
+
+    if args.skip_service:
+        return
+    print("-" * 90)
+    results = [service_startup(args.port) for _ in range(args.runs)]
+    healthy = [h for h, _ in results if h is not None]
+    ready = [r for _, r in results if r is not None]
+    print(f"{'launch -> /api/health answers':<82} "
+          f"{statistics.median(healthy) * 1000 if healthy else float('nan'):>7.0f}")
+    print(f"{'launch -> readiness ready':<82} "
+          f"{statistics.median(ready) * 1000 if ready else float('nan'):>7.0f}")
+
+if __name__ == '__main__':
+    main()
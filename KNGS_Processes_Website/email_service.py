@@ -3,83 +3,62 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
-import asyncio
+import argparse
+import concurrent.futures
 import configparser
-import json
-from flask import Flask, jsonify, request
-from flask_cors import CORS
-from configparser import SectionProxy
-from azure.identity import DeviceCodeCredential
-from msgraph import GraphServiceClient
-from msgraph.generated.users.item.user_item_request_builder import UserItemRequestBuilder
-from msgraph.generated.users.item.mail_folders.item.messages.messages_request_builder import (
-    MessagesRequestBuilder)
-from msgraph.generated.models.o_data_errors.o_data_error import ODataError
+import datetime
+import importlib
+import logging
+import os
+import signal
 import threading
-from functools import wraps
-import concurrent.futures
+import time
+import traceback
+from flask import Flask, Response, jsonify, request
+from flask_cors import CORS
+from werkzeug.serving import make_server
 
-class Graph:
-    settings: SectionProxy
-    device_code_credential: DeviceCodeCredential
-    user_client: GraphServiceClient
-
-    def __init__(self, config: SectionProxy):
-        self.settings = config
-        client_id = self.settings['clientId']
-        tenant_id = self.settings['tenantId']
-        graph_scopes = self.settings['graphUserScopes'].split(' ')
-
-        self.device_code_credential = DeviceCodeCredential(client_id, tenant_id = tenant_id)
-        self.user_client = GraphServiceClient(self.device_code_credential, graph_scopes)
-
-    async def get_user_token(self):
-        graph_scopes = self.settings['graphUserScopes']
-        access_token = self.device_code_credential.get_token(graph_scopes)
-        return access_token.token
-
-    async def get_user(self):
-        query_params = UserItemRequestBuilder.UserItemRequestBuilderGetQueryParameters(
-            select=['displayName', 'mail', 'userPrincipalName']
-        )
-
-        request_config = UserItemRequestBuilder.UserItemRequestBuilderGetRequestConfiguration(
-            query_parameters=query_params
-        )
-
-        user = await self.user_client.me.get(request_configuration=request_config)
-        return user
-
-    async def get_inbox(self, count=25):
-        query_params = MessagesRequestBuilder.MessagesRequestBuilderGetQueryParameters(
-            select=['from', 'isRead', 'receivedDateTime', 'subject', 'body', 'hasAttachments'],
-            top=count,
-            orderby=['receivedDateTime DESC']
-        )
-        request_config = MessagesRequestBuilder.MessagesRequestBuilderGetRequestConfiguration(
-            query_parameters= query_params
-        )
-
-        messages = await self.user_client.me.mail_folders.by_mail_folder_id('inbox').messages.get(
-                request_configuration=request_config)
-        return messages
-
-    async def search_emails_by_employee(self, employee_name, count=50):
-        """Search for emails that have the employee's name in the subject line"""
-        query_params = MessagesRequestBuilder.MessagesRequestBuilderGetQueryParameters(
-            select=['from', 'isRead', 'receivedDateTime', 'subject', 'body', 'hasAttachments', 'toRecipients', 'ccRecipients'],
-            top=count,
-            orderby=['receivedDateTime DESC'],
-            # Search specifically in subject line for employee name
-            search=f'subject:"{employee_name}"'
-        )
-        request_config = MessagesRequestBuilder.MessagesRequestBuilderGetRequestConfiguration(
-            query_parameters= query_params
-        )
-
-        messages = await self.user_client.me.mail_folders.by_mail_folder_id('inbox').messages.get(
-                request_configuration=request_config)
-        return messages
+from auth_jobs import LoginManager, LoginPendingError
+from graph import BODY_TYPES, ME
+from graph_engines import ENGINES, EngineOverloaded, create_engine
+from graph_transport import TransportSettings
+from mail_store import create_mail_store, sync_mailbox
+from mailbox_search import DEFAULT_CONCURRENCY, MailboxSearch, mailbox_targets
+from memory_debug import GROUPINGS, MemoryDebugger, object_counts
+from name_matcher import NameAttribution
+from prewarm import PrewarmScheduler, prewarm_order
+from sampling_profiler import DEFAULT_INTERVAL, MAX_SECONDS, SamplingProfiler
+from progress_report import csv_stream, gather_progress, xlsx_stream
+from result_cache import (create_body_cache, create_result_cache, inbox_cache_key, search_cache_key,
+                          search_cache_prefix)
+from shared_auth import DEFAULT_STATE_DIR, LoginRequiredError, SharedDeviceCodeState
+from ticket_correlation import CorrelationCache
+from warm_start import Snapshotter
+from workbook_cache import create_workbook_cache
+from workbook_diff import SUMMARY_LIMIT, diff_workbooks
+from workbook_rows import ASCENDING, DEFAULT_PAGE_SIZE, DESCENDING, MAX_PAGE_SIZE
+from workbook_store import WorkbookError, WorkbookStore
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 5002
+DEFAULT_ENGINE = 'threaded'
+# Printed on stdout once the port is accepting connections; run_app.py waits for this line
+READY_MARKER = 'EMAIL_SERVICE_READY'
+# Requests a user is waiting on; background pre-warming pauses when these arrive
+INTERACTIVE_PREFIXES = ('/api/emails/', '/api/auth/user', '/api/employees/', '/api/tickets/')
+# Slow imports kept off the startup path; the warm-up thread loads them before the first request needs them
+WARM_UP_IMPORTS = (
+    'azure.identity',
+    'msgraph',
+    'msgraph.generated.users.item.user_item_request_builder',
+    'msgraph.generated.users.item.mail_folders.item.messages.messages_request_builder',
+    'msgraph.generated.users.item.messages.item.message_item_request_builder',
+    'msgraph.generated.models.o_data_errors.o_data_error',
+    'openpyxl',
+)
 
 # Flask app setup
 app = Flask(__name__)
@@ -93,235 +72,931 @@ CORS(app, resources={
     }
 })
 
-# Global graph client and thread pool
-graph_client = None
-executor = concurrent.futures.ThreadPoolExecutor(max_workers=4)
-
-def init_graph():
-    global graph_client
-    config = configparser.ConfigParser()
-    config.read(['config.cfg', 'config.dev.cfg'])
-    
-    if 'azure' not in config:
-        # Create default config if it doesn't exist
-        config['azure'] = {
-            'clientId': 'b9be55dd-85d1-41ab-ab92-e1bb2cafd19c',
-            'tenantId': 'common',
-            'graphUserScopes': 'User.Read Mail.Read Mail.Send'
-        }
-        with open('config.cfg', 'w') as configfile:
-            config.write(configfile)
-    
-    azure_settings = config['azure']
-    graph_client = Graph(azure_settings)
-
-def run_async_in_thread(coro):
-    """Run an async coroutine in a separate thread with its own event loop"""
-    def run_in_thread():
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            return loop.run_until_complete(coro)
-        finally:
-            loop.close()
-    
-    future = executor.submit(run_in_thread)
-    return future.result(timeout=30)  # 30 second timeout
-
-def async_route(f):
-    """Decorator to handle async functions in Flask"""
-    @wraps(f)
-    def wrapper(*args, **kwargs):
+# Global state
+config = None
+engine = None
+device_code_state = None
+login_manager = None
+result_cache = None
+body_cache = None
+mailbox_search = None
+workbook_store = WorkbookStore()
+mail_store = None
+correlations = None
+attributions = None
+prewarm = None
+snapshotter = None
+memory_debugger = MemoryDebugger()
+profiler = SamplingProfiler()
+# starting -> warming (SDK imports and Graph connections on a background thread) -> ready
+readiness = {"state": "starting", "since": time.time(), "timings": {}}
+
+def init_config():
+    global config
+    try:
+        logger.info("Loading configuration...")
+        config = configparser.ConfigParser()
+        config.read(['config.cfg', 'config.dev.cfg'])
+
+        if 'azure' not in config:
+            logger.warning("No azure config found, creating default...")
+            config['azure'] = {
+                'clientId': 'b9be55dd-85d1-41ab-ab92-e1bb2cafd19c',
+                'tenantId': 'common',
+                'graphUserScopes': 'User.Read Mail.Read Mail.Send'
+            }
+            with open('config.cfg', 'w') as configfile:
+                config.write(configfile)
+
+        app.config['MAX_CONTENT_LENGTH'] = config.getint('service', 'maxUploadBytes', fallback=100 * 1024 * 1024)
+        logger.info("Configuration loaded successfully")
+    except Exception as e:
+        logger.error(f"Failed to load configuration: {e}")
+        raise
+
+def init_engine(engine_name=None, max_workers=None):
+    """Start the Graph engine. Falls back to EMAIL_SERVICE_ENGINE, then [service] engine in config.cfg."""
+    global engine, device_code_state
+    engine_name = (engine_name
+                   or os.environ.get('EMAIL_SERVICE_ENGINE')
+                   or config.get('service', 'engine', fallback=DEFAULT_ENGINE))
+    max_workers = max_workers or config.getint('service', 'maxWorkers', fallback=4)
+    state_dir = config.get('service', 'stateDir', fallback=DEFAULT_STATE_DIR)
+    device_code_state = SharedDeviceCodeState(state_dir)
+    transport = TransportSettings.from_config(config)
+    # Logins run as background jobs (init_auth), never on an engine worker
+    engine = create_engine(engine_name, config['azure'], max_workers=max_workers,
+                           device_code_state=device_code_state, state_dir=state_dir, interactive_login=False,
+                           max_queued=config.getint('service', 'maxQueued', fallback=max_workers * 4),
+                           max_queue_wait=config.getfloat('service', 'maxQueueWaitSeconds', fallback=10),
+                           transport=transport)
+    return engine
+
+def init_auth():
+    global login_manager
+    state_dir = config.get('service', 'stateDir', fallback=DEFAULT_STATE_DIR)
+
+    def on_login():
+        if prewarm is not None:
+            prewarm.wake()
+
+    login_manager = LoginManager(config['azure'], device_code_state, state_dir, on_success=on_login)
+    return login_manager
+
+def init_cache():
+    global result_cache, body_cache
+    state_dir = config.get('service', 'stateDir', fallback=DEFAULT_STATE_DIR)
+    result_cache = create_result_cache(config, state_dir)
+    body_cache = create_body_cache(config)
+    return result_cache
+
+def init_mailboxes():
+    global mailbox_search
+
+    def search(employee_name, count, mailbox, refresh):
+        return result_cache.get_or_compute(
+            search_cache_key(employee_name, count, mailbox),
+            lambda: engine.call('search_emails', timeout=180, employee_name=employee_name, count=count,
+                                **({} if mailbox == ME else {"mailbox": mailbox})),
+            refresh=refresh)
+
+    mailbox_search = MailboxSearch(search, mailbox_targets(config),
+                                   config.getint('mailboxes', 'concurrency', fallback=DEFAULT_CONCURRENCY))
+    logger.info(f"Searching mailboxes: {', '.join(mailbox_search.targets)}")
+    return mailbox_search
+
+def init_workbooks():
+    global workbook_store
+    state_dir = config.get('service', 'stateDir', fallback=DEFAULT_STATE_DIR)
+    workbook_store = WorkbookStore(config.getint('workbooks', 'maxStored', fallback=5),
+                                   cache=create_workbook_cache(config, state_dir))
+    return workbook_store
+
+def init_mail():
+    global mail_store, correlations, attributions
+    state_dir = config.get('service', 'stateDir', fallback=DEFAULT_STATE_DIR)
+    mail_store = create_mail_store(config, state_dir)
+    correlations = CorrelationCache(mail_store)
+    attributions = CorrelationCache(mail_store, NameAttribution)
+    return mail_store
+
+def init_snapshot():
+    """Restore the last warm-start snapshot, then keep writing new ones"""
+    global snapshotter
+    if not config.getboolean('snapshot', 'enabled', fallback=True):
+        return None
+    state_dir = config.get('service', 'stateDir', fallback=DEFAULT_STATE_DIR)
+    snapshotter = Snapshotter(config.get('snapshot', 'path', fallback=os.path.join(state_dir, 'snapshot')),
+                              workbook_store, result_cache, body_cache, correlations, attributions,
+                              interval=config.getfloat('snapshot', 'intervalSeconds', fallback=300))
+    if workbook_store.cache is not None:
+        snapshotter.restore()
+    snapshotter.start()
+    return snapshotter
+
+def init_prewarm():
+    global prewarm
+    if not config.getboolean('prewarm', 'enabled', fallback=True):
+        return None
+    count = config.getint('prewarm', 'count', fallback=25)
+
+    def warm(employee_name):
+        # One Graph request per mailbox that missed the cache, failed ones included
+        result, _ = mailbox_search.run(employee_name, count)
+        return sum(1 for report in result['mailboxes'] if report.get('cache', 'miss') == 'miss')
+
+    prewarm = PrewarmScheduler(warm, device_code_state.recently_authenticated,
+                               budget=config.getint('prewarm', 'budget', fallback=200),
+                               window=config.getint('prewarm', 'budgetWindowSeconds', fallback=3600),
+                               idle_seconds=config.getfloat('prewarm', 'idleSeconds', fallback=5),
+                               failure_cost=len(mailbox_search.targets))
+    prewarm.start()
+    return prewarm
+
+def import_heavy_modules():
+    """Import WARM_UP_IMPORTS; returns seconds per module (0 for ones already loaded)"""
+    timings = {}
+    for name in WARM_UP_IMPORTS:
+        started = time.perf_counter()
+        importlib.import_module(name)
+        timings[name] = time.perf_counter() - started
+    return timings
+
+def set_readiness(state):
+    readiness['state'] = state
+    readiness['since'] = time.time()
+    logger.info(f"Service readiness: {state}")
+
+def warm_up():
+    """Do the slow part of startup in the background so /api/health answers straight away"""
+    started = time.perf_counter()
+    try:
+        readiness['timings']['imports'] = import_heavy_modules()
+        if config.getboolean('transport', 'prewarm', fallback=True):
+            # TLS handshakes happen now instead of on the first user's search
+            connect_started = time.perf_counter()
+            engine.warm_up()
+            readiness['timings']['connectionsSeconds'] = time.perf_counter() - connect_started
+    except Exception as e:
+        # Not fatal: whatever failed here is retried on first use
+        logger.warning(f"Warm-up incomplete: {e}")
+        readiness['error'] = str(e)
+    readiness['timings']['warmUpSeconds'] = time.perf_counter() - started
+    set_readiness('ready')
+
+def init_service(engine_name=None, max_workers=None):
+    """Start everything a worker needs. Called once per process, after fork under gunicorn."""
+    started = time.perf_counter()
+    init_engine(engine_name, max_workers)
+    init_auth()
+    init_cache()
+    init_mailboxes()
+    init_workbooks()
+    init_mail()
+    init_snapshot()
+    init_prewarm()
+    readiness['timings']['initSeconds'] = time.perf_counter() - started
+    set_readiness('warming')
+    threading.Thread(target=warm_up, name='service-warm-up', daemon=True).start()
+
+def shutdown_engine():
+    global engine, prewarm, snapshotter, mailbox_search
+    if snapshotter is not None:
         try:
-            coro = f(*args, **kwargs)
-            return run_async_in_thread(coro)
-        except concurrent.futures.TimeoutError:
-            response = jsonify({"error": "Request timeout", "details": "The operation took too long to complete"})
-            response.status_code = 504
-            response.headers.add('Access-Control-Allow-Origin', '*')
-            return response
+            snapshotter.stop()
         except Exception as e:
-            response = jsonify({"error": "Internal server error", "details": str(e)})
-            response.status_code = 500
-            response.headers.add('Access-Control-Allow-Origin', '*')
-            return response
-    return wrapper
+            logger.warning(f"Could not write snapshot on shutdown: {e}")
+        snapshotter = None
+    if prewarm is not None:
+        prewarm.stop()
+        prewarm = None
+    if mailbox_search is not None:
+        mailbox_search.shutdown()
+        mailbox_search = None
+    if engine is not None:
+        engine.shutdown()
+        engine = None
+
+@app.before_request
+def note_interactive_request():
+    if prewarm is not None and request.path.startswith(INTERACTIVE_PREFIXES):
+        prewarm.note_interactive()
+
+def preflight_response():
+    response = jsonify({})
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
+    response.headers.add('Access-Control-Allow-Methods', 'GET,POST,OPTIONS')
+    return response
+
+def json_response(payload, status_code=200):
+    response = jsonify(payload)
+    response.status_code = status_code
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    return response
+
+def with_login(run):
+    """Call run(); if it needs a sign-in, join the shared login job and retry once it finishes.
+
+    Waits at most [auth] waitSeconds on the job, then raises LoginPendingError
+    so the route can answer 202 with the job's status URL.
+    """
+    try:
+        return run()
+    except LoginRequiredError:
+        job = login_manager.start()
+        if not job.wait(config.getfloat('auth', 'waitSeconds', fallback=5)):
+            raise LoginPendingError(job)
+        if not job.succeeded:
+            raise LoginRequiredError(f"Sign-in failed: {job.error}")
+    return run()
+
+def login_job_response(job):
+    return json_response(dict(job.to_dict(), needsAuth=True), 202)
+
+def graph_error_response(error, message):
+    """Map an exception raised by the engine to the response the UI expects"""
+    if isinstance(error, LoginPendingError):
+        return login_job_response(error.job)
+    if isinstance(error, EngineOverloaded):
+        response = json_response({"error": message, "details": str(error), "type": "EngineOverloaded",
+                                  "retryAfter": error.retry_after}, 503)
+        response.headers['Retry-After'] = str(error.retry_after)
+        return response
+    if isinstance(error, LoginRequiredError):
+        return json_response({"error": message, "details": str(error), "type": "LoginRequiredError",
+                              "needsAuth": True}, 401)
+    if isinstance(error, concurrent.futures.TimeoutError):
+        return json_response({"error": "Request timeout",
+                              "details": "The operation took too long to complete"}, 504)
+    if type(error).__name__ == 'ODataError':  # not imported here: the SDK loads after startup
+        details = str(error)
+        if getattr(error, 'error', None):
+            details = f"Code: {error.error.code}, Message: {error.error.message}"
+        # A missing item (e.g. a deleted message) is not an authentication problem
+        status = 404 if getattr(error, 'response_status_code', None) == 404 else 401
+        return json_response({"error": message, "details": details, "type": "ODataError"}, status)
+    return json_response({"error": message, "details": str(error), "type": type(error).__name__}, 500)
 
 @app.route('/api/health', methods=['GET', 'OPTIONS'])
 def health_check():
     if request.method == 'OPTIONS':
-        # Handle preflight request
-        response = jsonify({})
-        response.headers.add('Access-Control-Allow-Origin', '*')
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
-        response.headers.add('Access-Control-Allow-Methods', 'GET,POST,OPTIONS')
-        return response
-    
-    response = jsonify({"status": "healthy", "service": "email_service"})
+        return preflight_response()
+
+    return json_response({"status": "healthy", "service": "email_service",
+                          "engine": engine.name if engine else None,
+                          "queueDepth": engine.stats()['queued'] if engine else None,
+                          "readiness": readiness['state'],
+                          "ready": readiness['state'] == 'ready',
+                          "startup": readiness})
+
+def debug_enabled():
+    """The /api/debug routes are off unless [debug] enabled = true or EMAIL_SERVICE_DEBUG=1"""
+    return (os.environ.get('EMAIL_SERVICE_DEBUG') == '1'
+            or (config is not None and config.getboolean('debug', 'enabled', fallback=False)))
+
+def debug_disabled_response():
+    return json_response({"error": "Debug endpoints are disabled",
+                          "details": "Set [debug] enabled = true in config.cfg or EMAIL_SERVICE_DEBUG=1"}, 404)
+
+@app.route('/api/debug/memory', methods=['GET', 'POST', 'OPTIONS'])
+def debug_memory():
+    """GET: tracing status, live object counts and, while tracing, the top allocation sites.
+    POST {"action": "start" | "stop" | "snapshot" | "diff", ...}: control tracemalloc."""
+    if request.method == 'OPTIONS':
+        return preflight_response()
+    if not debug_enabled():
+        return debug_disabled_response()
+
+    options = (request.get_json(silent=True) or {}) if request.method == 'POST' else request.args
+    group_by = options.get('groupBy', 'lineno')
+    if group_by not in GROUPINGS:
+        return json_response({"error": "Invalid groupBy", "details": f"groupBy must be one of {', '.join(GROUPINGS)}"}, 400)
+
+    try:
+        limit = int(options.get('limit', 20))
+        if request.method == 'GET':
+            result = memory_debugger.status()
+            if result['tracing']:
+                result['allocations'] = memory_debugger.top(group_by, limit)
+            return json_response(dict(result, pid=os.getpid(), live=object_counts()))
+
+        action = options.get('action')
+        if action == 'start':
+            return json_response(memory_debugger.start(int(options.get('frames', 1))))
+        if action == 'stop':
+            return json_response(memory_debugger.stop())
+        if action == 'snapshot':
+            return json_response(dict(memory_debugger.top(group_by, limit, keep=True), live=object_counts()))
+        if action == 'diff':
+            if 'from' not in options:
+                return json_response({"error": "Missing snapshot", "details": "diff needs a 'from' snapshot id"}, 400)
+            to_id = options.get('to')
+            return json_response(dict(memory_debugger.diff(int(options['from']), int(to_id) if to_id else None,
+                                                           group_by, limit), live=object_counts()))
+        return json_response({"error": "Invalid action",
+                              "details": "action must be start, stop, snapshot or diff"}, 400)
+    except KeyError as e:
+        return json_response({"error": "Snapshot not found", "details": str(e)}, 404)
+    except (RuntimeError, ValueError) as e:
+        return json_response({"error": "Memory debugging failed", "details": str(e)}, 400)
+
+@app.route('/api/debug/profile', methods=['GET', 'OPTIONS'])
+def debug_profile():
+    """Sample every thread's stack for ?seconds=N and return collapsed stacks for a flamegraph,
+    a JSON summary (format=json) or a pstats file (format=pstats)"""
+    if request.method == 'OPTIONS':
+        return preflight_response()
+    if not debug_enabled():
+        return debug_disabled_response()
+
+    report_format = request.args.get('format', 'collapsed')
+    if report_format not in ('collapsed', 'json', 'pstats'):
+        return json_response({"error": "Invalid format", "details": "format must be collapsed, json or pstats"}, 400)
+    try:
+        seconds = float(request.args.get('seconds', 10))
+        interval = float(request.args.get('intervalMs', DEFAULT_INTERVAL * 1000)) / 1000
+    except ValueError as e:
+        return json_response({"error": "Invalid profile options", "details": str(e)}, 400)
+    if not 0 < seconds <= MAX_SECONDS or not 0.001 <= interval <= 1:
+        return json_response({"error": "Invalid profile options",
+                              "details": f"seconds must be in (0, {MAX_SECONDS}] and intervalMs in [1, 1000]"}, 400)
+
+    logger.info(f"API: Profiling all threads for {seconds}s every {interval * 1000:g}ms")
+    try:
+        profile = profiler.run(seconds, interval, include_idle=request.args.get('idle') == 'true')
+    except RuntimeError as e:
+        return json_response({"error": "Profiler busy", "details": str(e)}, 409)
+
+    if report_format == 'json':
+        return json_response(dict(profile.summary(), pid=os.getpid(), collapsed=profile.collapsed()))
+    if report_format == 'pstats':
+        response = Response(profile.pstats_dump(), mimetype='application/octet-stream')
+        response.headers['Content-Disposition'] = f'attachment; filename="profile_{os.getpid()}.pstats"'
+    else:
+        response = Response(profile.collapsed(), mimetype='text/plain')
+    response.headers['X-Profile-Samples'] = str(profile.samples)
     response.headers.add('Access-Control-Allow-Origin', '*')
     return response
 
-@app.route('/api/auth/user', methods=['GET', 'OPTIONS'])
-@async_route
-async def get_current_user():
+@app.route('/api/engine/stats', methods=['GET', 'OPTIONS'])
+def engine_stats():
     if request.method == 'OPTIONS':
-        response = jsonify({})
-        response.headers.add('Access-Control-Allow-Origin', '*')
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
-        response.headers.add('Access-Control-Allow-Methods', 'GET,POST,OPTIONS')
-        return response
-    
+        return preflight_response()
+
+    return json_response(dict(engine.stats(), mailboxSearch=mailbox_search.stats() if mailbox_search else None))
+
+@app.route('/api/cache/stats', methods=['GET', 'OPTIONS'])
+def cache_stats():
+    if request.method == 'OPTIONS':
+        return preflight_response()
+
+    return json_response(dict(result_cache.stats(), messageBodies=body_cache.stats()))
+
+@app.route('/api/prewarm/status', methods=['GET', 'OPTIONS'])
+def prewarm_status():
+    if request.method == 'OPTIONS':
+        return preflight_response()
+
+    if prewarm is None:
+        return json_response({"enabled": False})
+    return json_response(dict(prewarm.stats(), enabled=True))
+
+@app.route('/api/snapshot/status', methods=['GET', 'OPTIONS'])
+def snapshot_status():
+    if request.method == 'OPTIONS':
+        return preflight_response()
+
+    if snapshotter is None:
+        return json_response({"enabled": False})
+    return json_response(dict(snapshotter.stats(), enabled=True))
+
+@app.route('/api/auth/status', methods=['GET', 'OPTIONS'])
+def get_auth_status():
+    if request.method == 'OPTIONS':
+        return preflight_response()
+
     try:
-        user = await graph_client.get_user()
-        response = jsonify({
-            "displayName": user.display_name,
-            "email": user.mail or user.user_principal_name,
-            "userPrincipalName": user.user_principal_name
-        })
-        response.headers.add('Access-Control-Allow-Origin', '*')
-        return response
-    except ODataError as e:
-        response = jsonify({
-            "error": "Authentication failed",
-            "details": str(e)
+        job = login_manager.active()
+        if job is not None:
+            # A device code login is in progress: answer from the job rather
+            # than checking the credential the login is about to replace
+            return json_response({
+                "authenticated": False,
+                "lastAuthTime": device_code_state.last_successful_auth,
+                "needsAuth": True,
+                "pending": True,
+                "loginJob": job.to_dict()
+            })
+
+        is_authenticated = device_code_state.recently_authenticated()
+        if not is_authenticated:
+            try:
+                is_authenticated = login_manager.signed_in()
+                if is_authenticated and prewarm is not None:
+                    prewarm.wake()
+            except Exception as e:
+                logger.info(f"Not authenticated yet: {e}")
+
+        logger.info(f"Auth status check: authenticated={is_authenticated}")
+        return json_response({
+            "authenticated": is_authenticated,
+            "lastAuthTime": device_code_state.last_successful_auth,
+            "needsAuth": not is_authenticated,
+            "pending": False,
+            "loginJob": None
         })
-        response.status_code = 401
-        response.headers.add('Access-Control-Allow-Origin', '*')
-        return response
     except Exception as e:
-        response = jsonify({
-            "error": "Failed to get user info",
-            "details": str(e)
-        })
-        response.status_code = 500
-        response.headers.add('Access-Control-Allow-Origin', '*')
-        return response
+        logger.error(f"API: Error checking auth status: {e}")
+        return json_response({
+            "authenticated": False,
+            "lastAuthTime": None,
+            "needsAuth": True,
+            "error": str(e)
+        }, 500)
+
+@app.route('/api/auth/device-code', methods=['GET', 'OPTIONS'])
+def get_device_code():
+    if request.method == 'OPTIONS':
+        return preflight_response()
+
+    user_code, verification_uri = device_code_state.current()
+    logger.info(f"Device code requested: {user_code is not None}")
+    return json_response({
+        "deviceCode": user_code,
+        "deviceCodeUrl": verification_uri or "https://microsoft.com/devicelogin",
+        "hasActiveCode": user_code is not None
+    })
+
+@app.route('/api/auth/user', methods=['GET', 'OPTIONS'])
+def get_current_user():
+    if request.method == 'OPTIONS':
+        return preflight_response()
+
+    try:
+        logger.info("API: Getting current user...")
+        result = engine.call('get_user')
+        logger.info("API: User info returned successfully")
+        if prewarm is not None:
+            prewarm.wake()
+        return json_response(result)
+    except LoginRequiredError:
+        # Answer now; the UI polls the job while the user enters the device code
+        job = login_manager.start()
+        logger.info(f"API: Sign-in required, login job {job.id} is {job.status}")
+        return login_job_response(job)
+    except Exception as e:
+        logger.error(f"API: Error getting user: {e}")
+        return graph_error_response(e, "Failed to get user info")
+
+@app.route('/api/auth/jobs/<job_id>', methods=['GET', 'OPTIONS'])
+def get_login_job(job_id):
+    if request.method == 'OPTIONS':
+        return preflight_response()
+
+    job = login_manager.get(job_id)
+    if job is None:
+        return json_response({"error": "Login job not found", "jobId": job_id}, 404)
+    return json_response(job)
 
 @app.route('/api/emails/recent', methods=['GET', 'OPTIONS'])
-@async_route
-async def get_recent_emails():
+def get_recent_emails():
     if request.method == 'OPTIONS':
-        response = jsonify({})
-        response.headers.add('Access-Control-Allow-Origin', '*')
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
-        response.headers.add('Access-Control-Allow-Methods', 'GET,POST,OPTIONS')
-        return response
-    
+        return preflight_response()
+
     try:
         count = request.args.get('count', 25, type=int)
         count = min(count, 100)  # Limit to 100 emails max
-        
-        message_page = await graph_client.get_inbox(count)
-        emails = []
-        
-        if message_page and message_page.value:
-            for message in message_page.value:
-                email_data = {
-                    "subject": message.subject,
-                    "from": {
-                        "name": message.from_.email_address.name if message.from_ and message.from_.email_address else "Unknown",
-                        "address": message.from_.email_address.address if message.from_ and message.from_.email_address else "Unknown"
-                    },
-                    "receivedDateTime": message.received_date_time.isoformat() if message.received_date_time else None,
-                    "isRead": message.is_read,
-                    "hasAttachments": message.has_attachments,
-                    "bodyPreview": message.body.content[:200] + "..." if message.body and message.body.content and len(message.body.content) > 200 else (message.body.content if message.body else "")
-                }
-                emails.append(email_data)
-        
-        response = jsonify({
-            "emails": emails,
-            "hasMore": message_page.odata_next_link is not None if message_page else False
-        })
-        response.headers.add('Access-Control-Allow-Origin', '*')
-        return response
-    
-    except ODataError as e:
-        response = jsonify({
-            "error": "Failed to fetch emails",
-            "details": str(e)
-        })
-        response.status_code = 401
-        response.headers.add('Access-Control-Allow-Origin', '*')
-        return response
+
+        logger.info(f"API: Getting {count} recent emails...")
+        result, tier = with_login(lambda: result_cache.get_or_compute(
+            inbox_cache_key(count),
+            lambda: engine.call('get_inbox', count=count),
+            refresh=request.args.get('refresh') == 'true'))
+        logger.info(f"API: Returned {len(result['emails'])} recent emails (cache: {tier or 'miss'})")
+        return json_response(result)
     except Exception as e:
-        response = jsonify({
-            "error": "Failed to fetch emails",
-            "details": str(e)
-        })
-        response.status_code = 500
-        response.headers.add('Access-Control-Allow-Origin', '*')
-        return response
+        logger.error(f"API: Error getting recent emails: {e}")
+        return graph_error_response(e, "Failed to fetch emails")
 
 @app.route('/api/emails/search', methods=['POST', 'OPTIONS'])
-@async_route
-async def search_emails():
+def search_emails():
     if request.method == 'OPTIONS':
-        response = jsonify({})
-        response.headers.add('Access-Control-Allow-Origin', '*')
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
-        response.headers.add('Access-Control-Allow-Methods', 'GET,POST,OPTIONS')
-        return response
-    
+        return preflight_response()
+
     try:
         data = request.get_json()
         employee_name = data.get('employeeName', '')
         count = data.get('count', 50)
         count = min(count, 100)  # Limit to 100 emails max
-        
+
         if not employee_name:
-            response = jsonify({"error": "Employee name is required"})
-            response.status_code = 400
-            response.headers.add('Access-Control-Allow-Origin', '*')
-            return response
-        
-        message_page = await graph_client.search_emails_by_employee(employee_name, count)
-        emails = []
-        
-        if message_page and message_page.value:
-            for message in message_page.value:
-                email_data = {
-                    "subject": message.subject,
-                    "from": {
-                        "name": message.from_.email_address.name if message.from_ and message.from_.email_address else "Unknown",
-                        "address": message.from_.email_address.address if message.from_ and message.from_.email_address else "Unknown"
-                    },
-                    "receivedDateTime": message.received_date_time.isoformat() if message.received_date_time else None,
-                    "isRead": message.is_read,
-                    "hasAttachments": message.has_attachments,
-                    "bodyPreview": message.body.content[:200] + "..." if message.body and message.body.content and len(message.body.content) > 200 else (message.body.content if message.body else "")
-                }
-                emails.append(email_data)
-        
-        response = jsonify({
-            "emails": emails,
-            "employeeName": employee_name,
-            "hasMore": message_page.odata_next_link is not None if message_page else False
-        })
-        response.headers.add('Access-Control-Allow-Origin', '*')
-        return response
-    
-    except ODataError as e:
-        response = jsonify({
-            "error": "Failed to search emails",
-            "details": str(e)
-        })
-        response.status_code = 401
-        response.headers.add('Access-Control-Allow-Origin', '*')
-        return response
+            return json_response({"error": "Employee name is required"}, 400)
+
+        logger.info(f"API: Searching emails for employee: {employee_name}")
+        result, tier = with_login(lambda: mailbox_search.run(employee_name, count, refresh=bool(data.get('refresh'))))
+        failed = [m['mailbox'] for m in result['mailboxes'] if 'error' in m]
+        logger.info(f"API: Found {len(result['emails'])} emails for {employee_name} in "
+                    f"{len(result['mailboxes'])} mailboxes (cache: {tier or 'miss'})"
+                    + (f", failed: {', '.join(failed)}" if failed else ""))
+        return json_response(result)
+    except Exception as e:
+        logger.error(f"API: Error searching emails: {e}")
+        return graph_error_response(e, "Failed to search emails")
+
+@app.route('/api/emails/messages/<path:message_id>', methods=['GET', 'OPTIONS'])
+def get_email(message_id):
+    if request.method == 'OPTIONS':
+        return preflight_response()
+
+    body_type = request.args.get('format', 'html')
+    if body_type not in BODY_TYPES:
+        return json_response({"error": "Invalid format", "details": "format must be 'html' or 'text'"}, 400)
+    # Message ids belong to one mailbox; search results name it in "mailbox"
+    mailbox = request.args.get('mailbox', ME)
+    if mailbox.lower() not in (target.lower() for target in mailbox_search.targets):
+        return json_response({"error": "Unknown mailbox",
+                              "details": f"mailbox must be one of {', '.join(mailbox_search.targets)}"}, 400)
+
+    try:
+        message, hit = with_login(lambda: body_cache.get_or_fetch(
+            message_id, body_type,
+            lambda: engine.call('get_message', message_id=message_id, body_type=body_type,
+                                **({} if mailbox == ME else {"mailbox": mailbox})),
+            change_key=request.args.get('changeKey')))
+        logger.info(f"API: Returned message {message_id[:16]}... (cache: {'hit' if hit else 'miss'})")
+        return json_response(dict(message, cached=hit))
+    except Exception as e:
+        logger.error(f"API: Error getting message: {e}")
+        return graph_error_response(e, "Failed to fetch message")
+
+def invalidate_changed_employees(diff):
+    """Drop cached searches for employees whose tickets changed; the rest stay cached"""
+    invalidated = result_cache.invalidate_prefix(*(search_cache_prefix(name) for name in diff.changed_employees))
+    counts = diff.to_dict()['counts']
+    logger.info(f"API: Workbook diff {counts}, invalidated {invalidated} cached searches")
+
+@app.route('/api/workbooks', methods=['GET', 'POST', 'OPTIONS'])
+def workbooks():
+    if request.method == 'OPTIONS':
+        return preflight_response()
+
+    if request.method == 'GET':
+        return json_response({"workbooks": workbook_store.list()})
+
+    upload = request.files.get('file')
+    if upload is None:
+        return json_response({"error": "No file uploaded", "details": "Send the workbook as multipart field 'file'"}, 400)
+    if not upload.filename.lower().endswith('.xlsx'):
+        # openpyxl only reads the Office Open XML format; the UI parses .xls itself
+        return json_response({"error": "Unsupported file type", "details": "Only .xlsx workbooks can be parsed by the service"}, 415)
+
+    try:
+        logger.info(f"API: Ingesting workbook {upload.filename}")
+        previous = workbook_store.latest()
+        workbook, tier = workbook_store.ingest(upload.read(), upload.filename)
+        logger.info(f"API: Workbook {workbook.id} ready (cache: {tier or 'miss'})")
+        if previous is not None:
+            # A re-upload of the same bytes gets an empty diff, not the one from its first upload
+            workbook.diff = diff_workbooks(previous, workbook)
+            invalidate_changed_employees(workbook.diff)
+        diff = workbook.diff.to_dict(SUMMARY_LIMIT) if workbook.diff else None
+        if prewarm is not None:
+            prewarm.schedule(prewarm_order(workbook))
+        return json_response(dict(workbook.summary(), employees=workbook.employees, cache=tier, diff=diff), 201)
+    except WorkbookError as e:
+        return json_response({"error": "Invalid workbook", "details": str(e)}, 400)
+    except Exception as e:
+        logger.error(f"API: Error ingesting workbook: {e}")
+        return json_response({"error": "Failed to ingest workbook", "details": str(e), "type": type(e).__name__}, 500)
+
+@app.route('/api/workbooks/<workbook_id>', methods=['GET', 'OPTIONS'])
+def get_workbook(workbook_id):
+    if request.method == 'OPTIONS':
+        return preflight_response()
+
+    workbook = workbook_store.get(workbook_id)
+    if workbook is None:
+        return json_response({"error": "Workbook not found", "details": workbook_id}, 404)
+    return json_response(workbook.to_dict())
+
+def requested_workbook():
+    """The workbook named by the workbookId query parameter, or the latest upload"""
+    workbook_id = request.args.get('workbookId')
+    if workbook_id:
+        return workbook_store.get(workbook_id)
+    return workbook_store.latest()
+
+def workbook_not_found_response():
+    return json_response({"error": "Workbook not found",
+                          "details": request.args.get('workbookId') or "No workbook has been uploaded"}, 404)
+
+@app.route('/api/workbooks/<workbook_id>/diff', methods=['GET', 'OPTIONS'])
+def get_workbook_diff(workbook_id):
+    if request.method == 'OPTIONS':
+        return preflight_response()
+
+    workbook = workbook_store.get(workbook_id)
+    if workbook is None:
+        return json_response({"error": "Workbook not found", "details": workbook_id}, 404)
+
+    against = request.args.get('against')
+    if against:
+        previous = workbook_store.get(against)
+        if previous is None:
+            return json_response({"error": "Workbook not found", "details": against}, 404)
+        return json_response(diff_workbooks(previous, workbook).to_dict())
+    if workbook.diff is None:
+        return json_response({"error": "No previous version",
+                              "details": "Pass ?against=<workbookId> to compare two uploads"}, 404)
+    return json_response(workbook.diff.to_dict())
+
+@app.route('/api/workbooks/<workbook_id>/rows', methods=['GET', 'OPTIONS'])
+def get_workbook_rows(workbook_id):
+    if request.method == 'OPTIONS':
+        return preflight_response()
+
+    workbook = workbook_store.latest() if workbook_id == 'latest' else workbook_store.get(workbook_id)
+    if workbook is None:
+        return json_response({"error": "Workbook not found", "details": workbook_id}, 404)
+
+    # Parsed explicitly: type=int would quietly turn sort=abc into "unsorted"
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        offset = limit = -1
+    if offset < 0 or not 0 < limit <= MAX_PAGE_SIZE:
+        return json_response({"error": "Invalid page",
+                              "details": f"offset must be >= 0 and limit between 1 and {MAX_PAGE_SIZE}"}, 400)
+    sort = request.args.get('sort')
+    try:
+        sort = int(sort) if sort not in (None, '') else None
+    except ValueError:
+        sort = -1
+    if sort is not None and not 0 <= sort < len(workbook.headers):
+        return json_response({"error": "Invalid sort column",
+                              "details": f"sort must be a column index from 0 to {len(workbook.headers) - 1}"}, 400)
+    direction = request.args.get('dir', ASCENDING)
+    query = request.args.get('q', '')
+    if direction not in (ASCENDING, DESCENDING):
+        return json_response({"error": "Invalid sort direction", "details": "dir must be 'asc' or 'desc'"}, 400)
+
+    started = time.perf_counter()
+    page = workbook.row_view.page(offset, limit, query, sort, direction)
+    return json_response(dict(page, workbookId=workbook.id, offset=offset, limit=limit, sort=sort, dir=direction,
+                              q=query, elapsedMs=(time.perf_counter() - started) * 1000))
+
+@app.route('/api/employees', methods=['GET', 'OPTIONS'])
+def list_employees():
+    if request.method == 'OPTIONS':
+        return preflight_response()
+
+    workbook = requested_workbook()
+    if workbook is None:
+        return workbook_not_found_response()
+    return json_response({"workbookId": workbook.id, "employees": workbook.employees,
+                          "count": len(workbook.employees)})
+
+@app.route('/api/employees/suggest', methods=['GET', 'OPTIONS'])
+def suggest_employees():
+    if request.method == 'OPTIONS':
+        return preflight_response()
+
+    workbook = requested_workbook()
+    if workbook is None:
+        return workbook_not_found_response()
+    query = request.args.get('q', '')
+    started = time.perf_counter()
+    suggestions = workbook.suggester.suggest(query, request.args.get('limit', 10, type=int))
+    return json_response({
+        "workbookId": workbook.id,
+        "query": query,
+        "suggestions": suggestions,
+        "elapsedMs": (time.perf_counter() - started) * 1000
+    })
+
+@app.route('/api/employees/<path:employee_name>/records', methods=['GET', 'OPTIONS'])
+def employee_records(employee_name):
+    if request.method == 'OPTIONS':
+        return preflight_response()
+
+    workbook = requested_workbook()
+    if workbook is None:
+        return workbook_not_found_response()
+    records = workbook.employee_records(employee_name)
+    return json_response({
+        "workbookId": workbook.id,
+        "employeeName": employee_name,
+        "totalRecords": len(records),
+        "records": records,
+        "columns": workbook.headers
+    })
+
+@app.route('/api/tickets/<path:ticket_number>/records', methods=['GET', 'OPTIONS'])
+def ticket_records(ticket_number):
+    if request.method == 'OPTIONS':
+        return preflight_response()
+
+    workbook = requested_workbook()
+    if workbook is None:
+        return workbook_not_found_response()
+    records = workbook.ticket_records(ticket_number)
+    return json_response({
+        "workbookId": workbook.id,
+        "ticketNumber": ticket_number,
+        "totalRecords": len(records),
+        "records": records,
+        "columns": workbook.headers
+    })
+
+@app.route('/api/mail/status', methods=['GET', 'OPTIONS'])
+def mail_status():
+    if request.method == 'OPTIONS':
+        return preflight_response()
+
+    return json_response(mail_store.describe())
+
+@app.route('/api/mail/sync', methods=['POST', 'OPTIONS'])
+def mail_sync():
+    if request.method == 'OPTIONS':
+        return preflight_response()
+
+    try:
+        logger.info("API: Syncing inbox into the local mail store...")
+        fetched, has_more = with_login(lambda: sync_mailbox(
+            engine, mail_store, config.getint('mail', 'syncMaxMessages', fallback=1000)))
+        return json_response({"fetched": fetched, "hasMore": has_more, "store": mail_store.describe()})
     except Exception as e:
-        response = jsonify({
-            "error": "Failed to search emails",
-            "details": str(e)
+        logger.error(f"API: Error syncing mail: {e}")
+        return graph_error_response(e, "Failed to sync mail")
+
+@app.route('/api/correlation/tickets', methods=['GET', 'OPTIONS'])
+def ticket_correlation_summary():
+    if request.method == 'OPTIONS':
+        return preflight_response()
+
+    workbook = requested_workbook()
+    if workbook is None:
+        return workbook_not_found_response()
+    return json_response(correlations.get(workbook).summary())
+
+@app.route('/api/correlation/employees', methods=['GET', 'OPTIONS'])
+def employee_attribution_summary():
+    if request.method == 'OPTIONS':
+        return preflight_response()
+
+    workbook = requested_workbook()
+    if workbook is None:
+        return workbook_not_found_response()
+    return json_response(attributions.get(workbook).summary())
+
+@app.route('/api/employees/<path:employee_name>/messages', methods=['GET', 'OPTIONS'])
+def employee_messages(employee_name):
+    if request.method == 'OPTIONS':
+        return preflight_response()
+
+    workbook = requested_workbook()
+    if workbook is None:
+        return workbook_not_found_response()
+    messages = mail_store.get_messages(attributions.get(workbook).messages_for(employee_name))
+    return json_response({
+        "workbookId": workbook.id,
+        "employeeName": employee_name,
+        "messages": messages,
+        "totalMessages": len(messages)
+    })
+
+@app.route('/api/tickets/<path:ticket_number>/messages', methods=['GET', 'OPTIONS'])
+def ticket_messages(ticket_number):
+    if request.method == 'OPTIONS':
+        return preflight_response()
+
+    workbook = requested_workbook()
+    if workbook is None:
+        return workbook_not_found_response()
+    messages = mail_store.get_messages(correlations.get(workbook).messages_for(ticket_number))
+    return json_response({
+        "workbookId": workbook.id,
+        "ticketNumber": ticket_number,
+        "records": workbook.ticket_records(ticket_number),
+        "messages": messages,
+        "totalMessages": len(messages)
+    })
+
+@app.route('/api/reports/progress', methods=['GET', 'OPTIONS'])
+def progress_report():
+    if request.method == 'OPTIONS':
+        return preflight_response()
+
+    workbook = requested_workbook()
+    if workbook is None:
+        return workbook_not_found_response()
+    report_format = request.args.get('format', 'csv')
+    if report_format not in ('csv', 'xlsx'):
+        return json_response({"error": "Unsupported format", "details": "Use format=csv or format=xlsx"}, 400)
+    count = min(request.args.get('count', 25, type=int), 100)
+
+    # Settle sign-in before streaming; searches inside the report cannot answer 202
+    if not device_code_state.recently_authenticated():
+        try:
+            with_login(lambda: engine.call('get_user'))
+        except Exception as e:
+            logger.error(f"API: Progress report needs authentication: {e}")
+            return graph_error_response(e, "Authentication required before running a report")
+
+    def search(employee_name):
+        return mailbox_search.run(employee_name, count)
+
+    # Every report search waits on each mailbox's own limit, so more searches than
+    # [mailboxes] concurrency would only queue there: the lower of the two settings wins
+    concurrency = min(config.getint('reports', 'concurrency', fallback=engine.max_workers),
+                      mailbox_search.concurrency)
+    logger.info(f"API: Progress report for {len(workbook.employees)} employees "
+                f"({report_format}, concurrency {concurrency})")
+    rows = gather_progress(workbook.employees, search, concurrency)
+    filename = f"progress_report_{datetime.date.today().isoformat()}.{report_format}"
+    if report_format == 'csv':
+        response = Response(csv_stream(rows), mimetype='text/csv')
+    else:
+        response = Response(xlsx_stream(rows),
+                            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    return response
+
+@app.route('/api/debug/auth', methods=['GET', 'OPTIONS'])
+def debug_auth():
+    if request.method == 'OPTIONS':
+        return preflight_response()
+
+    logger.info("API: Debug auth - testing token acquisition...")
+    try:
+        token = engine.call('get_user_token', timeout=180)['token']
+        token_preview = token[:50] + "..." if len(token) > 50 else token
+        logger.info("API: Debug auth - token acquired successfully")
+    except Exception as token_error:
+        logger.error(f"API: Debug auth - token acquisition failed: {token_error}")
+        return json_response({
+            "step": "token_acquisition",
+            "success": False,
+            "error": str(token_error),
+            "type": type(token_error).__name__
+        }, 500)
+
+    try:
+        user = engine.call('get_user')
+        logger.info("API: Debug auth - user info retrieved successfully")
+        return json_response({
+            "step": "complete",
+            "success": True,
+            "token_preview": token_preview,
+            "user": user
         })
-        response.status_code = 500
-        response.headers.add('Access-Control-Allow-Origin', '*')
-        return response
+    except Exception as user_error:
+        logger.error(f"API: Debug auth - user info failed: {user_error}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        return json_response({
+            "step": "user_info",
+            "success": False,
+            "token_preview": token_preview,
+            "error": str(user_error),
+            "type": type(user_error).__name__
+        }, 500)
 
-if __name__ == '__main__':
-    init_graph()
-    print("📧 Email service starting...")
-    print("🔐 Make sure to authenticate with Microsoft Graph when prompted.")
-    print("🌐 Service will be available at: http://127.0.0.1:5000")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="KNGS email service")
+    parser.add_argument('--engine', choices=sorted(ENGINES), help="Graph execution engine (default: config.cfg [service] engine)")
+    parser.add_argument('--workers', type=int, help="Number of engine workers")
+    parser.add_argument('--port', type=int, help=f"Port to listen on (default: {DEFAULT_PORT})")
+    args = parser.parse_args(argv)
+
+    init_config()
+    try:
+        init_service(args.engine, args.workers)
+    except Exception as e:
+        logger.error(f"Failed to initialize Graph engine: {e}")
+        print("❌ Failed to initialize Graph engine")
+        return 1
+
+    port = args.port or config.getint('service', 'port', fallback=DEFAULT_PORT)
+    print(f"📧 Email service starting with the '{engine.name}' engine...")
+    print("🔐 Device code authentication will be shown in this terminal")
+    print(f"🌐 Service will be available at: http://127.0.0.1:{port}")
     print("🔧 CORS enabled for localhost:3000")
-    app.run(host='127.0.0.1', port=5000, debug=True, threaded=True) 
\ No newline at end of file
+    print("📝 Logging enabled for debugging")
+    # run_app.py stops the service with SIGTERM; exit through finally so the snapshot is written
+    def stop(signum, frame):
+        raise SystemExit(0)
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        # make_server binds the port before returning, so the marker is only printed once requests can connect
+        server = make_server('127.0.0.1', port, app, threaded=True)
+        print(f"{READY_MARKER} port={port}", flush=True)
+        server.serve_forever()
+    finally:
+        shutdown_engine()
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+
+"""Autocomplete for employee names, built once per uploaded workbook.
+
+Two indexes over the normalized names:
+
+* a trie over each name and each of its word starts, so "jo" finds
+  "John Smith" and "smi" finds it too. Every node keeps its best few matches
+  already ranked, so a prefix query is a walk of len(query) nodes.
+* a trigram index for matches in the middle of a word ("mit" -> "Smith"),
+  used when the trie does not fill the result list. Queries of one or two
+  characters have no trigram; they use a small index of every one- and
+  two-character substring instead ("mi" -> "Smith"), which keeps only the
+  best NODE_CAPACITY names per substring, so no keystroke scans every name.
+
+Results are ranked by match kind (name prefix, then word prefix, then
+substring), then by shorter name, then alphabetically.
+"""
+
+import heapq
+import itertools
+
+# Results kept per trie node; also the most suggestions a query can return
+NODE_CAPACITY = 25
+# Deeper queries are selective enough to answer from the trigram index
+TRIE_DEPTH = 8
+
+NAME_PREFIX, WORD_PREFIX, SUBSTRING = 0, 1, 2
+
+def normalize_name(name):
+    """Index key for an employee name: casefolded with whitespace collapsed"""
+    return ' '.join(str(name).split()).casefold()
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def short_grams(text):
+    """Every one- and two-character substring of text"""
+    return {text[i:i + n] for n in (1, 2) for i in range(len(text) - n + 1)}
+
+def match_kind(key, query):
+    if key.startswith(query):
+        return NAME_PREFIX
+    if f" {query}" in key:
+        return WORD_PREFIX
+    if query in key:
+        return SUBSTRING
+    return None
+
+class TrieNode:
+    __slots__ = ('children', 'ids')
+
+    def __init__(self):
+        self.children = {}
+        self.ids = []
+
+class EmployeeSuggester:
+    """Ranked top-k name suggestions for one workbook's employees"""
+
+    def __init__(self, employees):
+        self.employees = employees
+        self.keys = [normalize_name(employee['name']) for employee in employees]
+        self.root = TrieNode()
+        self.trigram_index = {}
+        self.short_index = {}
+
+        # Insert in rank order so every node's id list is already sorted and
+        # only the first NODE_CAPACITY arrivals need to be kept
+        by_length = sorted(range(len(self.keys)), key=lambda i: (len(self.keys[i]), self.keys[i]))
+        for i in by_length:
+            self._insert(self.keys[i], i)
+        for i in by_length:
+            key = self.keys[i]
+            for position, char in enumerate(key):
+                if char == ' ' and position + 1 < len(key):
+                    self._insert(key[position + 1:], i)
+
+        # Posting lists are in rank order too, so substring scans can stop early
+        for i in by_length:
+            for gram in trigrams(self.keys[i]):
+                self.trigram_index.setdefault(gram, []).append(i)
+
+        # The trie hands at most limit - 1 ids to the short index, so its best
+        # NODE_CAPACITY names per substring always leave enough to fill limit
+        for i in by_length:
+            for gram in short_grams(self.keys[i]):
+                ids = self.short_index.setdefault(gram, [])
+                if len(ids) < NODE_CAPACITY:
+                    ids.append(i)
+
+    def _insert(self, text, employee_id):
+        node = self.root
+        for char in text[:TRIE_DEPTH]:
+            node = node.children.setdefault(char, TrieNode())
+            if len(node.ids) < NODE_CAPACITY and employee_id not in node.ids:
+                node.ids.append(employee_id)
+
+    def _trie_matches(self, query):
+        node = self.root
+        for char in query:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.ids
+
+    def _trigram_matches(self, query):
+        """Names containing query, shortest first, scanning the rarest trigram's postings"""
+        postings = [self.trigram_index.get(gram) for gram in trigrams(query)]
+        if not postings or any(p is None for p in postings):
+            return
+        for i in min(postings, key=len):
+            if query in self.keys[i]:
+                yield i
+
+    def _short_matches(self, query):
+        """Best names containing a one- or two-character query, shortest first"""
+        return self.short_index.get(query, [])
+
+    def suggest(self, query, limit=10):
+        """Return up to limit employees whose name contains query"""
+        query = normalize_name(query)
+        limit = max(1, min(limit, NODE_CAPACITY))
+        if not query:
+            return []
+
+        if len(query) <= TRIE_DEPTH:
+            # A trie node holding fewer than limit ids holds every prefix match,
+            # so anything the trigrams add is a plain substring match
+            ids = list(self._trie_matches(query)[:limit])
+            if len(ids) < limit:
+                seen = set(ids)
+                matches = self._trigram_matches(query) if len(query) >= 3 else self._short_matches(query)
+                extra = (i for i in matches if i not in seen)
+                ids.extend(itertools.islice(extra, limit - len(ids)))
+        else:
+            ids = heapq.nsmallest(limit, self._trigram_matches(query),
+                                  key=lambda i: (match_kind(self.keys[i], query), len(self.keys[i]), self.keys[i]))
+        return [self.employees[i] for i in ids]
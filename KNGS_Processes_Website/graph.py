@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import asyncio
+import logging
+import time
+from configparser import SectionProxy
+
+from graph_transport import TransportSettings, create_http_client
+
+# The Graph SDK (msgraph and its generated request builders) is imported
+# inside the methods that use it. It is the slowest part of the service to
+# import, and the routes that never call Graph, /api/health included, should
+# not wait for it. The service imports it on a warm-up thread instead.
+
+logger = logging.getLogger(__name__)
+
+# Names of the Graph coroutines an engine is allowed to run. Keeping this list
+# explicit means operations can be sent by name to worker threads or processes.
+GRAPH_OPERATIONS = ('get_user', 'get_user_token', 'get_inbox', 'search_emails', 'sync_messages',
+                    'get_message', 'warm_connection')
+# List calls ask for Graph's plain-text bodyPreview; full bodies are fetched one message at a time
+LIST_FIELDS = ['from', 'isRead', 'receivedDateTime', 'subject', 'bodyPreview', 'hasAttachments', 'changeKey',
+               'internetMessageId']
+MESSAGE_FIELDS = LIST_FIELDS + ['body', 'toRecipients', 'ccRecipients']
+BODY_TYPES = ('html', 'text')
+# Mailbox name for the signed-in user's own mailbox; anything else is a user id or UPN under /users/{id}
+ME = 'me'
+
+class DeviceCodeState:
+    """Holds the most recent device code so the UI can display it"""
+
+    def __init__(self):
+        self.user_code = None
+        self.verification_uri = None
+        self.expires_on = None
+        self.last_successful_auth = None
+
+    def prompt_callback(self, verification_uri, user_code, expires_on):
+        self.user_code = user_code
+        self.verification_uri = verification_uri
+        self.expires_on = expires_on
+
+        print(f"\n🔐 DEVICE CODE AUTHENTICATION REQUIRED")
+        print(f"📱 Please go to: {verification_uri}")
+        print(f"🔑 Enter this code: {user_code}")
+        print(f"⏰ Code expires at {expires_on}")
+        print(f"💡 The code is also available in the Electron app modal")
+
+        logger.info(f"Device code generated: {user_code}")
+        logger.info(f"Verification URI: {verification_uri}")
+
+    def current(self):
+        """Return (user_code, verification_uri) for the login in progress, if any"""
+        return self.user_code, self.verification_uri
+
+    def mark_authenticated(self):
+        self.last_successful_auth = time.time()
+        self.user_code = None
+
+    def recently_authenticated(self, window=1800):
+        return (self.last_successful_auth is not None
+                and (time.time() - self.last_successful_auth) < window)
+
+def recipient_to_dict(recipient):
+    address = recipient.email_address
+    return {"name": address.name if address else None, "address": address.address if address else None}
+
+def message_to_dict(message):
+    """Convert a Graph message into the JSON shape the UI expects"""
+    return {
+        "id": message.id,
+        "changeKey": message.change_key,
+        # The same mail delivered to several mailboxes has one internetMessageId but a different id in each
+        "internetMessageId": message.internet_message_id,
+        "subject": message.subject,
+        "from": {
+            "name": message.from_.email_address.name if message.from_ and message.from_.email_address else "Unknown",
+            "address": message.from_.email_address.address if message.from_ and message.from_.email_address else "Unknown"
+        },
+        "receivedDateTime": message.received_date_time.isoformat() if message.received_date_time else None,
+        "isRead": message.is_read,
+        "hasAttachments": message.has_attachments,
+        "bodyPreview": message.body_preview or ""
+    }
+
+class Graph:
+    """Async Microsoft Graph calls.
+
+    Every method returns plain dicts so results can be handed across threads
+    and processes by the execution engines in graph_engines.py. A Graph
+    instance must only be awaited from the event loop it was first used on.
+    """
+    settings: SectionProxy
+
+    def __init__(self, config: SectionProxy, credential, transport: TransportSettings = None):
+        self.settings = config
+        self.credential = credential
+        from kiota_authentication_azure.azure_identity_authentication_provider import (
+            AzureIdentityAuthenticationProvider)
+        from msgraph import GraphRequestAdapter, GraphServiceClient
+
+        graph_scopes = self.settings['graphUserScopes'].split(' ')
+        # Our own httpx client per Graph instance; the SDK default is one client shared by every event loop
+        self.http_client = create_http_client(transport)
+        auth_provider = AzureIdentityAuthenticationProvider(self.credential, scopes=graph_scopes)
+        self.user_client = GraphServiceClient(request_adapter=GraphRequestAdapter(auth_provider, self.http_client))
+
+    async def warm_connection(self):
+        """Open a pooled connection to Graph (TLS and, with HTTP/2, the session) before the first real call"""
+        import httpx
+
+        started = time.perf_counter()
+        try:
+            # Unauthenticated, so no token is needed; any HTTP answer means the connection is up
+            response = await self.http_client.head('/')
+        except httpx.HTTPError as e:
+            logger.warning(f"Could not pre-warm the Graph connection: {e}")
+            return {"warmed": False, "error": str(e)}
+        return {"warmed": True, "httpVersion": response.http_version,
+                "seconds": time.perf_counter() - started}
+
+    def mailbox(self, mailbox=None):
+        """Request builder for the signed-in user's mailbox, or for a shared or delegated one by user id or UPN"""
+        if mailbox in (None, ME):
+            return self.user_client.me
+        return self.user_client.users.by_user_id(mailbox)
+
+    async def get_user_token(self):
+        graph_scopes = self.settings['graphUserScopes']
+        # get_token blocks (token cache file, maybe a refresh request); keep it off the event loop
+        access_token = await asyncio.to_thread(self.credential.get_token, graph_scopes)
+        return {"token": access_token.token}
+
+    async def get_user(self):
+        from msgraph.generated.users.item.user_item_request_builder import UserItemRequestBuilder
+
+        query_params = UserItemRequestBuilder.UserItemRequestBuilderGetQueryParameters(
+            select=['displayName', 'mail', 'userPrincipalName']
+        )
+        request_config = UserItemRequestBuilder.UserItemRequestBuilderGetRequestConfiguration(
+            query_parameters=query_params
+        )
+
+        user = await self.user_client.me.get(request_configuration=request_config)
+        return {
+            "displayName": user.display_name,
+            "email": user.mail or user.user_principal_name,
+            "userPrincipalName": user.user_principal_name
+        }
+
+    async def get_inbox(self, count=25):
+        from msgraph.generated.users.item.mail_folders.item.messages.messages_request_builder import (
+            MessagesRequestBuilder)
+
+        query_params = MessagesRequestBuilder.MessagesRequestBuilderGetQueryParameters(
+            select=LIST_FIELDS,
+            top=count,
+            orderby=['receivedDateTime DESC']
+        )
+        request_config = MessagesRequestBuilder.MessagesRequestBuilderGetRequestConfiguration(
+            query_parameters=query_params
+        )
+
+        messages = await self.user_client.me.mail_folders.by_mail_folder_id('inbox').messages.get(
+            request_configuration=request_config)
+
+        emails = [message_to_dict(message) for message in (messages.value or [])] if messages else []
+        return {
+            "emails": emails,
+            "hasMore": messages.odata_next_link is not None if messages else False
+        }
+
+    async def search_emails(self, employee_name, count=50, mailbox=None):
+        """Search for emails that have the employee's name in the subject line"""
+        from msgraph.generated.users.item.mail_folders.item.messages.messages_request_builder import (
+            MessagesRequestBuilder)
+
+        query_params = MessagesRequestBuilder.MessagesRequestBuilderGetQueryParameters(
+            select=LIST_FIELDS,
+            top=count,
+            orderby=['receivedDateTime DESC'],
+            search=f'{employee_name}'
+        )
+        request_config = MessagesRequestBuilder.MessagesRequestBuilderGetRequestConfiguration(
+            query_parameters=query_params
+        )
+
+        messages = await self.mailbox(mailbox).mail_folders.by_mail_folder_id('inbox').messages.get(
+            request_configuration=request_config)
+
+        emails = []
+        if messages and messages.value:
+            needle = employee_name.lower()
+            for message in messages.value:
+                # $search matches anywhere in the message, keep only subject hits
+                if message.subject and needle in message.subject.lower():
+                    emails.append(message_to_dict(message))
+
+        return {
+            "emails": emails,
+            "employeeName": employee_name,
+            "hasMore": messages.odata_next_link is not None if messages else False
+        }
+
+    async def get_message(self, message_id, body_type='html', mailbox=None):
+        """One message with its full body, as HTML or as text converted by Exchange"""
+        from msgraph.generated.users.item.messages.item.message_item_request_builder import (
+            MessageItemRequestBuilder)
+
+        query_params = MessageItemRequestBuilder.MessageItemRequestBuilderGetQueryParameters(select=MESSAGE_FIELDS)
+        request_config = MessageItemRequestBuilder.MessageItemRequestBuilderGetRequestConfiguration(
+            query_parameters=query_params
+        )
+        request_config.headers.add('Prefer', f'outlook.body-content-type="{body_type}"')
+
+        message = await self.mailbox(mailbox).messages.by_message_id(message_id).get(
+            request_configuration=request_config)
+        return dict(
+            message_to_dict(message),
+            body={
+                "contentType": message.body.content_type.value if message.body and message.body.content_type else body_type,
+                "content": message.body.content if message.body else ""
+            },
+            toRecipients=[recipient_to_dict(r) for r in (message.to_recipients or [])],
+            ccRecipients=[recipient_to_dict(r) for r in (message.cc_recipients or [])]
+        )
+
+    async def sync_messages(self, received_after=None, max_messages=1000, page_size=100):
+        """Fetch inbox messages newer than received_after (ISO 8601), oldest first, following next links.
+
+        Oldest first means a call capped at max_messages stops at a point the
+        next call can resume from by passing the newest message it got.
+        """
+        from msgraph.generated.users.item.mail_folders.item.messages.messages_request_builder import (
+            MessagesRequestBuilder)
+
+        query_params = MessagesRequestBuilder.MessagesRequestBuilderGetQueryParameters(
+            select=LIST_FIELDS,
+            top=min(page_size, max_messages),
+            orderby=['receivedDateTime ASC'],
+            filter=f'receivedDateTime gt {received_after}' if received_after else None
+        )
+        request_config = MessagesRequestBuilder.MessagesRequestBuilderGetRequestConfiguration(
+            query_parameters=query_params
+        )
+
+        builder = self.user_client.me.mail_folders.by_mail_folder_id('inbox').messages
+        page = await builder.get(request_configuration=request_config)
+        messages = []
+        while page:
+            messages.extend(message_to_dict(message) for message in (page.value or []))
+            if not page.odata_next_link or len(messages) >= max_messages:
+                break
+            page = await builder.with_url(page.odata_next_link).get()
+
+        return {
+            "messages": messages[:max_messages],
+            "hasMore": bool(page and page.odata_next_link)
+        }
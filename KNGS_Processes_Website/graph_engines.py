@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+
+"""Execution engines that run Graph coroutines for the synchronous Flask routes.
+
+The routes in email_service.py never touch an event loop directly. They call
+``engine.call('search_emails', employee_name=..., count=...)`` and get plain
+dicts back, so the same routes can be served by any engine:
+
+* ``threaded``  - a thread pool where every worker keeps its own event loop and
+                  Graph client for its whole lifetime
+* ``asyncio``   - one background thread running a single event loop; requests
+                  are scheduled onto it with run_coroutine_threadsafe
+* ``process``   - a process pool where every worker process owns its own
+                  event loop and Graph client
+
+Every call carries a deadline. The worker runs the coroutine under
+asyncio.wait_for with the time left, so a call the route has given up on is
+cancelled where it runs and the worker is free for the next request. A call
+still queued at its deadline is cancelled without being started.
+
+In front of the workers sits an admission queue. At most max_workers calls
+run at once and at most max_queued callers wait for a slot, each for at most
+max_queue_wait seconds. Anything beyond that fails fast with EngineOverloaded
+(a 503 with Retry-After in the service), so latency under overload stays
+bounded instead of growing with the backlog.
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import math
+import multiprocessing
+import threading
+import time
+from configparser import SectionProxy
+
+from graph import GRAPH_OPERATIONS, DeviceCodeState, Graph
+from graph_transport import TransportSettings, transport_stats
+from shared_auth import SharedDeviceCodeState, create_credential
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 30
+
+class DeadlineExceeded(concurrent.futures.TimeoutError):
+    """Raised by a worker that cancelled a Graph call because its caller's deadline passed"""
+
+async def run_with_deadline(coro, deadline):
+    """Await coro, cancelling it at deadline (a time.time() value, so it means the same in every process)"""
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        coro.close()
+        raise DeadlineExceeded("Deadline passed before the call started")
+    try:
+        return await asyncio.wait_for(coro, remaining)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(f"Cancelled after {remaining:.1f}s") from None
+
+class EngineOverloaded(Exception):
+    """No Graph worker became free within the admission limits"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class AdmissionQueue:
+    """Counts running calls against capacity; a bounded number of callers may wait for a slot, in order"""
+
+    def __init__(self, capacity, max_queued=None, max_wait=None):
+        self.capacity = capacity
+        self.max_queued = max_queued
+        self.max_wait = max_wait
+        self.running = 0
+        self.waiting = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout):
+        """Take a slot, waiting at most min(timeout, max_wait). False when the call should be shed."""
+        with self._condition:
+            if self.running < self.capacity and not self.waiting:
+                self.running += 1
+                return True
+            if self.max_queued is not None and self.waiting >= self.max_queued:
+                return False
+
+            wait = timeout if self.max_wait is None else min(timeout, self.max_wait)
+            give_up = time.monotonic() + wait
+            self.waiting += 1
+            try:
+                while self.running >= self.capacity:
+                    remaining = give_up - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._condition.wait(remaining)
+                self.running += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._condition:
+            self.running -= 1
+            self._condition.notify()
+
+class GraphEngine:
+    """Base class for engines. Subclasses implement start(), _submit() and shutdown()"""
+    name = None
+
+    def __init__(self, settings: SectionProxy, max_workers=4, device_code_state: DeviceCodeState = None,
+                 state_dir=None, interactive_login=True, max_queued=None, max_queue_wait=None,
+                 transport: TransportSettings = None):
+        self.settings = settings
+        self.max_workers = max_workers
+        self.transport = transport or TransportSettings()
+        self._admission = AdmissionQueue(max_workers, max_queued, max_queue_wait)
+        self.state_dir = state_dir
+        # False: calls raise LoginRequiredError instead of starting a device code login on a worker
+        self.interactive_login = interactive_login
+        self.device_code_state = device_code_state or SharedDeviceCodeState(state_dir)
+        self._stats_lock = threading.Lock()
+        self._calls = 0
+        self._failures = 0
+        self._timeouts = 0
+        self._cancelled = 0
+        self._finished_after_timeout = 0
+        self._rejected = 0
+        self._total_seconds = 0.0
+
+    def start(self):
+        raise NotImplementedError
+
+    def shutdown(self):
+        raise NotImplementedError
+
+    def _submit(self, operation, kwargs, deadline) -> concurrent.futures.Future:
+        raise NotImplementedError
+
+    def call(self, operation, timeout=DEFAULT_TIMEOUT, **kwargs):
+        """Run a Graph operation and block until it finishes or the timeout expires.
+
+        The timeout becomes the call's deadline in the worker too, so the
+        Graph request is cancelled rather than left running. Raises
+        concurrent.futures.TimeoutError on timeout and re-raises any error
+        thrown by the Graph SDK. Raises EngineOverloaded, without calling
+        Graph, when no worker frees up within the admission limits.
+        """
+        if operation not in GRAPH_OPERATIONS:
+            raise ValueError(f"Unknown Graph operation: {operation}")
+
+        started = time.perf_counter()
+        deadline = time.time() + timeout
+        if not self._admission.acquire(timeout):
+            if time.time() >= deadline:
+                # The caller's own timeout ran out first; same as a slow call
+                self._record(started, timed_out=True)
+                raise DeadlineExceeded("Deadline passed while waiting for a Graph worker")
+            with self._stats_lock:
+                self._rejected += 1
+            raise EngineOverloaded("All Graph workers are busy", self._retry_after())
+        try:
+            future = self._submit(operation, kwargs, deadline)
+        except Exception:
+            self._admission.release()
+            raise
+        # The slot is held until the work stops, not until the caller gives up
+        future.add_done_callback(lambda _: self._admission.release())
+        try:
+            result = future.result(timeout=max(deadline - time.time(), 0))
+        except concurrent.futures.TimeoutError:
+            self._record(started, timed_out=True)
+            self._abandon(future)
+            raise
+        except Exception:
+            self._record(started, failed=True)
+            raise
+        self._record(started)
+        self.device_code_state.mark_authenticated()
+        return result
+
+    def warm_up(self, timeout=15):
+        """Open a Graph connection on every worker before the first request needs one"""
+        deadline = time.time() + timeout
+        futures = [self._submit('warm_connection', {}, deadline) for _ in range(self.max_workers)]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result(timeout=max(deadline - time.time(), 0)))
+            except Exception as e:
+                results.append({"warmed": False, "error": f"{type(e).__name__}: {e}"})
+        warmed = sum(1 for r in results if r.get('warmed'))
+        logger.info(f"Pre-warmed Graph connections on {warmed}/{len(results)} workers")
+        return results
+
+    def transport_stats(self):
+        """Connection reuse for the Graph clients, which live in this process for this engine"""
+        return transport_stats.snapshot()
+
+    def _retry_after(self):
+        """Whole seconds until the current backlog should have drained"""
+        with self._stats_lock:
+            average = (self._total_seconds / self._calls) if self._calls else 1.0
+        backlog = self._admission.running + self._admission.waiting
+        return max(1, math.ceil(average * backlog / self.max_workers))
+
+    def _abandon(self, future):
+        """Count what happens to a call its caller stopped waiting for"""
+        if future.cancel():
+            # Still queued (or, for the asyncio engine, its task was cancelled)
+            with self._stats_lock:
+                self._cancelled += 1
+            return
+
+        def finished(done):
+            with self._stats_lock:
+                if done.cancelled() or isinstance(done.exception(), DeadlineExceeded):
+                    self._cancelled += 1
+                else:
+                    self._finished_after_timeout += 1
+
+        future.add_done_callback(finished)
+
+    def _record(self, started, failed=False, timed_out=False):
+        with self._stats_lock:
+            self._calls += 1
+            self._total_seconds += time.perf_counter() - started
+            if failed:
+                self._failures += 1
+            if timed_out:
+                self._timeouts += 1
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "engine": self.name,
+                "maxWorkers": self.max_workers,
+                "calls": self._calls,
+                "failures": self._failures,
+                "timeouts": self._timeouts,
+                "cancelled": self._cancelled,
+                "finishedAfterTimeout": self._finished_after_timeout,
+                "averageSeconds": (self._total_seconds / self._calls) if self._calls else 0.0,
+                "running": self._admission.running,
+                "queued": self._admission.waiting,
+                "rejected": self._rejected,
+                "maxQueued": self._admission.max_queued,
+                "maxQueueWaitSeconds": self._admission.max_wait,
+                "transport": dict(self.transport.describe(), connections=self.transport_stats())
+            }
+
+class ThreadedEngine(GraphEngine):
+    """Thread pool where each worker reuses one event loop and Graph client"""
+    name = 'threaded'
+
+    def start(self):
+        self._credential = create_credential(self.settings, self.device_code_state, self.state_dir,
+                                             self.interactive_login)
+        self._local = threading.local()
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix='graph-worker')
+
+    def _worker_state(self):
+        if not hasattr(self._local, 'loop'):
+            self._local.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._local.loop)
+            self._local.graph = Graph(self.settings, self._credential, self.transport)
+        return self._local.loop, self._local.graph
+
+    def _run(self, operation, kwargs, deadline):
+        loop, graph = self._worker_state()
+        return loop.run_until_complete(run_with_deadline(getattr(graph, operation)(**kwargs), deadline))
+
+    def _submit(self, operation, kwargs, deadline):
+        return self._executor.submit(self._run, operation, kwargs, deadline)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+class AsyncioEngine(GraphEngine):
+    """Single background event loop; concurrency comes from the loop, not from threads"""
+    name = 'asyncio'
+
+    def start(self):
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, name='graph-loop', daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        credential = create_credential(self.settings, self.device_code_state, self.state_dir,
+                                       self.interactive_login)
+        self._graph = Graph(self.settings, credential, self.transport)
+        # Caps in-flight Graph calls the same way max_workers does for the pools
+        self._semaphore = asyncio.Semaphore(self.max_workers)
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _run(self, operation, kwargs):
+        async with self._semaphore:
+            return await getattr(self._graph, operation)(**kwargs)
+
+    def _submit(self, operation, kwargs, deadline):
+        # Time spent waiting for the semaphore counts against the deadline too
+        return asyncio.run_coroutine_threadsafe(
+            run_with_deadline(self._run(operation, kwargs), deadline), self._loop)
+
+    def shutdown(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+# Per-process state for ProcessPoolEngine workers
+_process_loop = None
+_process_graph = None
+
+def _init_process_worker(settings, state_dir, interactive_login, transport):
+    global _process_loop, _process_graph
+    logging.basicConfig(level=logging.INFO)
+    _process_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_process_loop)
+    # Device codes and tokens go through the shared state dir, so the parent
+    # sees logins started by any worker process
+    credential = create_credential(settings, SharedDeviceCodeState(state_dir), state_dir, interactive_login)
+    _process_graph = Graph(settings, credential, transport)
+
+def _run_in_process(operation, kwargs, deadline):
+    return _process_loop.run_until_complete(
+        run_with_deadline(getattr(_process_graph, operation)(**kwargs), deadline))
+
+class ProcessPoolEngine(GraphEngine):
+    """Process pool; every worker process owns an event loop and a Graph client"""
+    name = 'process'
+
+    def start(self):
+        context = multiprocessing.get_context('spawn')
+        self._executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=context,
+            initializer=_init_process_worker,
+            # SectionProxy lowercases keys and cannot be pickled, so send a plain dict
+            initargs=({key: self.settings[key] for key in ('clientId', 'tenantId', 'graphUserScopes')},
+                      self.state_dir, self.interactive_login, self.transport)
+        )
+
+    def _submit(self, operation, kwargs, deadline):
+        return self._executor.submit(_run_in_process, operation, kwargs, deadline)
+
+    def transport_stats(self):
+        # Counted inside the worker processes, which report nothing back
+        return None
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+ENGINES = {
+    ThreadedEngine.name: ThreadedEngine,
+    AsyncioEngine.name: AsyncioEngine,
+    ProcessPoolEngine.name: ProcessPoolEngine,
+}
+
+def create_engine(name, settings: SectionProxy, max_workers=4, device_code_state: DeviceCodeState = None,
+                  state_dir=None, interactive_login=True, max_queued=None, max_queue_wait=None,
+                  transport: TransportSettings = None):
+    """Build and start the engine registered under ``name``. max_queued=None queues without limit."""
+    try:
+        engine_class = ENGINES[name]
+    except KeyError:
+        raise ValueError(f"Unknown engine '{name}'. Choose one of: {', '.join(ENGINES)}")
+
+    engine = engine_class(settings, max_workers=max_workers, device_code_state=device_code_state,
+                          state_dir=state_dir, interactive_login=interactive_login,
+                          max_queued=max_queued, max_queue_wait=max_queue_wait, transport=transport)
+    engine.start()
+    logger.info(f"Started '{name}' Graph engine with {max_workers} workers")
+    return engine
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+"""HTTP transport for the Graph clients.
+
+Left alone, GraphServiceClient sends every request through one httpx client
+that the SDK creates at import time with default limits. This module builds
+one client per Graph instance, so per event loop, with settings from the
+``[transport]`` section of config.cfg:
+
+```ini
+[transport]
+http2 = true               # multiplex concurrent calls over one connection
+maxConnections = 20
+maxKeepaliveConnections = 10
+keepaliveExpirySeconds = 30
+connectTimeoutSeconds = 5
+readTimeoutSeconds = 60
+prewarm = true             # open connections to graph.microsoft.com at startup
+```
+
+Every request carries an httpcore trace callback that records whether it
+needed a new TCP connection, so the reuse rate can be compared with the
+engine's concurrency when tuning the pool.
+"""
+
+import importlib.util
+import logging
+import threading
+
+# httpx needs h2 for HTTP/2. Only look for it: importing httpx and the SDK is
+# left to create_http_client so the service starts without waiting for them.
+HTTP2_AVAILABLE = importlib.util.find_spec('h2') is not None
+
+logger = logging.getLogger(__name__)
+
+GRAPH_BASE_URL = 'https://graph.microsoft.com/v1.0'
+
+class TransportSettings:
+    """Plain attributes so the settings can be sent to process-engine workers"""
+
+    def __init__(self, http2=True, max_connections=20, max_keepalive_connections=10, keepalive_expiry=30.0,
+                 connect_timeout=5.0, read_timeout=60.0, prewarm=True):
+        if http2 and not HTTP2_AVAILABLE:
+            logger.warning("HTTP/2 requested but the h2 package is not installed; using HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.prewarm = prewarm
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            http2=config.getboolean('transport', 'http2', fallback=True),
+            max_connections=config.getint('transport', 'maxConnections', fallback=20),
+            max_keepalive_connections=config.getint('transport', 'maxKeepaliveConnections', fallback=10),
+            keepalive_expiry=config.getfloat('transport', 'keepaliveExpirySeconds', fallback=30.0),
+            connect_timeout=config.getfloat('transport', 'connectTimeoutSeconds', fallback=5.0),
+            read_timeout=config.getfloat('transport', 'readTimeoutSeconds', fallback=60.0),
+            prewarm=config.getboolean('transport', 'prewarm', fallback=True)
+        )
+
+    def describe(self):
+        return {
+            "http2": self.http2,
+            "maxConnections": self.max_connections,
+            "maxKeepaliveConnections": self.max_keepalive_connections,
+            "keepaliveExpirySeconds": self.keepalive_expiry,
+            "connectTimeoutSeconds": self.connect_timeout,
+            "readTimeoutSeconds": self.read_timeout
+        }
+
+class TransportStats:
+    """Connection reuse counters for every Graph client in this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.http_versions = {}
+
+    async def trace(self, event_name, info):
+        # httpcore reports a TCP connect only when the pool had no usable connection
+        if event_name == 'connection.connect_tcp.started':
+            with self._lock:
+                self.new_connections += 1
+
+    async def on_request(self, request):
+        request.extensions['trace'] = self.trace
+        with self._lock:
+            self.requests += 1
+
+    async def on_response(self, response):
+        with self._lock:
+            self.http_versions[response.http_version] = self.http_versions.get(response.http_version, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            reused = max(self.requests - self.new_connections, 0)
+            return {
+                "requests": self.requests,
+                "newConnections": self.new_connections,
+                "reuseRate": (reused / self.requests) if self.requests else None,
+                "httpVersions": dict(self.http_versions)
+            }
+
+transport_stats = TransportStats()
+
+def create_http_client(settings: TransportSettings = None):
+    """httpx client for one Graph instance, with the SDK's default middleware on top"""
+    import httpx
+    from msgraph_core import GraphClientFactory
+
+    settings = settings or TransportSettings()
+    client = httpx.AsyncClient(
+        base_url=GRAPH_BASE_URL,
+        http2=settings.http2,
+        limits=httpx.Limits(max_connections=settings.max_connections,
+                            max_keepalive_connections=settings.max_keepalive_connections,
+                            keepalive_expiry=settings.keepalive_expiry),
+        timeout=httpx.Timeout(settings.read_timeout, connect=settings.connect_timeout),
+        event_hooks={'request': [transport_stats.on_request], 'response': [transport_stats.on_response]}
+    )
+    return GraphClientFactory.create_with_default_middleware(client=client)
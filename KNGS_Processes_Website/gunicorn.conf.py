@@ -0,0 +1,45 @@
+# Gunicorn settings for the production email service.
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Values can be overridden in config.cfg under [production].
+
+import configparser
+import os
+
+_config = configparser.ConfigParser()
+_config.read(['config.cfg', 'config.dev.cfg'])
+
+def _setting(name, fallback):
+    return os.environ.get(f"EMAIL_SERVICE_{name.upper()}", _config.get('production', name, fallback=str(fallback)))
+
+bind = f"127.0.0.1:{_config.getint('service', 'port', fallback=5002)}"
+workers = int(_setting('workers', 2))
+
+# Routes block on Graph calls, so each worker serves requests from a thread pool
+worker_class = 'gthread'
+threads = int(_setting('threads', 8))
+
+# Import Flask and the Graph SDK once in the master and share them copy-on-write
+preload_app = True
+
+# Recycle workers periodically so slow leaks cannot accumulate
+max_requests = int(_setting('maxRequests', 1000))
+max_requests_jitter = int(_setting('maxRequestsJitter', 100))
+
+# Logins run as background jobs; this only has to cover a slow Graph search (180s)
+timeout = int(_setting('timeout', 240))
+graceful_timeout = 30
+
+def when_ready(server):
+    # Same readiness line as email_service.main(); the master is listening by now
+    import email_service
+    print(f"{email_service.READY_MARKER} port={bind.rsplit(':', 1)[1]}", flush=True)
+
+def post_fork(server, worker):
+    import email_service
+    email_service.init_service()
+
+def worker_exit(server, worker):
+    import email_service
+    email_service.shutdown_engine()
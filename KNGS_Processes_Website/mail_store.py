@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+"""Local copy of recent inbox messages for correlation against the workbook.
+
+Answering questions about the whole sheet (which tickets or employees have
+mail) with one Graph $search per row does not scale. Instead the inbox is
+synced incrementally into a SQLite database in the service state directory,
+shared by every worker process like the result cache, and the matchers scan
+that copy locally.
+"""
+
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+def graph_datetime(iso_value):
+    """Format a stored ISO timestamp the way a Graph $filter expects it"""
+    value = datetime.datetime.fromisoformat(iso_value)
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+class MailStore:
+    """Synced inbox messages in a WAL-mode SQLite file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS messages (
+                id TEXT PRIMARY KEY,
+                subject TEXT,
+                preview TEXT,
+                from_name TEXT,
+                from_address TEXT,
+                received TEXT,
+                is_read INTEGER,
+                has_attachments INTEGER)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS messages_received ON messages (received)")
+            conn.execute("""CREATE TABLE IF NOT EXISTS sync_state (
+                name TEXT PRIMARY KEY,
+                value TEXT)""")
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def upsert(self, messages):
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(m['id'], m['subject'], m['bodyPreview'], m['from']['name'], m['from']['address'],
+                  m['receivedDateTime'], int(bool(m['isRead'])), int(bool(m['hasAttachments'])))
+                 for m in messages])
+            conn.execute("INSERT OR REPLACE INTO sync_state VALUES ('lastSync', ?)", (str(time.time()),))
+            conn.execute("INSERT OR REPLACE INTO sync_state VALUES ('version', "
+                         "COALESCE((SELECT value FROM sync_state WHERE name = 'version'), 0) + 1)")
+
+    def version(self):
+        """Increases on every sync that stored messages; lets matchers know their index is stale"""
+        row = self._connect().execute("SELECT value FROM sync_state WHERE name = 'version'").fetchone()
+        return int(row[0]) if row else 0
+
+    def latest_received(self):
+        row = self._connect().execute("SELECT MAX(received) FROM messages").fetchone()
+        return row[0]
+
+    def count(self):
+        return self._connect().execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+    def iter_messages(self):
+        """Yield (id, subject, preview) for every stored message"""
+        yield from self._connect().execute("SELECT id, subject, preview FROM messages")
+
+    def get_messages(self, message_ids):
+        """Full message dicts, in the shape the UI uses, newest first"""
+        if not message_ids:
+            return []
+        conn = self._connect()
+        messages = []
+        ids = list(message_ids)
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = conn.execute(f"SELECT * FROM messages WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+            for row in rows:
+                messages.append({
+                    "id": row[0],
+                    "subject": row[1],
+                    "bodyPreview": row[2],
+                    "from": {"name": row[3], "address": row[4]},
+                    "receivedDateTime": row[5],
+                    "isRead": bool(row[6]),
+                    "hasAttachments": bool(row[7])
+                })
+        messages.sort(key=lambda m: m['receivedDateTime'] or '', reverse=True)
+        return messages
+
+    def describe(self):
+        row = self._connect().execute("SELECT value FROM sync_state WHERE name = 'lastSync'").fetchone()
+        return {
+            "messages": self.count(),
+            "latestReceived": self.latest_received(),
+            "lastSync": float(row[0]) if row else None,
+            "version": self.version(),
+            "path": self.path
+        }
+
+def sync_mailbox(engine, store: MailStore, max_messages=1000, timeout=180):
+    """Pull messages received since the newest stored one, oldest first. Returns (fetched, more_available).
+
+    A capped sync stores the oldest max_messages of the backlog, so the next
+    one picks up right after them and repeated syncs fill the whole gap.
+    """
+    latest = store.latest_received()
+    result = engine.call('sync_messages', timeout=timeout,
+                         received_after=graph_datetime(latest) if latest else None,
+                         max_messages=max_messages)
+    messages = result['messages']
+    if result['hasMore'] and messages:
+        # The next cursor is "received after the newest stored message", so leave out the
+        # messages sharing its timestamp: ones the cap cut off would never be fetched
+        last = messages[-1]['receivedDateTime']
+        trimmed = [m for m in messages if m['receivedDateTime'] != last]
+        messages = trimmed or messages
+    if messages:
+        store.upsert(messages)
+    logger.info(f"Mail sync stored {len(messages)} messages (more available: {result['hasMore']})")
+    return len(messages), result['hasMore']
+
+def create_mail_store(config, state_dir):
+    path = config.get('mail', 'path', fallback=os.path.join(state_dir, 'mail.sqlite3'))
+    return MailStore(path)
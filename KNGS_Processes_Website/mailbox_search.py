@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+
+"""Employee searches across the signed-in user's mailbox and shared mailboxes.
+
+Onboarding mail does not all land in one inbox: team shared mailboxes
+(HR onboarding, IT provisioning) hold much of it. ``[mailboxes] targets``
+lists the mailboxes to search: ``me`` for the signed-in user's own, and a
+user id or UPN for every other one, read through ``/users/{id}/`` with the
+user's delegated access (add ``Mail.Read.Shared`` to graphUserScopes).
+
+A search runs against every target at once and the results are merged,
+newest first, with mail delivered to several mailboxes listed once. Graph
+throttles per mailbox, so each mailbox has its own limit: at most
+``concurrency`` calls against one mailbox run at a time in this process,
+whichever route, report or pre-warm they come from. Each mailbox's result is
+cached under its own key, and a mailbox that fails is reported next to the
+results of the others instead of failing the whole search.
+
+```ini
+[mailboxes]
+targets = me, hr-onboarding@contoso.com, it-provisioning@contoso.com
+concurrency = 2
+```
+"""
+
+import concurrent.futures
+import threading
+import time
+
+from graph import ME
+
+DEFAULT_CONCURRENCY = 2
+
+def mailbox_targets(config):
+    """Configured mailboxes in order, without duplicates; just the user's own when none are set"""
+    targets = []
+    for target in config.get('mailboxes', 'targets', fallback=ME).split(','):
+        target = target.strip()
+        if target.lower() == ME:
+            target = ME
+        if target and target.lower() not in (t.lower() for t in targets):
+            targets.append(target)
+    return targets or [ME]
+
+def error_details(error):
+    details = str(error)
+    if type(error).__name__ == 'ODataError' and getattr(error, 'error', None):
+        details = f"Code: {error.error.code}, Message: {error.error.message}"
+    return {"type": type(error).__name__, "details": details}
+
+def merge_results(results, count):
+    """Merge (mailbox, result) pairs into one list of at most count emails, newest first.
+
+    Returns (emails, truncated). Every email gets the first mailbox it was found
+    in as ``mailbox`` (its id belongs to that mailbox) and all of them as
+    ``mailboxes``.
+    """
+    merged = {}
+    for mailbox, result in results:
+        for email in result['emails']:
+            key = email.get('internetMessageId') or (mailbox, email['id'])
+            if key in merged:
+                merged[key]['mailboxes'].append(mailbox)
+            else:
+                merged[key] = dict(email, mailbox=mailbox, mailboxes=[mailbox])
+    emails = sorted(merged.values(), key=lambda e: e['receivedDateTime'] or '', reverse=True)
+    return emails[:count], len(emails) > count
+
+class MailboxSearch:
+    """Fans one employee search out to every target mailbox.
+
+    search(employee_name, count, mailbox, refresh) runs one mailbox's search
+    and returns (result, cache_tier) like ResultCache.get_or_compute.
+    """
+
+    def __init__(self, search, targets, concurrency=DEFAULT_CONCURRENCY):
+        self.search = search
+        self.targets = list(targets)
+        self.concurrency = concurrency
+        self._limits = {mailbox: threading.BoundedSemaphore(concurrency) for mailbox in self.targets}
+        self._pool = None
+        if len(self.targets) > 1:
+            self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=len(self.targets) * concurrency,
+                                                               thread_name_prefix='mailbox-search')
+        self._stats_lock = threading.Lock()
+        self._stats = {mailbox: {"calls": 0, "failures": 0, "running": 0, "totalSeconds": 0.0,
+                                 "totalWaitSeconds": 0.0} for mailbox in self.targets}
+
+    def _search_one(self, mailbox, employee_name, count, refresh, deadline, started):
+        """Search one mailbox once a slot for it is free; returns (result, tier, wait seconds, seconds).
+
+        The wait runs from started, when the search was queued, so time spent
+        behind other searches in the pool counts as well.
+        """
+        if not self._limits[mailbox].acquire(timeout=max(deadline - time.time(), 0)):
+            self._record(mailbox, started, started, failed=True)
+            raise concurrent.futures.TimeoutError(f"No free search slot for mailbox {mailbox}")
+        searching = time.perf_counter()
+        with self._stats_lock:
+            self._stats[mailbox]['running'] += 1
+        try:
+            result, tier = self.search(employee_name, count, mailbox, refresh)
+        except Exception:
+            self._record(mailbox, started, searching, failed=True)
+            raise
+        finally:
+            with self._stats_lock:
+                self._stats[mailbox]['running'] -= 1
+            self._limits[mailbox].release()
+        self._record(mailbox, started, searching)
+        return result, tier, searching - started, time.perf_counter() - searching
+
+    def _record(self, mailbox, started, searching, failed=False):
+        with self._stats_lock:
+            stats = self._stats[mailbox]
+            stats['calls'] += 1
+            stats['totalWaitSeconds'] += searching - started
+            stats['totalSeconds'] += time.perf_counter() - started
+            if failed:
+                stats['failures'] += 1
+
+    def run(self, employee_name, count, refresh=False, timeout=180):
+        """Search every target; returns (merged result, cache tier or None when any mailbox missed).
+
+        Raises the first mailbox's error when every mailbox failed, so the
+        route can still answer 401/202/503 as for a single search.
+        """
+        started = time.perf_counter()
+        deadline = time.time() + timeout
+        if self._pool is None:
+            outcomes = [(self.targets[0], self._outcome(
+                lambda: self._search_one(self.targets[0], employee_name, count, refresh, deadline, started)))]
+        else:
+            futures = [(mailbox, self._pool.submit(self._search_one, mailbox, employee_name, count, refresh,
+                                                   deadline, started))
+                       for mailbox in self.targets]
+            outcomes = [(mailbox, self._outcome(lambda: future.result(timeout=max(deadline - time.time(), 0)),
+                                                future))
+                        for mailbox, future in futures]
+
+        results = []
+        reports = []
+        errors = []
+        tiers = set()
+        for mailbox, (value, error) in outcomes:
+            if error is not None:
+                errors.append(error)
+                reports.append({"mailbox": mailbox, "error": error_details(error)})
+                continue
+            result, tier, wait_seconds, seconds = value
+            results.append((mailbox, result))
+            tiers.add(tier)
+            reports.append({"mailbox": mailbox, "count": len(result['emails']), "hasMore": result.get('hasMore'),
+                            "cache": tier or 'miss', "seconds": seconds, "waitSeconds": wait_seconds})
+        if not results:
+            raise errors[0]
+
+        emails, truncated = merge_results(results, count)
+        merged = {
+            "emails": emails,
+            "employeeName": employee_name,
+            "hasMore": truncated or any(result.get('hasMore') for _, result in results),
+            "mailboxes": reports,
+            "partial": bool(errors),
+            "seconds": time.perf_counter() - started
+        }
+        return merged, (tiers.pop() if len(tiers) == 1 and not errors else None)
+
+    @staticmethod
+    def _outcome(get, future=None):
+        """(value, None) or (None, error) for one mailbox"""
+        try:
+            return get(), None
+        except Exception as e:
+            if future is not None:
+                future.cancel()  # still queued behind other searches: nobody will read it
+            return None, e
+
+    def stats(self):
+        with self._stats_lock:
+            mailboxes = {
+                mailbox: {
+                    "calls": stats['calls'],
+                    "failures": stats['failures'],
+                    "running": stats['running'],
+                    "averageSeconds": stats['totalSeconds'] / stats['calls'] if stats['calls'] else 0.0,
+                    "averageWaitSeconds": stats['totalWaitSeconds'] / stats['calls'] if stats['calls'] else 0.0
+                }
+                for mailbox, stats in self._stats.items()
+            }
+        return {"targets": self.targets, "concurrencyPerMailbox": self.concurrency, "mailboxes": mailboxes}
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+
+"""Heap snapshots and live-object counts for /api/debug/memory.
+
+The service creates event loops, executors, httpx clients and Graph SDK
+objects in several places (one Graph client per engine worker, one loop per
+worker thread or process). A slow leak shows up as one of those counts
+growing with traffic, or as an allocation site whose size keeps climbing
+between two snapshots. This module only observes; tracing is off until
+someone starts it, because tracemalloc slows every allocation.
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import gc
+import itertools
+import linecache
+import os
+import re
+import threading
+import time
+import tracemalloc
+
+# Snapshots kept for diffing; the oldest is dropped first
+MAX_SNAPSHOTS = 5
+# Objects counted by class name, so their modules need not be imported here
+TRACKED_CLASSES = ('Graph', 'GraphServiceClient', 'GraphRequestAdapter', 'AzureIdentityAuthenticationProvider',
+                   'AsyncClient', 'SharedCredential', 'DeviceCodeCredential', 'Future', 'Task')
+GROUPINGS = ('lineno', 'filename', 'traceback')
+
+def format_stat(stat, group_by):
+    frame = stat.traceback[0]
+    entry = {
+        "file": frame.filename,
+        "line": frame.lineno,
+        "sizeKB": stat.size / 1024,
+        "count": stat.count
+    }
+    if group_by == 'lineno':
+        entry["code"] = linecache.getline(frame.filename, frame.lineno).strip()
+    if group_by == 'traceback':
+        entry["traceback"] = [f"{f.filename}:{f.lineno}" for f in stat.traceback]
+    return entry
+
+def format_diff(stat, group_by):
+    return dict(format_stat(stat, group_by), sizeDiffKB=stat.size_diff / 1024, countDiff=stat.count_diff)
+
+def object_counts():
+    """Live threads, event loops, executors and Graph/HTTP client objects in this process"""
+    threads = collections.Counter()
+    for thread in threading.enumerate():
+        # Group numbered threads: "Thread-7 (process_request_thread)" -> "Thread-N (process_request_thread)"
+        threads[re.sub(r'\d+', 'N', thread.name)] += 1
+
+    loops = {"running": 0, "closed": 0, "idle": 0}
+    executors = collections.Counter()
+    classes = collections.Counter()
+    objects = gc.get_objects()
+    for obj in objects:
+        if isinstance(obj, asyncio.AbstractEventLoop):
+            loops["running" if obj.is_running() else "closed" if obj.is_closed() else "idle"] += 1
+        elif isinstance(obj, concurrent.futures.Executor):
+            executors[type(obj).__name__] += 1
+        name = type(obj).__name__
+        if name in TRACKED_CLASSES:
+            classes[f"{type(obj).__module__}.{name}"] += 1
+    return {
+        "threads": dict(threads, total=threading.active_count()),
+        "eventLoops": loops,
+        "executors": dict(executors),
+        "objects": dict(classes),
+        "gcObjects": len(objects)
+    }
+
+class MemoryDebugger:
+    """Starts and stops tracemalloc, and keeps a few numbered snapshots for diffs"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshots = collections.OrderedDict()
+        self._ids = itertools.count(1)
+        self.started_at = None
+
+    def start(self, frames=1):
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+                self.started_at = time.time()
+        return self.status()
+
+    def stop(self):
+        with self._lock:
+            tracemalloc.stop()
+            self._snapshots.clear()
+            self.started_at = None
+        return self.status()
+
+    def _take(self):
+        snapshot = tracemalloc.take_snapshot()
+        # Leave out tracemalloc's own bookkeeping and the import machinery
+        return snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, os.path.join('*', 'linecache.py')),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+            tracemalloc.Filter(False, '<unknown>'),
+        ))
+
+    def top(self, group_by='lineno', limit=20, keep=False):
+        """Top allocation sites right now; keep=True also stores the snapshot for diff()"""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running; start it first")
+        snapshot = self._take()
+        snapshot_id = None
+        if keep:
+            with self._lock:
+                snapshot_id = next(self._ids)
+                self._snapshots[snapshot_id] = (time.time(), snapshot)
+                while len(self._snapshots) > MAX_SNAPSHOTS:
+                    self._snapshots.popitem(last=False)
+        stats = snapshot.statistics(group_by)
+        return {
+            "snapshotId": snapshot_id,
+            "groupBy": group_by,
+            "totalKB": sum(stat.size for stat in stats) / 1024,
+            "top": [format_stat(stat, group_by) for stat in stats[:limit]]
+        }
+
+    def diff(self, first_id, second_id=None, group_by='lineno', limit=20):
+        """Allocation growth from snapshot first_id to second_id, or to a new snapshot when omitted"""
+        with self._lock:
+            first = self._snapshots.get(first_id)
+            second = self._snapshots.get(second_id) if second_id is not None else None
+        if first is None or (second_id is not None and second is None):
+            raise KeyError(second_id if first is not None else first_id)
+        if second is None:
+            second = (time.time(), self._take())
+        stats = second[1].compare_to(first[1], group_by)
+        return {
+            "from": first_id,
+            "to": second_id,
+            "seconds": second[0] - first[0],
+            "groupBy": group_by,
+            "sizeDiffKB": sum(stat.size_diff for stat in stats) / 1024,
+            "top": [format_diff(stat, group_by) for stat in stats[:limit]]
+        }
+
+    def status(self):
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        with self._lock:
+            snapshots = [{"snapshotId": snapshot_id, "taken": taken}
+                         for snapshot_id, (taken, _) in self._snapshots.items()]
+        return {
+            "tracing": tracing,
+            "frames": tracemalloc.get_traceback_limit() if tracing else None,
+            "startedAt": self.started_at,
+            "tracedKB": current / 1024,
+            "tracedPeakKB": peak / 1024,
+            "snapshots": snapshots
+        }
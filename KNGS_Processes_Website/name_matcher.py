@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+"""Attribute synced messages to employees with one Aho-Corasick pass.
+
+Finding which employees have mail used to take one Graph $search per name.
+Here every employee name in the sheet, plus a few normalized variants, goes
+into a single Aho-Corasick automaton. Each message is then scanned once and
+linked to every employee it mentions. The cost grows with the size of the
+mailbox, not with the number of names.
+"""
+
+import collections
+import logging
+import re
+import time
+
+from employee_search import normalize_name
+
+logger = logging.getLogger(__name__)
+
+# Names shorter than this match too much ordinary text
+MIN_NAME_LENGTH = 4
+
+def name_variants(name):
+    """Normalized spellings of a name that should count as a mention"""
+    key = normalize_name(name)
+    variants = {key}
+    if ',' in key:
+        # "Smith, John" is written "John Smith" in mail
+        last, _, first = key.partition(',')
+        key = normalize_name(f"{first} {last}")
+        variants.add(key)
+    words = key.split(' ')
+    if len(words) > 2:
+        # Drop middle names: "John Michael Smith" -> "John Smith"
+        variants.add(f"{words[0]} {words[-1]}")
+    return {v for v in variants if len(v) >= MIN_NAME_LENGTH}
+
+class AhoCorasick:
+    """Multi-pattern matcher: finds every occurrence of every pattern in one pass over the text"""
+
+    def __init__(self, patterns):
+        # State 0 is the root; goto[state] maps a character to the next state
+        self.goto = [{}]
+        self.fail = [0]
+        self.outputs = [[]]
+        for pattern_id, pattern in enumerate(patterns):
+            state = 0
+            for char in pattern:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.outputs.append([])
+                state = next_state
+            self.outputs[state].append((pattern_id, len(pattern)))
+
+        # Breadth-first so a state's failure target is finished before its children
+        queue = collections.deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[child] = target if target != child else 0
+                self.outputs[child].extend(self.outputs[self.fail[child]])
+
+    def iter_matches(self, text):
+        """Yield (pattern_id, start, end) for every match in text"""
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern_id, length in outputs[state]:
+                yield pattern_id, position - length + 1, position + 1
+
+class NameMatcher:
+    """Finds the employees mentioned in free text"""
+
+    WORD_CHAR = re.compile(r'\w')
+
+    def __init__(self, employees):
+        patterns = []
+        self.owners = []  # pattern id -> employee key
+        self.names = {}   # employee key -> display name
+        for employee in employees:
+            key = normalize_name(employee['name'])
+            self.names[key] = employee['name']
+            for variant in name_variants(employee['name']):
+                patterns.append(variant)
+                self.owners.append(key)
+        self.automaton = AhoCorasick(patterns)
+
+    def find(self, text):
+        """Employee keys whose name appears in text as whole words"""
+        if not text:
+            return set()
+        text = ' '.join(text.split()).casefold()
+        found = set()
+        for pattern_id, start, end in self.automaton.iter_matches(text):
+            if start > 0 and self.WORD_CHAR.match(text[start - 1]):
+                continue
+            if end < len(text) and self.WORD_CHAR.match(text[end]):
+                continue
+            found.add(self.owners[pattern_id])
+        return found
+
+class NameAttribution:
+    """Precomputed employee -> message ids index for one workbook and one version of the mailbox"""
+
+    def __init__(self, workbook, mail_store):
+        started = time.perf_counter()
+        self.workbook_id = workbook.id
+        self.mail_version = mail_store.version()
+        self.matcher = NameMatcher(workbook.employees)
+        self.index = {}
+        scanned = 0
+        for message_id, subject, preview in mail_store.iter_messages():
+            scanned += 1
+            for key in self.matcher.find(f"{subject or ''}\n{preview or ''}"):
+                self.index.setdefault(key, []).append(message_id)
+        self.messages_scanned = scanned
+        self.build_seconds = time.perf_counter() - started
+        logger.info(f"Attributed {scanned} messages to {len(self.matcher.names)} employees: "
+                    f"{len(self.index)} employees have mail ({self.build_seconds:.2f}s)")
+
+    @classmethod
+    def from_snapshot(cls, workbook, data):
+        """Rebuild from to_snapshot() output without rescanning the mailbox"""
+        attribution = cls.__new__(cls)
+        attribution.workbook_id = workbook.id
+        attribution.mail_version = data['mailVersion']
+        attribution.matcher = NameMatcher(workbook.employees)
+        attribution.index = data['index']
+        attribution.messages_scanned = data['messagesScanned']
+        attribution.build_seconds = 0.0
+        return attribution
+
+    def to_snapshot(self):
+        return {"workbookId": self.workbook_id, "mailVersion": self.mail_version,
+                "messagesScanned": self.messages_scanned, "index": self.index}
+
+    def messages_for(self, employee_name):
+        return self.index.get(normalize_name(employee_name), [])
+
+    def summary(self):
+        return {
+            "workbookId": self.workbook_id,
+            "mailVersion": self.mail_version,
+            "messagesScanned": self.messages_scanned,
+            "employeesWithMail": len(self.index),
+            "buildSeconds": self.build_seconds,
+            "employees": {self.matcher.names[key]: len(ids) for key, ids in self.index.items()}
+        }
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+
+"""Background pre-warming of employee searches.
+
+After a workbook upload or a login, the scheduler walks the sheet's employees
+and runs their searches through the result cache, so the first "Check
+Progress" click is a cache hit. It is deliberately polite:
+
+* one search at a time, on one background thread
+* it pauses while interactive requests have arrived in the last idleSeconds
+* it spends at most ``budget`` Graph requests per ``budgetWindowSeconds``;
+  searches that are already cached cost nothing, and a search across several
+  mailboxes costs one request per mailbox that missed the cache
+* it only runs while the service is signed in, so it never starts a device
+  code login by itself
+"""
+
+import collections
+import logging
+import threading
+import time
+
+from employee_search import normalize_name
+
+logger = logging.getLogger(__name__)
+
+def prewarm_order(workbook):
+    """Employees on rows changed by the last upload first, then the newest rows (bottom of the sheet)"""
+    changed = workbook.diff.changed_employees if workbook.diff else {}
+    employees = sorted(workbook.employees, key=lambda e: e['rowIndex'], reverse=True)
+    first = [e['name'] for e in employees if normalize_name(e['name']) in changed]
+    rest = [e['name'] for e in employees if normalize_name(e['name']) not in changed]
+    return first + rest
+
+class PrewarmScheduler:
+    """warm(name) must run one search through the cache and return how many Graph requests it made.
+
+    A warm that raises is charged failure_cost requests, the most one search can make.
+    """
+
+    def __init__(self, warm, can_run, budget=200, window=3600, idle_seconds=5, failure_cost=1):
+        self.warm = warm
+        self.failure_cost = failure_cost
+        self.can_run = can_run
+        self.budget = budget
+        self.window = window
+        self.idle_seconds = idle_seconds
+        self._queue = collections.deque()
+        self._spent = collections.deque()  # monotonic times of Graph calls inside the window
+        self._last_interactive = 0.0
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.warmed = 0
+        self.already_cached = 0
+        self.failed = 0
+        self.paused_for_traffic = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='prewarm', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def schedule(self, employee_names):
+        """Replace the queue with employee_names, in priority order"""
+        with self._lock:
+            self._queue = collections.deque(dict.fromkeys(employee_names))
+        logger.info(f"Pre-warm scheduled {len(self._queue)} employees")
+        self._wake.set()
+
+    def wake(self):
+        self._wake.set()
+
+    def note_interactive(self):
+        self._last_interactive = time.monotonic()
+
+    def _budget_wait(self):
+        """Seconds until another Graph call fits in the budget, 0 if it fits now"""
+        now = time.monotonic()
+        while self._spent and now - self._spent[0] >= self.window:
+            self._spent.popleft()
+        if len(self._spent) < self.budget:
+            return 0
+        return self.window - (now - self._spent[0])
+
+    def _spend(self, requests):
+        now = time.monotonic()
+        self._spent.extend([now] * requests)
+
+    def _next_pause(self):
+        """Seconds to wait before the next search, or None to go ahead"""
+        idle_for = time.monotonic() - self._last_interactive
+        if idle_for < self.idle_seconds:
+            self.paused_for_traffic += 1
+            return self.idle_seconds - idle_for
+        if not self.can_run():
+            return 30
+        budget_wait = self._budget_wait()
+        return budget_wait or None
+
+    def _run(self):
+        while not self._stopped.is_set():
+            with self._lock:
+                name = self._queue[0] if self._queue else None
+            if name is None:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+
+            pause = self._next_pause()
+            if pause is not None:
+                self._wake.wait(timeout=pause)
+                self._wake.clear()
+                continue
+
+            with self._lock:
+                if not self._queue or self._queue[0] != name:
+                    continue  # rescheduled while we were deciding
+                self._queue.popleft()
+            try:
+                requests = self.warm(name)
+                if requests:
+                    self._spend(requests)
+                    self.warmed += 1
+                else:
+                    self.already_cached += 1
+            except Exception as e:
+                self._spend(self.failure_cost)
+                self.failed += 1
+                logger.warning(f"Pre-warm search failed for {name}: {e}")
+
+    def stats(self):
+        with self._lock:
+            queued = len(self._queue)
+        return {
+            "queued": queued,
+            "warmed": self.warmed,
+            "alreadyCached": self.already_cached,
+            "failed": self.failed,
+            "pausedForTraffic": self.paused_for_traffic,
+            "budget": self.budget,
+            "budgetWindowSeconds": self.window,
+            "budgetRemaining": max(self.budget - len(self._spent), 0),
+            "idleSeconds": self.idle_seconds
+        }
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+"""Bulk progress report: email evidence for every employee in a workbook.
+
+Searches run on a small thread pool with a bounded number in flight, and
+report rows are produced in workbook order as soon as each search finishes.
+Nothing holds the whole report in memory: CSV is streamed to the client row
+by row, and XLSX rows go through openpyxl's write-only mode, which spools
+them to a temporary file that is streamed out once the sheet is closed.
+"""
+
+import collections
+import concurrent.futures
+import csv
+import io
+import logging
+import os
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+REPORT_COLUMNS = ['Employee', 'Ticket #', 'Row', 'Emails Found', 'Unread', 'With Attachments',
+                  'Latest Email', 'Latest Subject', 'Latest From', 'More Available', 'Cache', 'Error']
+CHUNK_SIZE = 64 * 1024
+# Spreadsheet apps read a cell starting with one of these as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+def csv_cell(value):
+    """Subjects, senders and names come from mail and the workbook; keep them from running as formulas"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+def report_row(employee, result=None, tier=None, error=None):
+    if error is not None:
+        return [employee['name'], employee['ticketNumber'], employee['rowIndex'],
+                '', '', '', '', '', '', '', '', error]
+
+    emails = result['emails']
+    latest = max(emails, key=lambda e: e['receivedDateTime'] or '') if emails else None
+    return [
+        employee['name'],
+        employee['ticketNumber'],
+        employee['rowIndex'],
+        len(emails),
+        sum(1 for e in emails if not e['isRead']),
+        sum(1 for e in emails if e['hasAttachments']),
+        latest['receivedDateTime'] if latest else '',
+        latest['subject'] if latest else '',
+        latest['from']['address'] if latest else '',
+        'yes' if result.get('hasMore') else 'no',
+        tier or 'miss',
+        # A partial search still counts what the other mailboxes returned
+        '; '.join(f"{m['mailbox']}: {m['error']['details']}" for m in result.get('mailboxes', []) if 'error' in m)
+    ]
+
+def gather_progress(employees, search, concurrency=4):
+    """Yield one report row per employee, in order, running up to concurrency searches at once.
+
+    search(employee_name) must return (result, cache_tier) like ResultCache.get_or_compute.
+    """
+    def run(employee):
+        try:
+            result, tier = search(employee['name'])
+            return report_row(employee, result, tier)
+        except Exception as e:
+            logger.warning(f"Progress report: search failed for {employee['name']}: {e}")
+            return report_row(employee, error=f"{type(e).__name__}: {e}")
+
+    # Only a window of futures is kept, so memory does not grow with the sheet
+    window = concurrency * 2
+    pending = collections.deque()
+    employees = iter(employees)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency,
+                                               thread_name_prefix='progress-report') as pool:
+        try:
+            for employee in employees:
+                pending.append(pool.submit(run, employee))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # The client went away; don't start searches nobody will read
+            for future in pending:
+                future.cancel()
+
+def csv_stream(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(REPORT_COLUMNS)
+    for row in rows:
+        writer.writerow([csv_cell(value) for value in row])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def xlsx_stream(rows, sheet_name='Progress'):
+    from openpyxl import Workbook  # slow to import; most reports are CSV
+    from openpyxl.cell import WriteOnlyCell
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    sheet.append(REPORT_COLUMNS)
+
+    def xlsx_cell(value):
+        cell = WriteOnlyCell(sheet, value)
+        if cell.data_type == 'f':
+            cell.data_type = 's'  # openpyxl stores strings starting with '=' as formulas
+        return cell
+
+    for row in rows:
+        sheet.append([xlsx_cell(value) for value in row])
+
+    fd, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    try:
+        workbook.save(path)
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
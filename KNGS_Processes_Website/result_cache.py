@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+
+"""Two-tier cache for Graph results.
+
+* ``memory`` - an LRU inside the worker process, bounded by bytes
+* ``shared`` - a SQLite database in WAL mode that every worker process on the
+               host reads and writes, also bounded by bytes
+
+Lookups go memory -> shared -> compute. Values are JSON-serialisable dicts, so
+the shared tier can hand them to any worker. Shared rows are versioned twice:
+``SCHEMA_VERSION`` rejects rows written by an older layout, and a per-key
+version increases on every write. Invalidations, and writes that overwrite a
+key such as a refresh, are logged in the database so other workers drop the
+copies they still hold in their memory tier.
+"""
+
+import collections
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from graph import ME
+
+logger = logging.getLogger(__name__)
+
+# Bump when the shape of cached values changes; older rows are then ignored
+SCHEMA_VERSION = 3
+# Shared-tier hits only rewrite an entry's access time when it is older than this. The eviction
+# order stays roughly LRU, and reads no longer take the database's single write lock each time.
+ACCESS_RESOLUTION = 60
+
+class TierStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def as_dict(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hitRate": (self.hits / lookups) if lookups else 0.0
+        }
+
+class MemoryTier:
+    """Byte-bounded LRU of (version, expires_at, value) kept in this process"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.stats = TierStats()
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.time():
+                if entry is not None:
+                    self._drop(key)
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry
+
+    def put(self, key, version, expires_at, value, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (version, expires_at, value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.stats.evictions += 1
+
+    def discard(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+
+    def keys_with_prefix(self, prefixes):
+        with self._lock:
+            return [key for key in self._entries if key.startswith(prefixes)]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def entries(self):
+        """(key, version, expires_at, value, size) for every entry, least recently used first"""
+        with self._lock:
+            return [(key,) + entry for key, entry in self._entries.items()]
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry[3]
+
+    def describe(self):
+        with self._lock:
+            return dict(self.stats.as_dict(), entries=len(self._entries), bytes=self._bytes,
+                        maxBytes=self.max_bytes)
+
+class SQLiteTier:
+    """Byte-bounded cache in a WAL-mode SQLite file shared by all processes on the host"""
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.stats = TierStats()
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+        self._watch_conn = None
+        self._watch_version = None
+        self._watch_lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                schema INTEGER NOT NULL,
+                version INTEGER NOT NULL,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires REAL NOT NULL,
+                accessed REAL NOT NULL)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+            # Every invalidation is logged so other processes can drop their memory copies
+            conn.execute("""CREATE TABLE IF NOT EXISTS invalidations (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT NOT NULL)""")
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, hit):
+        with self._stats_lock:
+            if hit:
+                self.stats.hits += 1
+            else:
+                self.stats.misses += 1
+
+    def get(self, key):
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute("SELECT schema, version, value, expires, accessed FROM entries WHERE key = ?",
+                           (key,)).fetchone()
+        if row is None or row[0] != SCHEMA_VERSION or row[3] < now:
+            if row is not None:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._count(False)
+            return None
+        if now - row[4] > ACCESS_RESOLUTION:
+            conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        self._count(True)
+        return row[1], row[3], row[2]
+
+    def put(self, key, payload, expires_at):
+        """Store payload and return the new version number for key"""
+        conn = self._connect()
+        now = time.time()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT version FROM entries WHERE key = ?", (key,)).fetchone()
+            version = (row[0] + 1) if row else 1
+            conn.execute("""INSERT OR REPLACE INTO entries (key, schema, version, value, size, expires, accessed)
+                            VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                         (key, SCHEMA_VERSION, version, payload, len(payload), expires_at, now))
+            if row:
+                # An overwrite (a refresh) replaces a value other workers may still hold in memory
+                self._log_invalidations(conn, (key,))
+            self._evict(conn)
+        return version
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        while total > self.max_bytes:
+            row = conn.execute("SELECT key, size FROM entries ORDER BY accessed LIMIT 1").fetchone()
+            if row is None:
+                break
+            conn.execute("DELETE FROM entries WHERE key = ?", (row[0],))
+            total -= row[1]
+            with self._stats_lock:
+                self.stats.evictions += 1
+
+    def invalidate(self, keys):
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for key in keys:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._log_invalidations(conn, keys)
+
+    @staticmethod
+    def _log_invalidations(conn, keys):
+        for key in keys:
+            conn.execute("INSERT INTO invalidations (key) VALUES (?)", (key,))
+        # The log only needs to outlive the memory tiers' short TTLs
+        conn.execute("DELETE FROM invalidations WHERE seq <= (SELECT MAX(seq) FROM invalidations) - 10000")
+
+    def keys_with_prefix(self, prefixes):
+        # The table is bounded by sharedMaxBytes, so one key scan is cheaper
+        # than a query per prefix when a diff touches many employees
+        conn = self._connect()
+        return [key for (key,) in conn.execute("SELECT key FROM entries") if key.startswith(prefixes)]
+
+    def invalidations_since(self, seq):
+        conn = self._connect()
+        rows = conn.execute("SELECT seq, key FROM invalidations WHERE seq > ? ORDER BY seq", (seq,)).fetchall()
+        return rows
+
+    def changed(self):
+        """True if another connection committed since the last call; cheap enough for every hit.
+
+        PRAGMA data_version is only comparable on one connection, so a dedicated
+        connection is kept for it rather than the per-thread ones.
+        """
+        with self._watch_lock:
+            if self._watch_conn is None:
+                self._watch_conn = sqlite3.connect(self.path, timeout=5, isolation_level=None,
+                                                   check_same_thread=False)
+            version = self._watch_conn.execute("PRAGMA data_version").fetchone()[0]
+            changed = version != self._watch_version
+            self._watch_version = version
+            return changed
+
+    def describe(self):
+        conn = self._connect()
+        entries, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        with self._stats_lock:
+            return dict(self.stats.as_dict(), entries=entries, bytes=total, maxBytes=self.max_bytes,
+                        path=self.path)
+
+class ResultCache:
+    """Lookup API used by the email routes: get_or_compute(key, compute)"""
+
+    def __init__(self, memory_tier: MemoryTier, shared_tier: SQLiteTier = None, ttl=300):
+        self.memory = memory_tier
+        self.shared = shared_tier
+        self.ttl = ttl
+        self._sync_lock = threading.Lock()
+        self._last_invalidation = 0
+        self.computed = 0
+
+    def _apply_remote_invalidations(self):
+        if self.shared is None:
+            return
+        if not self.shared.changed():
+            return
+        with self._sync_lock:
+            for seq, key in self.shared.invalidations_since(self._last_invalidation):
+                self.memory.discard(key)
+                self._last_invalidation = seq
+
+    def get(self, key):
+        """Return (value, tier) or (None, None) on a miss in every tier"""
+        self._apply_remote_invalidations()
+        entry = self.memory.get(key)
+        if entry is not None:
+            return entry[2], 'memory'
+
+        if self.shared is not None:
+            row = self.shared.get(key)
+            if row is not None:
+                version, expires_at, payload = row
+                value = json.loads(payload)
+                self.memory.put(key, version, expires_at, value, len(payload))
+                return value, 'shared'
+        return None, None
+
+    def put(self, key, value):
+        payload = json.dumps(value).encode('utf-8')
+        expires_at = time.time() + self.ttl
+        version = self.shared.put(key, payload, expires_at) if self.shared is not None else 0
+        self.memory.put(key, version, expires_at, value, len(payload))
+
+    def get_or_compute(self, key, compute, refresh=False):
+        """Return (value, tier) where tier is 'memory', 'shared' or None when freshly computed"""
+        if not refresh:
+            value, tier = self.get(key)
+            if tier is not None:
+                return value, tier
+        value = compute()
+        self.computed += 1
+        self.put(key, value)
+        return value, None
+
+    def invalidate(self, *keys):
+        for key in keys:
+            self.memory.discard(key)
+        if self.shared is not None and keys:
+            self.shared.invalidate(keys)
+
+    def invalidate_prefix(self, *prefixes):
+        """Invalidate every key starting with one of prefixes, e.g. all search counts for an employee"""
+        if not prefixes:
+            return 0
+        keys = set(self.memory.keys_with_prefix(prefixes))
+        if self.shared is not None:
+            keys.update(self.shared.keys_with_prefix(prefixes))
+        self.invalidate(*keys)
+        return len(keys)
+
+    def stats(self):
+        tiers = {"memory": self.memory.describe()}
+        if self.shared is not None:
+            tiers["shared"] = self.shared.describe()
+        return {"ttlSeconds": self.ttl, "computed": self.computed, "tiers": tiers}
+
+class MessageBodyCache:
+    """Full message bodies fetched by /api/emails/messages/<id>, in a byte-bounded LRU per worker.
+
+    Entries are keyed by message id and body type and remember the message's
+    changeKey. A lookup with a different changeKey is a miss, so an edited
+    message is fetched again; a lookup without one trusts the cached copy.
+    """
+
+    def __init__(self, max_bytes):
+        self.memory = MemoryTier(max_bytes)
+        # Lookups that found a copy older than the requested changeKey (also counted as hits)
+        self.stale = 0
+
+    @staticmethod
+    def _key(message_id, body_type):
+        return f"{message_id}:{body_type}"
+
+    def get(self, message_id, body_type, change_key=None):
+        entry = self.memory.get(self._key(message_id, body_type))
+        if entry is None:
+            return None
+        message = entry[2]
+        if change_key and message.get('changeKey') != change_key:
+            self.memory.discard(self._key(message_id, body_type))
+            self.stale += 1
+            return None
+        return message
+
+    def put(self, message, body_type):
+        size = len(json.dumps(message).encode('utf-8'))
+        self.memory.put(self._key(message['id'], body_type), 0, float('inf'), message, size)
+
+    def get_or_fetch(self, message_id, body_type, fetch, change_key=None):
+        """Return (message, hit)"""
+        message = self.get(message_id, body_type, change_key)
+        if message is not None:
+            return message, True
+        message = fetch()
+        self.put(message, body_type)
+        return message, False
+
+    def stats(self):
+        return dict(self.memory.describe(), stale=self.stale)
+
+def search_cache_prefix(employee_name):
+    return f"search:{' '.join(employee_name.split()).casefold()}:"
+
+def search_cache_key(employee_name, count, mailbox=None):
+    # Keys for the signed-in user's mailbox keep their old form
+    key = f"{search_cache_prefix(employee_name)}{count}"
+    return key if mailbox in (None, ME) else f"{key}@{mailbox.lower()}"
+
+def inbox_cache_key(count):
+    return f"inbox:{count}"
+
+def create_result_cache(config, state_dir):
+    """Build the cache from the [cache] section of config.cfg"""
+    memory_tier = MemoryTier(config.getint('cache', 'memoryMaxBytes', fallback=16 * 1024 * 1024))
+    shared_tier = None
+    if config.getboolean('cache', 'shared', fallback=True):
+        path = config.get('cache', 'path', fallback=os.path.join(state_dir, 'result_cache.sqlite3'))
+        shared_tier = SQLiteTier(path, config.getint('cache', 'sharedMaxBytes', fallback=256 * 1024 * 1024))
+    return ResultCache(memory_tier, shared_tier, ttl=config.getint('cache', 'ttlSeconds', fallback=300))
+
+def create_body_cache(config):
+    return MessageBodyCache(config.getint('cache', 'bodyMaxBytes', fallback=32 * 1024 * 1024))
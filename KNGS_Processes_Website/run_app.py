@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 
+import argparse
 import subprocess
 import time
 import sys
@@ -9,11 +10,19 @@ import threading
 import requests
 from pathlib import Path
 
+# Must match email_service.READY_MARKER; the service prints it once its port accepts connections
+SERVICE_READY_MARKER = 'EMAIL_SERVICE_READY'
+SERVICE_PORT = 5002
+
 class AppRunner:
-    def __init__(self):
+    def __init__(self, production=False):
+        self.production = production
         self.email_service_process = None
         self.electron_process = None
         self.running = True
+        # Set by the output monitor when the ready line arrives, or when the service exits first
+        self.service_signalled = threading.Event()
+        self.service_ready = False
         
     def check_port(self, port, host='127.0.0.1'):
         """Check if a port is available"""
@@ -24,48 +33,54 @@ class AppRunner:
             return False
     
     def wait_for_service(self, port, timeout=30, host='127.0.0.1'):
-        """Wait for a service to become available"""
+        """Block until the service prints its ready line (or exits); no polling"""
         print(f"⏳ Waiting for service on port {port}...")
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            if self.check_port(port, host):
-                print(f"✅ Service on port {port} is ready!")
-                return True
-            time.sleep(1)
-        return False
+        if not self.service_signalled.wait(timeout):
+            # No ready line, e.g. an older email_service.py: fall back to asking it
+            return self.check_port(port, host)
+        if self.service_ready:
+            print(f"✅ Service on port {port} is ready!")
+        return self.service_ready
     
     def start_email_service(self):
-        """Start the email service"""
+        """Launch the email service without waiting for it; wait_for_service() reports readiness"""
         print("🚀 Starting email service...")
         try:
-            # Use the interactive service that shows device codes
+            if self.production:
+                # Multi-worker gunicorn server sharing one token store
+                print("🏭 Production mode: starting gunicorn workers")
+                command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app']
+            else:
+                # Single process service that shows device codes in this terminal
+                command = [sys.executable, 'email_service.py']
+
             self.email_service_process = subprocess.Popen(
-                [sys.executable, 'email_service_interactive.py'],
+                command,
                 cwd=os.getcwd(),
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
                 universal_newlines=True,
-                bufsize=1
+                bufsize=1,
+                # Unbuffered so the ready line (and device codes) arrive as soon as they are printed
+                env=dict(os.environ, PYTHONUNBUFFERED='1')
             )
             
             # Monitor email service output in a separate thread
             def monitor_email_service():
                 for line in iter(self.email_service_process.stdout.readline, ''):
-                    if line.strip():
+                    if line.startswith(SERVICE_READY_MARKER):
+                        self.service_ready = True
+                        self.service_signalled.set()
+                    elif line.strip():
                         print(f"📧 {line.strip()}")
                     if not self.running:
                         break
+                # Output ended: the service exited, so nobody should keep waiting for it
+                self.service_signalled.set()
             
             email_thread = threading.Thread(target=monitor_email_service, daemon=True)
             email_thread.start()
-            
-            # Wait for the service to be ready
-            if self.wait_for_service(5002):
-                print("✅ Email service started successfully on port 5002")
-                return True
-            else:
-                print("❌ Email service failed to start within timeout")
-                return False
+            return True
                 
         except Exception as e:
             print(f"❌ Failed to start email service: {e}")
@@ -160,26 +175,32 @@ class AppRunner:
                 print("❌ package.json not found. Please run this script from the project root directory.")
                 return False
             
-            if not Path('email_service_interactive.py').exists():
-                print("❌ email_service_interactive.py not found. Please ensure the email service file exists.")
+            if not Path('email_service.py').exists():
+                print("❌ email_service.py not found. Please ensure the email service file exists.")
                 return False
             
-            # Start email service first
+            # Start the service and the React/Electron toolchain side by side; the UI
+            # checks the service itself, so it does not have to wait for it
+            launch_started = time.perf_counter()
             if not self.start_email_service():
                 print("❌ Failed to start email service. Exiting.")
                 return False
             
-            # Give the email service a moment to fully initialize
-            time.sleep(2)
-            
-            # Start Electron app
             if not self.start_electron_app():
                 print("❌ Failed to start Electron app. Exiting.")
                 self.cleanup()
                 return False
             
+            if self.wait_for_service(SERVICE_PORT):
+                print(f"✅ Email service started successfully on port {SERVICE_PORT} "
+                      f"({time.perf_counter() - launch_started:.1f}s after launch)")
+            else:
+                print("❌ Email service failed to start within timeout")
+                self.cleanup()
+                return False
+            
             print("\n🎉 Application started successfully!")
-            print("📧 Email service running on: http://127.0.0.1:5002")
+            print(f"📧 Email service running on: http://127.0.0.1:{SERVICE_PORT}")
             print("🖥️  Electron app will open automatically")
             print("🔐 When you first check an employee's emails, you'll see device code authentication")
             print("\n💡 Instructions:")
@@ -217,7 +238,12 @@ class AppRunner:
 
 def main():
     """Main entry point"""
-    runner = AppRunner()
+    parser = argparse.ArgumentParser(description="KNGS Email Progress Checker")
+    parser.add_argument('--production', action='store_true',
+                        help="Serve the email service with gunicorn workers (see gunicorn.conf.py)")
+    args = parser.parse_args()
+
+    runner = AppRunner(production=args.production)
     success = runner.run()
     sys.exit(0 if success else 1)
 
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+
+"""Sampling profiler for the live service, behind /api/debug/profile.
+
+Every ``interval`` seconds the sampler reads every thread's current Python
+stack with ``sys._current_frames()``. Nothing is hooked into the profiled
+code, so the overhead is one stack walk per thread per sample, paid by the
+sampling thread, and it sees all threads: request threads, engine workers,
+the pre-warm and warm-up threads.
+
+The result is a Profile of sample counts per stack, which can be written as:
+
+* collapsed stacks, one ``thread;outer;...;inner count`` line per stack, the
+  input format of flamegraph.pl, speedscope and inferno
+* a pstats dump built from the same samples, so ``pstats.Stats(path)`` or
+  snakeviz can sort functions by own and cumulative time; times are
+  estimated as samples x interval
+"""
+
+import collections
+import marshal
+import os
+import re
+import sys
+import threading
+import time
+
+DEFAULT_INTERVAL = 0.005
+MAX_SECONDS = 60
+# Leaf frames of a thread that is blocked, not running: waiting on a lock or
+# queue, an idle selector, or a server socket waiting for a connection
+IDLE_FRAMES = {
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('selectors.py', 'select'),
+    ('socket.py', 'accept'),
+    ('socketserver.py', 'serve_forever'),
+    ('queue.py', 'get'),
+    ('_base.py', 'result'),
+    ('_base.py', 'exception'),
+}
+
+def frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def thread_label(name):
+    # Same grouping as memory_debug: numbered threads collapse into one flame
+    return re.sub(r'\d+', 'N', name)
+
+class Profile:
+    """Samples per stack; a stack is a tuple of code objects, outermost first"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.idle_samples = 0
+        self.seconds = 0.0
+
+    def collapsed(self):
+        """Collapsed stacks text for flamegraph tools"""
+        lines = collections.Counter()
+        for (thread_name, codes), count in self.stacks.items():
+            lines[';'.join([thread_label(thread_name)] + [frame_label(code) for code in codes])] += count
+        return ''.join(f"{stack} {count}\n" for stack, count in lines.most_common())
+
+    def pstats_dump(self):
+        """marshal'd stats dict in the format pstats.Stats loads from a file"""
+        def key(code):
+            return (code.co_filename, code.co_firstlineno, code.co_name)
+
+        # function -> [primitive calls, calls, own time, cumulative time, callers]
+        stats = {}
+        for (_, codes), count in self.stacks.items():
+            elapsed = count * self.interval
+            seen = set()
+            for depth, code in enumerate(codes):
+                function = key(code)
+                entry = stats.setdefault(function, [0, 0, 0.0, 0.0, {}])
+                if function not in seen:
+                    # Recursion: count cumulative time once per stack
+                    seen.add(function)
+                    entry[0] += count
+                    entry[1] += count
+                    entry[3] += elapsed
+                if depth:
+                    caller = entry[4].setdefault(key(codes[depth - 1]), [0, 0, 0.0, 0.0])
+                    caller[0] += count
+                    caller[1] += count
+                    caller[3] += elapsed
+            stats[key(codes[-1])][2] += elapsed
+        for entry in stats.values():
+            entry[4] = {caller: tuple(values) for caller, values in entry[4].items()}
+        return marshal.dumps({function: tuple(entry) for function, entry in stats.items()})
+
+    def summary(self, top=20):
+        own = collections.Counter()
+        for (_, codes), count in self.stacks.items():
+            own[frame_label(codes[-1])] += count
+        return {
+            "seconds": self.seconds,
+            "intervalMs": self.interval * 1000,
+            "samples": self.samples,
+            "idleSamples": self.idle_samples,
+            "stacks": len(self.stacks),
+            "topFunctions": [{"function": function, "samples": count,
+                              "share": count / self.samples if self.samples else 0.0}
+                             for function, count in own.most_common(top)]
+        }
+
+class SamplingProfiler:
+    """Runs one sampling session at a time"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def busy(self):
+        return self._lock.locked()
+
+    def run(self, seconds, interval=DEFAULT_INTERVAL, include_idle=False):
+        """Sample every thread but the caller for seconds; raises RuntimeError if a session is running"""
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("A profile is already being recorded")
+        try:
+            return self._sample(min(seconds, MAX_SECONDS), interval, include_idle)
+        finally:
+            self._lock.release()
+
+    def _sample(self, seconds, interval, include_idle):
+        profile = Profile(interval)
+        own_thread = threading.get_ident()
+        started = time.perf_counter()
+        deadline = started + seconds
+        next_sample = started
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                code = frame.f_code
+                profile.samples += 1
+                if not include_idle and (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    profile.idle_samples += 1
+                    continue
+                codes = []
+                while frame is not None:
+                    codes.append(frame.f_code)
+                    frame = frame.f_back
+                codes.reverse()
+                profile.stacks[(names.get(thread_id, str(thread_id)), tuple(codes))] += 1
+            # Fixed rate rather than fixed sleep, so slow stack walks do not stretch the interval
+            next_sample += interval
+            time.sleep(max(next_sample - time.perf_counter(), 0))
+        profile.seconds = time.perf_counter() - started
+        return profile
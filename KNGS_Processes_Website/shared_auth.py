@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+
+"""Token store shared by every worker thread and process of the email service.
+
+Tokens live in the MSAL persistent cache and the signed-in account is saved as
+an AuthenticationRecord in the service state directory. Any worker can then
+acquire tokens silently, and only one worker at a time (guarded by a file
+lock) is allowed to run an interactive device code login. Adding gunicorn
+workers or process-engine workers therefore does not multiply logins.
+
+The email service creates its engine credentials with ``interactive=False``:
+they raise LoginRequiredError instead of blocking a worker on a device code,
+and the login itself runs as a background job (see auth_jobs.py).
+
+azure.identity is imported on first use rather than at module load, so the
+service can answer /api/health before it has finished importing.
+"""
+
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+
+from graph import DeviceCodeState
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_DIR = '.kngs_state'
+TOKEN_CACHE_NAME = 'kngs_email_service'
+AUTH_RECORD_FILE = 'auth_record.json'
+DEVICE_CODE_FILE = 'device_code.json'
+LOGIN_LOCK_FILE = 'login.lock'
+
+class LoginRequiredError(Exception):
+    """Nobody is signed in and this credential is not allowed to start a device code login"""
+
+def ensure_state_dir(state_dir=None):
+    state_dir = state_dir or DEFAULT_STATE_DIR
+    os.makedirs(state_dir, exist_ok=True)
+    return state_dir
+
+def write_json_atomic(path, payload):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+def read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+@contextlib.contextmanager
+def file_lock(path):
+    """Exclusive lock across processes on the same host"""
+    with open(path, 'a+') as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def try_file_lock(path):
+    """Take an exclusive lock across processes without waiting.
+
+    Returns the open lock file, which holds the lock until it is closed, or
+    None when another process holds it. Unlike file_lock this suits a lock
+    held for the life of the process, such as electing one writer.
+    """
+    f = open(path, 'a+')
+    try:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+class SharedDeviceCodeState(DeviceCodeState):
+    """DeviceCodeState mirrored to a file so every worker reports the same login state"""
+
+    # Successful calls happen constantly; only refresh the file this often
+    WRITE_INTERVAL = 60
+
+    def __init__(self, state_dir=None):
+        super().__init__()
+        self.path = os.path.join(ensure_state_dir(state_dir), DEVICE_CODE_FILE)
+        self._last_write = 0
+        # The login thread writes while request threads reload; a reload must not
+        # clobber a code that is about to be saved
+        self._lock = threading.RLock()
+
+    def _load(self):
+        data = read_json(self.path) or {}
+        self.user_code = data.get('userCode')
+        self.verification_uri = data.get('verificationUri')
+        self.expires_on = data.get('expiresOn')
+        self.last_successful_auth = data.get('lastSuccessfulAuth')
+
+    def _save(self):
+        write_json_atomic(self.path, {
+            'userCode': self.user_code,
+            'verificationUri': self.verification_uri,
+            'expiresOn': str(self.expires_on) if self.expires_on else None,
+            'lastSuccessfulAuth': self.last_successful_auth,
+        })
+        self._last_write = time.time()
+
+    def prompt_callback(self, verification_uri, user_code, expires_on):
+        with self._lock:
+            super().prompt_callback(verification_uri, user_code, expires_on)
+            self._save()
+
+    def current(self):
+        with self._lock:
+            self._load()
+            return super().current()
+
+    def mark_authenticated(self):
+        with self._lock:
+            had_code = self.user_code is not None
+            super().mark_authenticated()
+            if had_code or time.time() - self._last_write > self.WRITE_INTERVAL:
+                self._save()
+
+    def recently_authenticated(self, window=1800):
+        with self._lock:
+            self._load()
+            return super().recently_authenticated(window)
+
+class SharedCredential:
+    """Credential that reuses the persisted token cache and serializes device code logins"""
+
+    def __init__(self, settings, device_code_state: DeviceCodeState = None, state_dir=None, interactive=True):
+        self.client_id = settings['clientId']
+        self.tenant_id = settings['tenantId']
+        self.device_code_state = device_code_state
+        self.interactive = interactive
+        self.state_dir = ensure_state_dir(state_dir)
+        self.record_path = os.path.join(self.state_dir, AUTH_RECORD_FILE)
+        self.lock_path = os.path.join(self.state_dir, LOGIN_LOCK_FILE)
+        self._cache_options = None
+        self._lock = threading.Lock()
+        self._credential = None
+        self._record_mtime = None
+
+    @property
+    def cache_options(self):
+        if self._cache_options is None:
+            from azure.identity import TokenCachePersistenceOptions
+            self._cache_options = TokenCachePersistenceOptions(name=TOKEN_CACHE_NAME,
+                                                               allow_unencrypted_storage=True)
+        return self._cache_options
+
+    def _load_record(self):
+        """Return a silent credential for the saved account, or None when nobody has signed in yet"""
+        try:
+            mtime = os.path.getmtime(self.record_path)
+        except OSError:
+            return None
+        if self._credential is None or mtime != self._record_mtime:
+            from azure.identity import AuthenticationRecord, DeviceCodeCredential
+            with open(self.record_path) as f:
+                record = AuthenticationRecord.deserialize(f.read())
+            self._credential = DeviceCodeCredential(
+                self.client_id,
+                tenant_id=self.tenant_id,
+                cache_persistence_options=self.cache_options,
+                authentication_record=record,
+                disable_automatic_authentication=True
+            )
+            self._record_mtime = mtime
+        return self._credential
+
+    def _try_silent(self, scopes, kwargs):
+        from azure.identity import AuthenticationRequiredError
+
+        credential = self._load_record()
+        if credential is None:
+            return None
+        try:
+            return credential.get_token(*scopes, **kwargs)
+        except AuthenticationRequiredError:
+            return None
+
+    def _login(self, scopes):
+        from azure.identity import DeviceCodeCredential
+
+        prompt_callback = self.device_code_state.prompt_callback if self.device_code_state else None
+        credential = DeviceCodeCredential(
+            self.client_id,
+            tenant_id=self.tenant_id,
+            cache_persistence_options=self.cache_options,
+            prompt_callback=prompt_callback
+        )
+        record = credential.authenticate(scopes=list(scopes))
+        tmp_path = f"{self.record_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(record.serialize())
+        os.replace(tmp_path, self.record_path)
+        logger.info(f"Device code login completed for {record.username}")
+        with self._lock:
+            self._credential = None
+
+    def _silent(self, scopes, kwargs):
+        # Only the cached credential is guarded: a device code login runs
+        # outside this lock, so status checks never wait behind one
+        with self._lock:
+            return self._try_silent(scopes, kwargs)
+
+    def get_token(self, *scopes, **kwargs):
+        token = self._silent(scopes, kwargs)
+        if token is not None:
+            return token
+        if not self.interactive:
+            raise LoginRequiredError("Sign-in required: start a device code login with /api/auth/user")
+
+        # Logins are serialized by the file lock, across threads and workers
+        with file_lock(self.lock_path):
+            # Another worker may have finished the login while we waited
+            token = self._silent(scopes, kwargs)
+            if token is not None:
+                return token
+            self._login(scopes)
+            return self._silent(scopes, kwargs)
+
+    def signed_in(self, *scopes):
+        """True when a token can be acquired without a device code login"""
+        return self._silent(scopes, {}) is not None
+
+def create_credential(settings, device_code_state: DeviceCodeState = None, state_dir=None, interactive=True):
+    """Create the credential shared by every Graph client in this process"""
+    return SharedCredential(settings, device_code_state, state_dir, interactive)
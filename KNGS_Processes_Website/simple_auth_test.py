@@ -2,7 +2,7 @@
 
 import configparser
 import logging
-from email_service_sync import GraphSync
+from graph_engines import create_engine
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -26,16 +26,16 @@ def test_simple_auth():
         
         azure_settings = config['azure']
         
-        print("1. Creating GraphSync instance...")
-        graph_client = GraphSync(azure_settings)
-        print("   ✅ GraphSync created")
+        print("1. Starting threaded Graph engine...")
+        graph_engine = create_engine('threaded', azure_settings, max_workers=1)
+        print("   ✅ Graph engine started")
         
         print("\n2. First token request (will require authentication)...")
-        token1 = graph_client.get_user_token()
+        token1 = graph_engine.call('get_user_token', timeout=180)['token']
         print(f"   ✅ Token 1: {token1[:50]}...")
         
         print("\n3. Second token request (should use cache)...")
-        token2 = graph_client.get_user_token()
+        token2 = graph_engine.call('get_user_token', timeout=180)['token']
         print(f"   ✅ Token 2: {token2[:50]}...")
         
         if token1 == token2:
@@ -44,12 +44,12 @@ def test_simple_auth():
             print("   ❌ FAIL: Different tokens returned")
         
         print("\n4. Testing user info (should use cached token)...")
-        user = graph_client.get_user()
-        print(f"   ✅ User: {user.display_name} ({user.mail or user.user_principal_name})")
+        user = graph_engine.call('get_user')
+        print(f"   ✅ User: {user['displayName']} ({user['email']})")
         
         print("\n5. Testing email search (should use cached token)...")
-        messages = graph_client.search_emails_by_employee("test", 5)
-        email_count = len(messages.value) if messages and messages.value else 0
+        result = graph_engine.call('search_emails', employee_name="test", count=5)
+        email_count = len(result['emails'])
         print(f"   ✅ Found {email_count} emails with 'test' in subject")
         
         print("\n🎉 All tests completed successfully!")
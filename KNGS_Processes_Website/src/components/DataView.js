@@ -1,13 +1,48 @@
-import React, { useState, useMemo } from 'react';
+import React, { useState, useMemo, useEffect } from 'react';
 import { Search, ArrowUpDown, ChevronUp, ChevronDown } from 'lucide-react';
 
+const EMAIL_SERVICE_URL = 'http://127.0.0.1:5002';
+const PAGE_SIZE = 100;
+
 const DataView = ({ data }) => {
   const [searchTerm, setSearchTerm] = useState('');
   const [sortColumn, setSortColumn] = useState(null);
   const [sortDirection, setSortDirection] = useState('asc');
+  // Workbooks parsed by the email service are filtered, sorted and paged there
+  const serverSide = Boolean(data.workbookId);
+  const [page, setPage] = useState(0);
+  const [query, setQuery] = useState('');
+  const [serverPage, setServerPage] = useState({ rows: [], filtered: 0, total: data.rowCount || 0 });
+
+  // Wait for a pause in typing before asking the service to filter
+  useEffect(() => {
+    const timer = setTimeout(() => setQuery(searchTerm), 250);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
+
+  useEffect(() => setPage(0), [query, sortColumn, sortDirection]);
+
+  useEffect(() => {
+    if (!serverSide) return undefined;
+    const controller = new AbortController();
+    const params = new URLSearchParams({ offset: page * PAGE_SIZE, limit: PAGE_SIZE, dir: sortDirection, q: query });
+    if (sortColumn !== null) params.set('sort', sortColumn);
+    fetch(`${EMAIL_SERVICE_URL}/api/workbooks/${data.workbookId}/rows?${params}`, { signal: controller.signal })
+      .then(response => response.json())
+      .then(result => {
+        if (result.error) throw new Error(result.details || result.error);
+        setServerPage({ rows: result.rows.map(row => row.cells), filtered: result.filtered, total: result.total });
+      })
+      .catch(error => {
+        if (error.name !== 'AbortError') console.error('Failed to load rows:', error);
+      });
+    return () => controller.abort();
+  }, [serverSide, data.workbookId, page, query, sortColumn, sortDirection]);
 
   // Filter and sort data
   const filteredAndSortedData = useMemo(() => {
+    if (serverSide) return serverPage.rows;
+
     let filteredRows = data.rows.filter(row => {
       if (!searchTerm) return true;
       return row.some(cell => 
@@ -37,7 +72,7 @@ const DataView = ({ data }) => {
     }
 
     return filteredRows;
-  }, [data.rows, searchTerm, sortColumn, sortDirection]);
+  }, [serverSide, serverPage.rows, data.rows, searchTerm, sortColumn, sortDirection]);
 
   const handleSort = (columnIndex) => {
     if (sortColumn === columnIndex) {
@@ -57,6 +92,15 @@ const DataView = ({ data }) => {
 
   // Generate statistics
   const stats = useMemo(() => {
+    if (serverSide) {
+      return {
+        totalRows: serverPage.total,
+        uniqueEmployees: data.employeeCount,
+        uniqueTickets: data.ticketCount,
+        filteredRows: serverPage.filtered
+      };
+    }
+
     const employeeNames = new Set(data.rows.map(row => row[5]).filter(Boolean));
     const ticketNumbers = new Set(data.rows.map(row => row[0]).filter(Boolean));
 
@@ -66,7 +110,9 @@ const DataView = ({ data }) => {
       uniqueTickets: ticketNumbers.size,
       filteredRows: filteredAndSortedData.length
     };
-  }, [data.rows, filteredAndSortedData.length]);
+  }, [serverSide, serverPage, data, filteredAndSortedData.length]);
+
+  const pageCount = serverSide ? Math.max(1, Math.ceil(serverPage.filtered / PAGE_SIZE)) : 1;
 
   const formatCellValue = (value) => {
     if (value === null || value === undefined) return '';
@@ -253,6 +299,20 @@ const DataView = ({ data }) => {
         </div>
       </div>
 
+      {serverSide && pageCount > 1 && (
+        <div style={{ display: 'flex', justifyContent: 'center', alignItems: 'center', gap: '12px', marginTop: '16px' }}>
+          <button className="btn btn-secondary" disabled={page === 0} onClick={() => setPage(page - 1)}>
+            Previous
+          </button>
+          <span style={{ color: 'var(--kn-text-secondary)', fontSize: '14px' }}>
+            Page {page + 1} of {pageCount}
+          </span>
+          <button className="btn btn-secondary" disabled={page + 1 >= pageCount} onClick={() => setPage(page + 1)}>
+            Next
+          </button>
+        </div>
+      )}
+
       {filteredAndSortedData.length === 0 && searchTerm && (
         <div className="card" style={{ textAlign: 'center', marginTop: '20px' }}>
           <h3>No Results Found</h3>
@@ -18,7 +18,8 @@ import {
   ExternalLink,
   Shield,
   Activity,
-  AlertCircle
+  AlertCircle,
+  Download
 } from 'lucide-react';
 
 const EmployeeSelector = ({ employees, excelData }) => {
@@ -39,18 +40,41 @@ const EmployeeSelector = ({ employees, excelData }) => {
   const [isDragging, setIsDragging] = useState(false);
   const [dragStart, setDragStart] = useState({ x: 0, y: 0 });
   const [isFullscreen, setIsFullscreen] = useState(false);
+  const [serviceSuggestions, setServiceSuggestions] = useState(null);
+  // Full bodies are fetched on demand; search results only carry previews
+  const [openEmails, setOpenEmails] = useState({});
 
   const employeeOptions = useMemo(() => 
-    employees.map(e => ({ value: e.name, label: e.name, ticket: e.ticketNumber }))
+    employees.map(e => ({ value: e.name, label: e.name, ticket: e.ticketNumber, search: e.name.toLowerCase() }))
   , [employees]);
 
+  const toOption = (e) => ({ value: e.name, label: e.name, ticket: e.ticketNumber });
+
+  // Workbooks parsed by the email service have a name index there; ask it
+  // for ranked suggestions instead of scanning every employee per keystroke
+  React.useEffect(() => {
+    if (!searchTerm || !excelData?.workbookId) {
+      setServiceSuggestions(null);
+      return;
+    }
+    const controller = new AbortController();
+    fetch(`http://127.0.0.1:5002/api/employees/suggest?q=${encodeURIComponent(searchTerm)}&workbookId=${excelData.workbookId}&limit=25`,
+      { signal: controller.signal })
+      .then(response => (response.ok ? response.json() : null))
+      .then(data => setServiceSuggestions(data ? data.suggestions.map(toOption) : null))
+      .catch(error => {
+        if (error.name !== 'AbortError') setServiceSuggestions(null);
+      });
+    return () => controller.abort();
+  }, [searchTerm, excelData?.workbookId]);
+
   // Filter employees based on search term
   const filteredOptions = useMemo(() => {
     if (!searchTerm) return [];
-    return employeeOptions.filter(opt =>
-      opt.label.toLowerCase().includes(searchTerm.toLowerCase())
-    );
-  }, [employeeOptions, searchTerm]);
+    if (serviceSuggestions) return serviceSuggestions;
+    const term = searchTerm.toLowerCase();
+    return employeeOptions.filter(opt => opt.search.includes(term));
+  }, [employeeOptions, searchTerm, serviceSuggestions]);
 
   // Navigation functions
   const zoomIn = () => {
@@ -416,43 +440,64 @@ flowchart TD
     return false;
   };
 
-  // Check for device code in email service logs
-  const checkForDeviceCode = async () => {
-    try {
-      const response = await fetch('http://127.0.0.1:5002/api/auth/device-code');
-      if (response.ok) {
-        const data = await response.json();
-        if (data.deviceCode) {
-          setDeviceCode(data.deviceCode);
-          return true;
-        }
+  // Follow a background login job until the user has entered the device code
+  const pollLoginJob = async (job) => {
+    while (job.status !== 'succeeded') {
+      if (job.status === 'failed') {
+        throw new Error(job.error || 'Sign-in failed');
       }
-    } catch (error) {
-      console.log('Device code endpoint not available');
+      if (job.deviceCode) {
+        setDeviceCode(job.deviceCode);
+      }
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+      const response = await fetch(`http://127.0.0.1:5002${job.statusUrl}`);
+      if (!response.ok) {
+        throw new Error('Lost track of the sign-in job');
+      }
+      job = await response.json();
     }
-    return false;
   };
 
-  // Poll for device code during authentication
-  const pollForDeviceCode = async () => {
-    let attempts = 0;
-    const maxAttempts = 30; // Poll for up to 30 seconds
-    
-    const poll = async () => {
-      if (attempts >= maxAttempts) {
-        return;
-      }
-      
-      const hasCode = await checkForDeviceCode();
-      if (!hasCode && attempts < maxAttempts) {
-        attempts++;
-        setTimeout(poll, 1000); // Poll every second
-      }
-    };
-    
-    await poll();
+  // The service answers 202 with a login job instead of holding the request open
+  const waitForLogin = async () => {
+    const response = await fetch('http://127.0.0.1:5002/api/auth/user');
+    const data = await response.json();
+    if (!response.ok) {
+      throw new Error(data.error || 'Failed to start sign-in');
+    }
+    if (response.status === 202) {
+      await pollLoginJob(data);
+    }
+  };
+
+  const toggleEmailBody = async (email) => {
+    if (openEmails[email.id]) {
+      setOpenEmails(({ [email.id]: _, ...rest }) => rest);
+      return;
+    }
+    setOpenEmails(open => ({ ...open, [email.id]: { loading: true } }));
+    try {
+      const params = new URLSearchParams({ format: 'text', changeKey: email.changeKey || '', mailbox: email.mailbox || 'me' });
+      const response = await fetch(`http://127.0.0.1:5002/api/emails/messages/${encodeURIComponent(email.id)}?${params}`);
+      const message = await response.json();
+      if (!response.ok) throw new Error(message.details || message.error);
+      setOpenEmails(open => ({ ...open, [email.id]: { body: message.body.content } }));
+    } catch (error) {
+      setOpenEmails(open => ({ ...open, [email.id]: { error: error.message } }));
+    }
   };
 
+  const requestEmailSearch = (employeeName) => fetch('http://127.0.0.1:5002/api/emails/search', {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({
+      employeeName: employeeName,
+      count: 25
+    })
+  });
+
   // Fetch emails for selected employee
   const fetchEmployeeEmails = async (employeeName) => {
     setIsLoadingEmails(true);
@@ -478,8 +523,9 @@ flowchart TD
         setAuthInProgress(true);
         setIsAlreadyAuthenticated(false);
 
-        // Start polling for device code
-        pollForDeviceCode();
+        await waitForLogin();
+        setShowAuthModal(false);
+        setAuthInProgress(false);
       } else {
         // User is already authenticated, show brief confirmation
         setShowAuthModal(true);
@@ -493,21 +539,15 @@ flowchart TD
         }, 1500);
       }
 
-      const response = await fetch('http://127.0.0.1:5002/api/emails/search', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({
-          employeeName: employeeName,
-          count: 25
-        })
-      });
-
-      // Close auth modal if it was shown
-      if (!isAlreadyAuthenticated) {
+      let response = await requestEmailSearch(employeeName);
+      if (response.status === 202) {
+        // The saved sign-in expired between the status check and the search
+        setShowAuthModal(true);
+        setAuthInProgress(true);
+        await pollLoginJob(await response.json());
         setShowAuthModal(false);
         setAuthInProgress(false);
+        response = await requestEmailSearch(employeeName);
       }
 
       if (!response.ok) {
@@ -529,26 +569,44 @@ flowchart TD
   };
 
   // Get progress data for selected employee
-  const handleCheckProgress = async () => {
-    if (!selectedEmployee) return;
+  // Workbooks parsed by the email service are indexed there; look the rows up by name
+  const fetchEmployeeRecords = async (employeeName) => {
+    if (!excelData.workbookId) return null;
+    try {
+      const response = await fetch(
+        `http://127.0.0.1:5002/api/employees/${encodeURIComponent(employeeName)}/records?workbookId=${excelData.workbookId}`
+      );
+      if (response.ok) {
+        return await response.json();
+      }
+    } catch (error) {
+      console.log('Employee records endpoint not available:', error);
+    }
+    return null;
+  };
 
-    const employeeRecords = excelData.rows.filter(row => {
-      const employeeName = row[5];
-      return employeeName && employeeName.toString().trim().toLowerCase() === selectedEmployee.value.toLowerCase();
+  const findEmployeeRecords = (employeeName) => {
+    const target = employeeName.toLowerCase();
+    const records = [];
+    excelData.rows.forEach((row, index) => {
+      const name = row[5];
+      if (name && name.toString().trim().toLowerCase() === target) {
+        records.push({ ticketNumber: row[0], fullRow: row, rowIndex: index + 1 });
+      }
     });
+    return { totalRecords: records.length, records };
+  };
 
-    const progressInfo = {
+  const handleCheckProgress = async () => {
+    if (!selectedEmployee) return;
+
+    const progressInfo = await fetchEmployeeRecords(selectedEmployee.value) || {
       employeeName: selectedEmployee.label,
-      totalRecords: employeeRecords.length,
-      records: employeeRecords.map((row, i) => ({
-        ticketNumber: row[0],
-        fullRow: row,
-        rowIndex: excelData.rows.findIndex(r => r.join('') === row.join('')) + 1 
-      })),
+      ...findEmployeeRecords(selectedEmployee.value),
       columns: excelData.headers
     };
 
-    setProgressData(progressInfo);
+    setProgressData({ ...progressInfo, employeeName: selectedEmployee.label });
     
     // Also fetch emails for this employee
     await fetchEmployeeEmails(selectedEmployee.label);
@@ -884,6 +942,17 @@ flowchart TD
                 <BarChart3 size={16} />
                 {showFlowchart ? 'Hide Process Flow' : 'Show Process Flow'}
               </button>
+              {excelData.workbookId && (
+                <a
+                  className="btn btn-secondary"
+                  href={`http://127.0.0.1:5002/api/reports/progress?workbookId=${excelData.workbookId}&format=xlsx`}
+                  title="Email progress for every employee in the sheet"
+                  style={{ display: 'flex', alignItems: 'center', gap: '6px', textDecoration: 'none' }}
+                >
+                  <Download size={16} />
+                  Progress Report
+                </a>
+              )}
             </div>
           </div>
         </div>
@@ -1060,6 +1129,15 @@ flowchart TD
             <h3 style={{marginBottom: '16px', color: 'var(--kn-blue)'}}>
               Emails with "{emailData.employeeName}" in Subject Line
             </h3>
+            {emailData.partial && (
+              <div style={{display: 'flex', alignItems: 'flex-start', gap: '8px', marginBottom: '12px', fontSize: '14px', color: '#b45309'}}>
+                <AlertCircle size={16} style={{marginTop: '2px'}} />
+                <span>
+                  Some mailboxes could not be searched:{' '}
+                  {emailData.mailboxes.filter(m => m.error).map(m => `${m.mailbox} (${m.error.details})`).join(', ')}
+                </span>
+              </div>
+            )}
             
             {emailData.emails.length > 0 ? (
               <div style={{display: 'flex', flexDirection: 'column', gap: '12px'}}>
@@ -1084,6 +1162,7 @@ flowchart TD
                         </div>
                         <div style={{fontSize: '12px', color: 'var(--kn-text-secondary)'}}>
                           {formatDate(email.receivedDateTime)}
+                          {emailData.mailboxes && emailData.mailboxes.length > 1 && ` · ${email.mailboxes.join(', ')}`}
                         </div>
                       </div>
                       <div style={{display: 'flex', gap: '8px', alignItems: 'center'}}>
@@ -1118,6 +1197,31 @@ flowchart TD
                         {email.bodyPreview}
                       </div>
                     )}
+                    {email.id && (
+                      <button
+                        className="btn btn-secondary"
+                        style={{ marginTop: '8px', fontSize: '12px', padding: '4px 10px' }}
+                        onClick={() => toggleEmailBody(email)}
+                      >
+                        {openEmails[email.id] ? 'Hide message' : 'Show full message'}
+                      </button>
+                    )}
+                    {openEmails[email.id] && (
+                      <div style={{
+                        fontSize: '14px',
+                        marginTop: '8px',
+                        padding: '8px',
+                        whiteSpace: 'pre-wrap',
+                        maxHeight: '400px',
+                        overflowY: 'auto',
+                        border: '1px solid var(--kn-border-color)',
+                        borderRadius: '4px'
+                      }}>
+                        {openEmails[email.id].loading && 'Loading message...'}
+                        {openEmails[email.id].error && `Could not load message: ${openEmails[email.id].error}`}
+                        {openEmails[email.id].body}
+                      </div>
+                    )}
                   </div>
                 ))}
                 
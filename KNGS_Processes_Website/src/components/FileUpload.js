@@ -3,6 +3,8 @@ import { useNavigate } from 'react-router-dom';
 import * as XLSX from 'xlsx';
 import { Upload, FileSpreadsheet, BarChart3, FileText } from 'lucide-react';
 
+const EMAIL_SERVICE_URL = 'http://127.0.0.1:5002';
+
 const FileUpload = ({ onDataLoad, hasData }) => {
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState('');
@@ -12,6 +14,49 @@ const FileUpload = ({ onDataLoad, hasData }) => {
   const fileInputRef = useRef(null);
   const navigate = useNavigate();
 
+  // Let the email service stream-parse .xlsx files. Returns false when the
+  // service is not running or cannot read the file, so the caller can fall
+  // back to parsing in the renderer.
+  const uploadToService = async (file) => {
+    if (!file.name.toLowerCase().endsWith('.xlsx')) return false;
+
+    let response;
+    try {
+      setProcessingStep('Uploading to email service...');
+      const formData = new FormData();
+      formData.append('file', file);
+      response = await fetch(`${EMAIL_SERVICE_URL}/api/workbooks`, { method: 'POST', body: formData });
+    } catch (networkError) {
+      console.warn('Email service unavailable, parsing in the app instead:', networkError);
+      return false;
+    }
+
+    const summary = await response.json();
+    if (response.status === 415 || response.status >= 500) {
+      console.warn('Email service could not parse the workbook, parsing in the app instead:', summary);
+      return false;
+    }
+    if (!response.ok) {
+      throw new Error(summary.details || summary.error);
+    }
+    if (summary.employees.length === 0) {
+      throw new Error('No valid data found. Check columns A (ticket #) and F (employee name).');
+    }
+
+    // Rows stay in the service; the Data View fetches the pages it shows
+    onDataLoad({
+      workbookId: summary.id,
+      sheetName: summary.sheetName,
+      headers: summary.headers,
+      mergedHeaders: summary.mergedHeaders,
+      rowCount: summary.rowCount,
+      employeeCount: summary.employeeCount,
+      ticketCount: summary.ticketCount,
+      rows: [],
+    }, summary.employees);
+    return true;
+  };
+
   const handleFileUpload = async (file) => {
     if (!file) return;
 
@@ -28,6 +73,22 @@ const FileUpload = ({ onDataLoad, hasData }) => {
     setError('');
     setUploadSuccess(false);
 
+    try {
+      if (await uploadToService(file)) {
+        setUploadSuccess(true);
+        setIsLoading(false);
+        setProcessingStep('');
+        setTimeout(() => navigate('/data-view'), 1000);
+        return;
+      }
+    } catch (serviceError) {
+      console.error('Error parsing Excel file on the email service:', serviceError);
+      setError(serviceError.message);
+      setIsLoading(false);
+      setProcessingStep('');
+      return;
+    }
+
     const timeoutId = setTimeout(() => {
       console.error('File processing timeout');
       setError('File processing timeout. Please try with a smaller file or check the file format.');
@@ -151,9 +212,13 @@ const FileUpload = ({ onDataLoad, hasData }) => {
           }
 
           setProcessingStep('Removing duplicates...');
-          const uniqueEmployees = employees.filter((employee, index, self) =>
-            index === self.findIndex(e => e.name.toLowerCase() === employee.name.toLowerCase())
-          );
+          const seenNames = new Set();
+          const uniqueEmployees = employees.filter(employee => {
+            const key = employee.name.toLowerCase();
+            if (seenNames.has(key)) return false;
+            seenNames.add(key);
+            return true;
+          });
 
           setProcessingStep('Finalizing data...');
           const fullData = {
@@ -1,35 +1,36 @@
 #!/usr/bin/env python3
 
 import sys
-import os
+
+import email_service
+
+ENGINE_CHOICES = {
+    '1': ('threaded', "Threaded engine (RECOMMENDED - one event loop per worker thread)"),
+    '2': ('asyncio', "Asyncio engine (single event loop, lowest overhead per request)"),
+    '3': ('process', "Process pool engine (each worker in its own process)"),
+}
 
 def main():
     print("📧 Email Service Launcher")
     print("=" * 50)
-    print("Choose which version to run:")
-    print("1. Synchronous version (RECOMMENDED - no timeout issues)")
-    print("2. Asynchronous version (may have timeout issues)")
-    print("3. Exit")
-    
+    print("Choose which Graph engine to run:")
+    for choice, (_, description) in ENGINE_CHOICES.items():
+        print(f"{choice}. {description}")
+    print("4. Exit")
+
     while True:
         try:
-            choice = input("\nEnter your choice (1-3): ").strip()
-            
-            if choice == '1':
-                print("\n🚀 Starting synchronous email service...")
-                print("This version should work without timeout issues.")
-                os.system("python email_service_sync.py")
-                break
-            elif choice == '2':
-                print("\n🚀 Starting asynchronous email service...")
-                print("This version may have timeout issues but supports true async operations.")
-                os.system("python email_service.py")
-                break
-            elif choice == '3':
+            choice = input("\nEnter your choice (1-4): ").strip()
+
+            if choice in ENGINE_CHOICES:
+                engine_name = ENGINE_CHOICES[choice][0]
+                print(f"\n🚀 Starting email service with the '{engine_name}' engine...")
+                sys.exit(email_service.main(['--engine', engine_name]))
+            elif choice == '4':
                 print("👋 Goodbye!")
                 sys.exit(0)
             else:
-                print("❌ Invalid choice. Please enter 1, 2, or 3.")
+                print("❌ Invalid choice. Please enter 1, 2, 3 or 4.")
         except KeyboardInterrupt:
             print("\n👋 Goodbye!")
             sys.exit(0)
@@ -37,4 +38,4 @@ def main():
             print(f"❌ Error: {e}")
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+
+"""Generate synthetic "in progress" tracker workbooks for benchmarks.
+
+The layout matches what workbook_store.py parses from HR's real tracker:
+
+* row 1 - merged group headers ("General Information" over A-G, then one
+          group per block of extra columns)
+* row 2 - column headers
+* rows 3+ - one ticket per row: ticket number in column A, employee name in
+          column F, a start date in column E, free text elsewhere
+
+    python synthetic_workbook.py --rows 100000 --columns 12 --duplicate-names 0.3 --out tracker_100k.xlsx
+
+Duplicate rates control how often a row reuses an earlier employee name (the
+same person on several tickets) or an earlier ticket number (a ticket split
+over several rows). Blank rows can be scattered in to exercise range
+detection. The same seed always produces the same workbook.
+"""
+
+import argparse
+import datetime
+import random
+import time
+
+from workbook_store import EMPLOYEE_COLUMN, MIN_COLUMNS, TICKET_COLUMN
+
+SHEET_NAME = 'In Progress'
+BASE_HEADERS = ['Ticket #', 'Workforce', 'Request Type', 'Status', 'Start Date', 'Employee Name', 'Manager']
+EXTRA_GROUP_SIZE = 5
+FIRST_NAMES = ['Ann', 'Bob', 'Carla', 'Deepak', 'Elena', 'Farid', 'Grace', 'Hiro', 'Ines', 'Jonas', 'Kofi', 'Lena',
+               'Marta', 'Nikos', 'Olga', 'Pavel', 'Qing', 'Rosa', 'Sven', 'Tomasz', 'Uma', 'Victor', 'Wen', 'Yara']
+LAST_NAMES = ['Smith', 'Garcia', 'Nguyen', 'Müller', 'Kowalski', 'Okafor', 'Rossi', 'Tanaka', 'Silva', "O'Brien",
+              'Novak', 'Haddad', 'Johansson', 'Petrov', 'Chen', 'Dubois', 'Singh', 'van der Berg', 'Kim', 'Lopez']
+WORKFORCES = ['Warehouse', 'Office', 'Drivers', 'Contractors', 'IT']
+REQUEST_TYPES = ['New Hire', 'Transfer', 'Leaver', 'Role Change']
+STATUSES = ['Open', 'Waiting on Manager', 'Waiting on IT', 'Blocked', 'Ready']
+
+def headers(columns):
+    """(merged header row, column header row) for a sheet columns wide"""
+    merged = ['General Information'] + [None] * (MIN_COLUMNS - 1)
+    names = list(BASE_HEADERS)
+    for column in range(MIN_COLUMNS, columns):
+        offset = column - MIN_COLUMNS
+        merged.append(f"Process Step {offset // EXTRA_GROUP_SIZE + 1}" if offset % EXTRA_GROUP_SIZE == 0 else None)
+        names.append(f"Step {offset // EXTRA_GROUP_SIZE + 1}.{offset % EXTRA_GROUP_SIZE + 1}")
+    return merged, names
+
+def merge_ranges(columns):
+    """Excel ranges for the row-1 groups, e.g. A1:G1"""
+    from openpyxl.utils import get_column_letter
+
+    ranges = [f"A1:{get_column_letter(MIN_COLUMNS)}1"]
+    for start in range(MIN_COLUMNS, columns, EXTRA_GROUP_SIZE):
+        end = min(start + EXTRA_GROUP_SIZE, columns)
+        if end - start > 1:
+            ranges.append(f"{get_column_letter(start + 1)}1:{get_column_letter(end)}1")
+    return ranges
+
+def synthetic_rows(rows, columns, duplicate_names=0.3, duplicate_tickets=0.02, blank_rows=0.0, seed=1):
+    """Yield data rows as lists of cell values"""
+    rng = random.Random(seed)
+    names = []
+    tickets = []
+    start = datetime.date(2023, 1, 1)
+    for index in range(rows):
+        if blank_rows and rng.random() < blank_rows:
+            yield [None] * columns
+            continue
+        if names and rng.random() < duplicate_names:
+            name = rng.choice(names)
+        else:
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {len(names) + 1}"
+            names.append(name)
+        if tickets and rng.random() < duplicate_tickets:
+            ticket = rng.choice(tickets)
+        else:
+            ticket = f"T-{100000 + index}"
+            tickets.append(ticket)
+
+        row = [None] * columns
+        row[TICKET_COLUMN] = ticket
+        row[1] = rng.choice(WORKFORCES)
+        row[2] = rng.choice(REQUEST_TYPES)
+        row[3] = rng.choice(STATUSES)
+        row[4] = start + datetime.timedelta(days=rng.randrange(900))
+        row[EMPLOYEE_COLUMN] = name
+        row[6] = f"Manager {rng.randrange(1, 200)}"
+        for column in range(MIN_COLUMNS, columns):
+            row[column] = rng.choice(('Done', 'Pending', 'N/A', None))
+        yield row
+
+def write_workbook(path, rows, columns=MIN_COLUMNS, duplicate_names=0.3, duplicate_tickets=0.02, blank_rows=0.0,
+                   seed=1):
+    """Write a synthetic tracker to path in openpyxl write-only mode, so memory stays flat"""
+    from openpyxl import Workbook
+
+    columns = max(columns, MIN_COLUMNS)
+    workbook = Workbook(write_only=True)
+    # A second sheet, as in the real tracker, so sheet detection has something to skip
+    workbook.create_sheet('Completed').append(BASE_HEADERS)
+    sheet = workbook.create_sheet(SHEET_NAME)
+    for merge in merge_ranges(columns):
+        sheet.merged_cells.add(merge)
+    merged, names = headers(columns)
+    sheet.append(merged)
+    sheet.append(names)
+    for row in synthetic_rows(rows, columns, duplicate_names, duplicate_tickets, blank_rows, seed):
+        sheet.append(row)
+    workbook.save(path)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic 'in progress' tracker workbook")
+    parser.add_argument('--rows', type=int, default=1000, help="Data rows, not counting the two header rows")
+    parser.add_argument('--columns', type=int, default=MIN_COLUMNS, help=f"Columns (at least {MIN_COLUMNS})")
+    parser.add_argument('--duplicate-names', type=float, default=0.3,
+                        help="Chance a row reuses an earlier employee name")
+    parser.add_argument('--duplicate-tickets', type=float, default=0.02,
+                        help="Chance a row reuses an earlier ticket number")
+    parser.add_argument('--blank-rows', type=float, default=0.0, help="Chance a row is left blank")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', default='synthetic_tracker.xlsx')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    write_workbook(args.out, args.rows, args.columns, args.duplicate_names, args.duplicate_tickets,
+                   args.blank_rows, args.seed)
+    print(f"📄 Wrote {args.rows} rows x {max(args.columns, MIN_COLUMNS)} columns to {args.out} "
+          f"in {time.perf_counter() - started:.1f}s")
+
+if __name__ == '__main__':
+    main()
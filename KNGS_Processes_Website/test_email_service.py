@@ -6,7 +6,7 @@ import time
 
 def test_email_service():
     """Test the email service endpoints"""
-    base_url = "http://127.0.0.1:5000"
+    base_url = "http://127.0.0.1:5002"
     
     print("🧪 Testing Email Service...")
     print("=" * 50)
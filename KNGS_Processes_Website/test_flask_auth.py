@@ -4,7 +4,7 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from email_service_sync import GraphSync, init_graph
+from graph_engines import create_engine
 import configparser
 
 def test_flask_auth():
@@ -27,15 +27,15 @@ def test_flask_auth():
         print(f"   ✅ Tenant ID: {azure_settings['tenantId']}")
         print(f"   ✅ Scopes: {azure_settings['graphUserScopes']}")
         
-        # Step 2: Create GraphSync instance
-        print("\n2. Creating GraphSync instance...")
-        graph_client = GraphSync(azure_settings)
-        print("   ✅ GraphSync instance created")
+        # Step 2: Start the Graph engine
+        print("\n2. Starting threaded Graph engine...")
+        graph_engine = create_engine('threaded', azure_settings, max_workers=1)
+        print("   ✅ Graph engine started")
         
         # Step 3: Test token acquisition
         print("\n3. Testing token acquisition...")
         try:
-            token = graph_client.get_user_token()
+            token = graph_engine.call('get_user_token', timeout=180)['token']
             print("   ✅ Token acquired successfully")
             print(f"   📝 Token preview: {token[:50]}...")
         except Exception as e:
@@ -45,10 +45,10 @@ def test_flask_auth():
         # Step 4: Test user info retrieval
         print("\n4. Testing user info retrieval...")
         try:
-            user = graph_client.get_user()
+            user = graph_engine.call('get_user')
             print("   ✅ User info retrieved successfully")
-            print(f"   👤 Display Name: {user.display_name}")
-            print(f"   📧 Email: {user.mail or user.user_principal_name}")
+            print(f"   👤 Display Name: {user['displayName']}")
+            print(f"   📧 Email: {user['email']}")
         except Exception as e:
             print(f"   ❌ User info retrieval failed: {e}")
             print(f"   📝 Error type: {type(e).__name__}")
@@ -57,8 +57,8 @@ def test_flask_auth():
         # Step 5: Test email search
         print("\n5. Testing email search...")
         try:
-            messages = graph_client.search_emails_by_employee("test", 5)
-            email_count = len(messages.value) if messages and messages.value else 0
+            result = graph_engine.call('search_emails', employee_name="test", count=5)
+            email_count = len(result['emails'])
             print(f"   ✅ Email search completed successfully")
             print(f"   📧 Found {email_count} emails for 'test'")
         except Exception as e:
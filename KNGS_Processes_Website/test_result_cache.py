@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+
+from result_cache import MemoryTier, ResultCache, SQLiteTier
+
+def make_cache(path):
+    """One worker's cache: its own memory tier over the shared SQLite file"""
+    return ResultCache(MemoryTier(1024 * 1024), SQLiteTier(path, 1024 * 1024), ttl=300)
+
+def test_refresh_reaches_other_workers():
+    """A refresh in one worker replaces the copy another worker holds in memory"""
+    print("🧪 Testing refresh across two result caches...")
+
+    with tempfile.TemporaryDirectory() as state_dir:
+        path = os.path.join(state_dir, 'result_cache.sqlite3')
+        first = make_cache(path)
+        second = make_cache(path)
+
+        value, tier = first.get_or_compute('search:jane doe:25', lambda: {"emails": ["old"]})
+        assert tier is None, tier
+        value, tier = second.get_or_compute('search:jane doe:25', lambda: {"emails": ["unused"]})
+        assert (value, tier) == ({"emails": ["old"]}, 'shared'), (value, tier)
+        value, tier = second.get('search:jane doe:25')
+        assert tier == 'memory', tier
+        print("✅ Second worker holds the value in memory")
+
+        first.get_or_compute('search:jane doe:25', lambda: {"emails": ["new"]}, refresh=True)
+        value, tier = second.get('search:jane doe:25')
+        assert value == {"emails": ["new"]}, value
+        print(f"✅ Second worker sees the refreshed value (from {tier})")
+
+    return True
+
+if __name__ == "__main__":
+    test_refresh_reaches_other_workers()
@@ -8,7 +8,7 @@ def test_service_auth():
     print("🧪 Testing Flask Service Authentication")
     print("=" * 50)
     
-    base_url = "http://127.0.0.1:5000"
+    base_url = "http://127.0.0.1:5002"
     
     try:
         # Test 1: Health check
@@ -75,7 +75,7 @@ def test_service_auth():
         
     except requests.exceptions.ConnectionError:
         print("❌ Could not connect to Flask service")
-        print("   Make sure the service is running: python email_service_sync.py")
+        print("   Make sure the service is running: python email_service.py")
     except Exception as e:
         print(f"❌ Test failed: {e}")
         import traceback
@@ -5,10 +5,10 @@ import json
 import time
 
 def test_simple_service():
-    print("🧪 Testing Simple Email Service")
+    print("🧪 Testing Email Service (process engine)")
     print("=" * 50)
     
-    base_url = "http://127.0.0.1:5001"
+    base_url = "http://127.0.0.1:5002"
     
     try:
         # Test 1: Health check
@@ -91,15 +91,15 @@ def test_simple_service():
             print(f"   📝 Response: {response.text}")
         
         print("\n🎉 All service tests completed!")
-        print("✅ Simple email service is working properly")
+        print("✅ Email service is working properly")
         print("✅ No event loop issues encountered")
         
     except requests.exceptions.Timeout:
         print("❌ Request timed out - this may happen during authentication")
         print("   Try running the test again if authentication was successful")
     except requests.exceptions.ConnectionError:
-        print("❌ Could not connect to simple email service")
-        print("   Make sure the service is running: python email_service_simple.py")
+        print("❌ Could not connect to email service")
+        print("   Make sure the service is running: python email_service.py --engine process")
     except Exception as e:
         print(f"❌ Test failed: {e}")
         import traceback
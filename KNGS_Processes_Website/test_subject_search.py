@@ -5,7 +5,7 @@ import json
 
 def test_subject_search():
     """Test the subject line search functionality"""
-    base_url = "http://127.0.0.1:5000"
+    base_url = "http://127.0.0.1:5002"
     
     print("🧪 Testing Subject Line Email Search...")
     print("=" * 50)
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+
+import email_service
+from synthetic_workbook import write_workbook
+
+def load_workbook():
+    """Ingest a small synthetic tracker into the service's workbook store"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_workbook(os.path.join(directory, 'tracker.xlsx'), rows=50)
+        with open(path, 'rb') as f:
+            workbook, _ = email_service.workbook_store.ingest(f.read(), 'tracker.xlsx')
+    return workbook
+
+def test_workbook_rows_sort():
+    """Sorted pages work, and a bad sort column is rejected instead of ignored"""
+    print("🧪 Testing /api/workbooks/<id>/rows sort validation...")
+    workbook = load_workbook()
+    client = email_service.app.test_client()
+    url = f"/api/workbooks/{workbook.id}/rows"
+
+    response = client.get(f"{url}?sort=0&dir=desc&limit=10")
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['sort'] == 0
+    print("✅ sort=0 returns a sorted page")
+
+    for sort in ('abc', '1.5', '-1', str(len(workbook.headers))):
+        response = client.get(f"{url}?sort={sort}")
+        assert response.status_code == 400, (sort, response.status_code)
+        assert response.get_json()['error'] == "Invalid sort column"
+        print(f"✅ sort={sort} answers 400")
+
+    response = client.get(f"{url}?offset=abc")
+    assert response.status_code == 400, response.status_code
+    print("✅ offset=abc answers 400")
+    return True
+
+if __name__ == "__main__":
+    test_workbook_rows_sort()
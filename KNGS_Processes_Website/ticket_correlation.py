@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+
+"""Link synced messages to workbook rows by the ticket numbers they mention.
+
+Every ticket number in the sheet is compiled into one regular expression,
+factored as a trie (``T-10(?:01|02)`` rather than ``T-1001|T-1002``) so the
+regex engine does not try thousands of alternatives at each position. One
+pass over each message's subject and preview finds every ticket it mentions.
+The result is kept as a ticket -> message ids index that is rebuilt only
+when the workbook or the synced mailbox changes.
+"""
+
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Shorter ticket numbers match too much unrelated text to be useful
+MIN_TICKET_LENGTH = 3
+
+def trie_pattern(words):
+    """Regex source matching any of words, factored by common prefix"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        terminal = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        if len(branches) == 1 and not terminal:
+            return branches[0]
+        group = f"(?:{'|'.join(branches)})"
+        return group + '?' if terminal else group
+
+    return build(trie)
+
+class TicketMatcher:
+    """Finds the workbook's ticket numbers in free text"""
+
+    def __init__(self, ticket_numbers):
+        tickets = {t.casefold(): t for t in ticket_numbers if len(t) >= MIN_TICKET_LENGTH}
+        self.tickets = tickets
+        if tickets:
+            # Ticket numbers must stand alone: "T-100" must not match inside "T-1005"
+            self.pattern = re.compile(rf"(?<![\w-])(?:{trie_pattern(tickets)})(?![\w-])", re.IGNORECASE)
+        else:
+            self.pattern = None
+
+    def find(self, text):
+        """Ticket numbers (as written in the sheet) mentioned in text"""
+        if not text or self.pattern is None:
+            return set()
+        return {self.tickets[match.casefold()] for match in self.pattern.findall(text)}
+
+class TicketCorrelation:
+    """Precomputed ticket -> message ids index for one workbook and one version of the mailbox"""
+
+    def __init__(self, workbook, mail_store):
+        started = time.perf_counter()
+        self.workbook_id = workbook.id
+        self.mail_version = mail_store.version()
+        matcher = TicketMatcher(workbook.ticket_index.keys)
+        self.index = {}
+        scanned = 0
+        for message_id, subject, preview in mail_store.iter_messages():
+            scanned += 1
+            for ticket_number in matcher.find(subject) | matcher.find(preview):
+                self.index.setdefault(ticket_number, []).append(message_id)
+        self.messages_scanned = scanned
+        self.build_seconds = time.perf_counter() - started
+        logger.info(f"Correlated {scanned} messages with {len(matcher.tickets)} tickets: "
+                    f"{len(self.index)} tickets have mail ({self.build_seconds:.2f}s)")
+
+    @classmethod
+    def from_snapshot(cls, workbook, data):
+        """Rebuild from to_snapshot() output without rescanning the mailbox"""
+        correlation = cls.__new__(cls)
+        correlation.workbook_id = workbook.id
+        correlation.mail_version = data['mailVersion']
+        correlation.index = data['index']
+        correlation.messages_scanned = data['messagesScanned']
+        correlation.build_seconds = 0.0
+        return correlation
+
+    def to_snapshot(self):
+        return {"workbookId": self.workbook_id, "mailVersion": self.mail_version,
+                "messagesScanned": self.messages_scanned, "index": self.index}
+
+    def messages_for(self, ticket_number):
+        return self.index.get(str(ticket_number).strip(), [])
+
+    def summary(self):
+        return {
+            "workbookId": self.workbook_id,
+            "mailVersion": self.mail_version,
+            "messagesScanned": self.messages_scanned,
+            "ticketsWithMail": len(self.index),
+            "buildSeconds": self.build_seconds,
+            "tickets": {ticket: len(ids) for ticket, ids in self.index.items()}
+        }
+
+class CorrelationCache:
+    """Latest correlation for the current workbook, rebuilt when the mailbox has been synced since.
+
+    build is TicketCorrelation or any class with the same (workbook, mail_store)
+    constructor, mail_version attribute and snapshot methods, e.g.
+    name_matcher.NameAttribution.
+    """
+
+    def __init__(self, mail_store, build=TicketCorrelation):
+        self.mail_store = mail_store
+        self.build = build
+        self._correlations = {}
+        self._lock = threading.Lock()
+
+    def get(self, workbook):
+        with self._lock:
+            correlation = self._correlations.get(workbook.id)
+            if correlation is None or correlation.mail_version != self.mail_store.version():
+                correlation = self.build(workbook, self.mail_store)
+                self._correlations = {workbook.id: correlation}
+            return correlation
+
+    def snapshot(self):
+        with self._lock:
+            return [correlation.to_snapshot() for correlation in self._correlations.values()]
+
+    def restore(self, workbook, data):
+        """Adopt a saved correlation if the mailbox has not been synced since it was built"""
+        if data['workbookId'] != workbook.id or data['mailVersion'] != self.mail_store.version():
+            return False
+        with self._lock:
+            self._correlations = {workbook.id: self.build.from_snapshot(workbook, data)}
+        return True
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+
+"""Warm-start snapshot of the service's derived state.
+
+The token cache, the shared result cache, the parsed workbooks and the synced
+mailbox are already on disk. What a restart loses is what was derived from
+them in memory: which workbooks were open, their sort orders, the ticket and
+name indexes over the mailbox, and the in-process caches. The Snapshotter
+writes those to ``<stateDir>/snapshot/`` on a timer and on graceful shutdown,
+and the next start loads them instead of rebuilding:
+
+* ``manifest.json``  - format version, open workbooks, correlation indexes
+* ``<workbook>.sort<column><dir>.npy`` - sort permutations, opened with
+                       ``mmap_mode='r'``; the rows themselves are reopened
+                       from the workbook cache, also memory-mapped
+* ``<cache>.bin``, ``<cache>.offsets.npy``, ``<cache>.keys.json`` - memory
+                       cache entries as JSON blobs, read through mmap
+
+Each snapshot is written to a new directory and then published by
+atomically replacing the ``CURRENT`` pointer, so a crash mid-write leaves the
+previous snapshot in place. Every gunicorn worker restores from the same
+directory, but only one writes to it: the worker holding ``writer.lock``. The
+others skip their writes and take over the lock when the writer exits, so no
+worker prunes a snapshot another is still writing and ``CURRENT`` does not
+flip between the workers' states. Anything that no longer matches (another format
+version, a workbook missing from the cache, a mailbox synced since) is
+skipped and rebuilt on demand as before.
+
+```ini
+[snapshot]
+enabled = true
+intervalSeconds = 300
+```
+"""
+
+import json
+import logging
+import mmap
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+from result_cache import SCHEMA_VERSION
+from shared_auth import read_json, try_file_lock, write_json_atomic
+from workbook_diff import diff_workbooks
+
+logger = logging.getLogger(__name__)
+
+# Bump when the snapshot layout changes; older snapshots are then ignored
+SNAPSHOT_VERSION = 1
+CURRENT_FILE = 'CURRENT'
+MANIFEST_FILE = 'manifest.json'
+WRITER_LOCK_FILE = 'writer.lock'
+# Published snapshots kept; older directories are removed after each write
+KEEP_SNAPSHOTS = 2
+
+def write_blobs(directory, name, entries):
+    """Save (key, version, expires_at, value) entries as one blob file plus an offsets array"""
+    keys = []
+    versions = []
+    expires = []
+    offsets = [0]
+    with open(os.path.join(directory, f"{name}.bin"), 'wb') as f:
+        for key, version, expires_at, value in entries:
+            payload = json.dumps(value).encode('utf-8')
+            f.write(payload)
+            keys.append(key)
+            versions.append(version)
+            expires.append(expires_at)
+            offsets.append(offsets[-1] + len(payload))
+    with open(os.path.join(directory, f"{name}.keys.json"), 'w') as f:
+        json.dump({"keys": keys, "versions": versions}, f)
+    np.save(os.path.join(directory, f"{name}.offsets.npy"), np.asarray(offsets, dtype=np.int64))
+    np.save(os.path.join(directory, f"{name}.expires.npy"), np.asarray(expires, dtype=np.float64))
+
+def read_blobs(directory, name):
+    """Yield (key, version, expires_at, value, size) saved by write_blobs"""
+    with open(os.path.join(directory, f"{name}.keys.json")) as f:
+        index = json.load(f)
+    if not index['keys']:
+        return
+    offsets = np.load(os.path.join(directory, f"{name}.offsets.npy"), mmap_mode='r')
+    expires = np.load(os.path.join(directory, f"{name}.expires.npy"), mmap_mode='r')
+    with open(os.path.join(directory, f"{name}.bin"), 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as blob:
+        for position, key in enumerate(index['keys']):
+            start, end = int(offsets[position]), int(offsets[position + 1])
+            yield key, index['versions'][position], float(expires[position]), json.loads(blob[start:end]), end - start
+
+class Snapshotter:
+    """Writes and restores warm-start snapshots for one worker's state"""
+
+    def __init__(self, directory, workbook_store, result_cache, body_cache, correlations, attributions,
+                 interval=300):
+        self.directory = directory
+        self.workbook_store = workbook_store
+        self.result_cache = result_cache
+        self.body_cache = body_cache
+        self.correlations = correlations
+        self.attributions = attributions
+        self.interval = interval
+        self._write_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._last_fingerprint = None
+        self._writer_lock = None
+        self.last_written = None
+        self.last_write_seconds = None
+        self.writes = 0
+        self.skipped = 0
+        self.not_writer = 0
+        self.restored = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='snapshot', daemon=True)
+        self._thread.start()
+
+    def stop(self, write=True):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        if write:
+            self.write()
+        if self._writer_lock is not None:
+            self._writer_lock.close()
+            self._writer_lock = None
+
+    def is_writer(self):
+        """True when this process writes the snapshots; the first to ask after the writer exits takes over"""
+        if self._writer_lock is None:
+            self._writer_lock = try_file_lock(os.path.join(self.directory, WRITER_LOCK_FILE))
+        return self._writer_lock is not None
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.write()
+            except Exception as e:
+                logger.warning(f"Could not write snapshot: {e}")
+
+    def _fingerprint(self):
+        """Cheap summary of the state; an unchanged fingerprint skips the write"""
+        workbooks = [(w['id'], w['uploadedAt']) for w in self.workbook_store.list()]
+        sorts = []
+        for workbook_id, _ in workbooks:
+            workbook = self.workbook_store.get(workbook_id)
+            sorts.append(sorted(workbook.row_view.permutations()) if workbook else None)
+        memory = self.result_cache.memory.describe()
+        bodies = self.body_cache.stats()
+        return (workbooks, sorts, [c['mailVersion'] for c in self.correlations.snapshot()],
+                [a['mailVersion'] for a in self.attributions.snapshot()],
+                memory['entries'], memory['bytes'], bodies['entries'], bodies['bytes'])
+
+    def write(self):
+        """Write a snapshot unless nothing changed since the last one; returns its directory or None"""
+        if self.workbook_store.cache is None:
+            return None  # ids are random without the workbook cache and could not be reopened
+        with self._write_lock:
+            if not self.is_writer():
+                self.not_writer += 1
+                return None
+            fingerprint = self._fingerprint()
+            if fingerprint == self._last_fingerprint:
+                self.skipped += 1
+                return None
+            started = time.perf_counter()
+            name = f"{time.time_ns():x}-{os.getpid()}"
+            directory = os.path.join(self.directory, name)
+            os.makedirs(directory)
+            try:
+                manifest = self._write_into(directory)
+                with open(os.path.join(directory, MANIFEST_FILE), 'w') as f:
+                    json.dump(manifest, f)
+                write_json_atomic(os.path.join(self.directory, CURRENT_FILE), {"snapshot": name})
+            except Exception:
+                shutil.rmtree(directory, ignore_errors=True)
+                raise
+            self._prune(name)
+            self._last_fingerprint = fingerprint
+            self.last_written = time.time()
+            self.last_write_seconds = time.perf_counter() - started
+            self.writes += 1
+            logger.info(f"Wrote snapshot {name} ({self.last_write_seconds:.2f}s)")
+            return directory
+
+    def _write_into(self, directory):
+        workbooks = []
+        # Oldest first, so restoring in order reproduces the same latest workbook
+        for summary in reversed(self.workbook_store.list()):
+            workbook = self.workbook_store.get(summary['id'])
+            if workbook is None:
+                continue
+            sorts = []
+            for (column, direction), permutation in workbook.row_view.permutations().items():
+                np.save(os.path.join(directory, f"{workbook.id}.sort{column}{direction}.npy"), permutation)
+                sorts.append([column, direction])
+            workbooks.append({
+                "id": workbook.id,
+                "filename": workbook.filename,
+                "uploadedAt": workbook.uploaded_at,
+                "previousId": workbook.diff.old_id if workbook.diff else None,
+                "sorts": sorts
+            })
+
+        now = time.time()
+        write_blobs(directory, 'results', [entry[:4] for entry in self.result_cache.memory.entries()
+                                           if entry[2] > now])
+        write_blobs(directory, 'bodies', [entry[:4] for entry in self.body_cache.memory.entries()])
+        return {
+            "version": SNAPSHOT_VERSION,
+            "cacheSchema": SCHEMA_VERSION,
+            "written": now,
+            "pid": os.getpid(),
+            "workbooks": workbooks,
+            "correlations": self.correlations.snapshot(),
+            "attributions": self.attributions.snapshot()
+        }
+
+    def _prune(self, current):
+        """Remove all but the newest KEEP_SNAPSHOTS directories"""
+        names = sorted((n for n in os.listdir(self.directory)
+                        if os.path.isdir(os.path.join(self.directory, n)) and n != current), reverse=True)
+        for name in names[KEEP_SNAPSHOTS - 1:]:
+            shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+    def restore(self):
+        """Load the current snapshot, if any; returns counts of what was restored"""
+        started = time.perf_counter()
+        pointer = read_json(os.path.join(self.directory, CURRENT_FILE))
+        if not pointer:
+            return {}
+        directory = os.path.join(self.directory, pointer['snapshot'])
+        manifest = read_json(os.path.join(directory, MANIFEST_FILE))
+        if not manifest or manifest.get('version') != SNAPSHOT_VERSION:
+            logger.info(f"Ignoring snapshot {pointer['snapshot']}: format version does not match")
+            return {}
+
+        restored = {"snapshot": pointer['snapshot'], "workbooks": 0, "sortOrders": 0, "correlations": 0,
+                    "cacheEntries": 0, "messageBodies": 0}
+        try:
+            self._restore_workbooks(directory, manifest, restored)
+            if manifest.get('cacheSchema') == SCHEMA_VERSION:
+                now = time.time()
+                for key, version, expires_at, value, size in read_blobs(directory, 'results'):
+                    if expires_at > now:
+                        self.result_cache.memory.put(key, version, expires_at, value, size)
+                        restored['cacheEntries'] += 1
+                for key, version, expires_at, value, size in read_blobs(directory, 'bodies'):
+                    self.body_cache.memory.put(key, version, expires_at, value, size)
+                    restored['messageBodies'] += 1
+        except (OSError, ValueError, KeyError) as e:
+            # A damaged snapshot only costs the warm start
+            logger.warning(f"Snapshot {pointer['snapshot']} only partly restored: {e}")
+        restored['seconds'] = time.perf_counter() - started
+        self.restored = restored
+        # Nothing new to write until the state moves on from what was just loaded
+        self._last_fingerprint = self._fingerprint()
+        logger.info(f"Restored snapshot: {restored}")
+        return restored
+
+    def _restore_workbooks(self, directory, manifest, restored):
+        loaded = {}
+        for saved in manifest['workbooks']:
+            workbook = self.workbook_store.cache.load(saved['id'])
+            if workbook is None:
+                continue
+            workbook.filename = saved['filename']
+            workbook.uploaded_at = saved['uploadedAt']
+            previous = loaded.get(saved['previousId'])
+            if previous is not None:
+                workbook.diff = diff_workbooks(previous, workbook)
+            for column, direction in saved['sorts']:
+                path = os.path.join(directory, f"{workbook.id}.sort{column}{direction}.npy")
+                workbook.row_view.preload(column, direction, np.load(path, mmap_mode='r'))
+                restored['sortOrders'] += 1
+            loaded[workbook.id] = self.workbook_store.add(workbook)
+            restored['workbooks'] += 1
+
+        for cache, entries in ((self.correlations, manifest['correlations']),
+                               (self.attributions, manifest['attributions'])):
+            for data in entries:
+                workbook = loaded.get(data['workbookId'])
+                if workbook is not None and cache.restore(workbook, data):
+                    restored['correlations'] += 1
+
+    def stats(self):
+        return {
+            "directory": self.directory,
+            "intervalSeconds": self.interval,
+            "lastWritten": self.last_written,
+            "lastWriteSeconds": self.last_write_seconds,
+            "writes": self.writes,
+            "skippedUnchanged": self.skipped,
+            "writer": self._writer_lock is not None,
+            "skippedNotWriter": self.not_writer,
+            "restored": self.restored
+        }
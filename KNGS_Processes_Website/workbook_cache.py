@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+
+"""Content-addressed, columnar on-disk cache of parsed workbooks.
+
+HR re-uploads the same tracker many times a day. Uploads are identified by
+the SHA-256 of their bytes, and the first parse of each one is written to
+``<stateDir>/workbooks/<hash>/`` column by column:
+
+* ``meta.json``        - sheet name, headers, row count, format version
+* ``col<N>.codes.npy`` - one dictionary code per row, the smallest unsigned
+                         dtype that fits; opened with ``mmap_mode='r'``
+* ``col<N>.dict.json`` - the column's distinct cell values, loaded when the
+                         workbook is opened
+* ``employees.json`` and ``<name|ticket>.{keys.json,offsets.npy,rows.npy}``
+                       - the lookup indexes, so they are not rebuilt either
+
+``<stateDir>/workbooks/LATEST`` names the most recent upload, so every worker
+process agrees on which workbook "latest" means.
+
+A repeat upload, or a worker that never saw the upload, opens the mapped
+files instead of re-parsing the workbook. Resident memory is then the
+distinct values plus whichever pages of the code arrays have been touched,
+rather than one Python object per cell.
+
+An opened workbook reads nothing from its directory after opening:
+the dictionaries are in memory and the mapped arrays stay readable after
+their files are unlinked. So pruning an entry never breaks a workbook a worker still holds.
+Entries are pruned least recently used first, and every use refreshes the
+entry's mtime.
+"""
+
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+
+import numpy as np
+
+from shared_auth import read_json, write_json_atomic
+from workbook_store import RowIndex, Workbook
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk layout changes; older entries are then re-parsed
+FORMAT_VERSION = 1
+META_FILE = 'meta.json'
+LATEST_FILE = 'LATEST'
+DIGEST_PATTERN = re.compile(r'[0-9a-f]{64}')
+# Refresh an entry's mtime at most this often while it is being served from memory
+TOUCH_INTERVAL = 60
+
+def encode_column(values):
+    """Dictionary-encode a column into (codes, distinct values)"""
+    lookup = {}
+    dictionary = []
+    codes = []
+    for value in values:
+        # 1, 1.0 and True are equal dict keys; keep them as distinct values
+        key = (value.__class__, value)
+        code = lookup.get(key)
+        if code is None:
+            code = lookup[key] = len(dictionary)
+            dictionary.append(value)
+        codes.append(code)
+    dtype = np.min_scalar_type(max(len(dictionary) - 1, 0))
+    return np.asarray(codes, dtype=dtype), dictionary
+
+def save_row_index(directory, name, index: RowIndex):
+    with open(os.path.join(directory, f"{name}.keys.json"), 'w') as f:
+        json.dump(index.keys, f)
+    np.save(os.path.join(directory, f"{name}.offsets.npy"), np.asarray(index.offsets, dtype=np.int64))
+    np.save(os.path.join(directory, f"{name}.rows.npy"), np.asarray(index.row_ids, dtype=np.int64))
+
+def load_row_index(directory, name):
+    with open(os.path.join(directory, f"{name}.keys.json")) as f:
+        keys = json.load(f)
+    return RowIndex(keys,
+                    np.load(os.path.join(directory, f"{name}.offsets.npy"), mmap_mode='r'),
+                    np.load(os.path.join(directory, f"{name}.rows.npy"), mmap_mode='r'))
+
+class ColumnarRows:
+    """Read-only sequence of rows backed by memory-mapped dictionary codes"""
+
+    def __init__(self, directory, width, length):
+        self.directory = directory
+        self.width = width
+        self.length = length
+        self._codes = [np.load(self._path(c, 'codes.npy'), mmap_mode='r') for c in range(width)]
+        # Loaded now rather than on first read, so the entry can be pruned while this workbook is in use
+        self._dictionaries = [self._load_dictionary(c) for c in range(width)]
+
+    def _path(self, column, suffix):
+        return os.path.join(self.directory, f"col{column}.{suffix}")
+
+    def _load_dictionary(self, column):
+        with open(self._path(column, 'dict.json')) as f:
+            return np.array(json.load(f), dtype=object)
+
+    def dictionary(self, column):
+        return self._dictionaries[column]
+
+    def codes(self, column):
+        """The column's per-row dictionary codes (memory-mapped)"""
+        return self._codes[column]
+
+    def column(self, index):
+        """Every value of one column as a list"""
+        return self.dictionary(index)[self._codes[index]].tolist()
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.length))]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError(index)
+        return [self.dictionary(c)[self._codes[c][index]] for c in range(self.width)]
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def tolist(self):
+        columns = [self.column(c) for c in range(self.width)]
+        return [list(row) for row in zip(*columns)]
+
+class WorkbookCache:
+    """Parsed workbooks on disk, keyed by the hash of the uploaded bytes"""
+
+    def __init__(self, directory, max_entries=20):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._touched = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def _entry_dir(self, digest):
+        return os.path.join(self.directory, digest)
+
+    def load(self, digest):
+        """Open a cached workbook, or return None if it was never stored"""
+        if not DIGEST_PATTERN.fullmatch(digest):
+            return None
+        directory = self._entry_dir(digest)
+        try:
+            with open(os.path.join(directory, META_FILE)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('format') != FORMAT_VERSION:
+            return None
+
+        rows = ColumnarRows(directory, meta['width'], meta['rowCount'])
+        with open(os.path.join(directory, 'employees.json')) as f:
+            employees = json.load(f)
+        indexes = (employees, load_row_index(directory, 'name'), load_row_index(directory, 'ticket'))
+        self.touch(digest, force=True)
+        return Workbook(digest, meta['filename'], meta['sheetName'], meta['mergedHeaders'], meta['headers'],
+                        rows, indexes)
+
+    def store(self, workbook: Workbook):
+        """Write a freshly parsed workbook and switch it over to the mapped columns"""
+        width = len(workbook.headers)
+        tmp_dir = f"{self._entry_dir(workbook.id)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        os.makedirs(tmp_dir)
+        try:
+            for column in range(width):
+                codes, dictionary = encode_column(row[column] for row in workbook.rows)
+                np.save(os.path.join(tmp_dir, f"col{column}.codes.npy"), codes)
+                with open(os.path.join(tmp_dir, f"col{column}.dict.json"), 'w') as f:
+                    json.dump(dictionary, f)
+            with open(os.path.join(tmp_dir, 'employees.json'), 'w') as f:
+                json.dump(workbook.employees, f)
+            save_row_index(tmp_dir, 'name', workbook.name_index)
+            save_row_index(tmp_dir, 'ticket', workbook.ticket_index)
+            with open(os.path.join(tmp_dir, META_FILE), 'w') as f:
+                json.dump({
+                    'format': FORMAT_VERSION,
+                    'filename': workbook.filename,
+                    'sheetName': workbook.sheet_name,
+                    'mergedHeaders': workbook.merged_headers,
+                    'headers': workbook.headers,
+                    'width': width,
+                    'rowCount': len(workbook.rows),
+                    'storedAt': time.time()
+                }, f)
+            try:
+                os.rename(tmp_dir, self._entry_dir(workbook.id))
+            except OSError:
+                # Another worker stored the same upload first
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        self._prune()
+        # Swap the parsed lists for the mapped columns; the indexes stay valid
+        workbook.rows = ColumnarRows(self._entry_dir(workbook.id), width, len(workbook.rows))
+        return workbook
+
+    def touch(self, digest, force=False):
+        """Mark an entry as recently used, so pruning removes it last"""
+        now = time.time()
+        if not force and now - self._touched.get(digest, 0) < TOUCH_INTERVAL:
+            return
+        self._touched[digest] = now
+        try:
+            os.utime(self._entry_dir(digest))
+        except OSError:
+            pass  # not stored, or pruned by another worker
+
+    def set_latest(self, workbook: Workbook):
+        """Record workbook as the most recent upload, for every worker process"""
+        write_json_atomic(os.path.join(self.directory, LATEST_FILE),
+                          {"id": workbook.id, "filename": workbook.filename, "uploadedAt": workbook.uploaded_at})
+
+    def latest(self):
+        """{"id", "filename", "uploadedAt"} of the most recent upload, or None"""
+        return read_json(os.path.join(self.directory, LATEST_FILE))
+
+    def _prune(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if os.path.isdir(path) and not name.endswith('.tmp'):
+                entries.append((os.path.getmtime(path), path))
+        entries.sort(reverse=True)
+        for _, path in entries[self.max_entries:]:
+            logger.info(f"Pruning cached workbook {os.path.basename(path)}")
+            shutil.rmtree(path, ignore_errors=True)
+
+def create_workbook_cache(config, state_dir):
+    """Build the cache from the [workbooks] section of config.cfg, or None if disabled"""
+    if not config.getboolean('workbooks', 'cache', fallback=True):
+        return None
+    directory = config.get('workbooks', 'cacheDir', fallback=os.path.join(state_dir, 'workbooks'))
+    return WorkbookCache(directory, config.getint('workbooks', 'cacheMaxEntries', fallback=20))
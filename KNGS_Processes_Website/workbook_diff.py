@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+"""Diff two versions of the "in progress" sheet by ticket number.
+
+Rows are matched on column A. A ticket is *added* or *removed* when it only
+appears in one version and *changed* when its rows differ. The employees on
+any of those tickets, in either version, are the ones whose cached email
+results can no longer be trusted; everyone else keeps theirs. Rows without a
+ticket number cannot be matched and are ignored.
+"""
+
+from employee_search import normalize_name
+from workbook_store import EMPLOYEE_COLUMN, Workbook
+
+# Ticket lists in an upload response are cut to this many entries
+SUMMARY_LIMIT = 50
+
+def all_rows(workbook: Workbook):
+    return workbook.rows.tolist() if hasattr(workbook.rows, 'tolist') else workbook.rows
+
+class WorkbookDiff:
+    def __init__(self, old_id, new_id, added, removed, changed, unchanged, changed_employees):
+        self.old_id = old_id
+        self.new_id = new_id
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+        self.unchanged = unchanged
+        # normalized name -> display name
+        self.changed_employees = changed_employees
+
+    def to_dict(self, limit=None):
+        def cut(tickets):
+            return tickets if limit is None else tickets[:limit]
+        return {
+            "previousId": self.old_id,
+            "workbookId": self.new_id,
+            "added": cut(self.added),
+            "removed": cut(self.removed),
+            "changed": cut(self.changed),
+            "counts": {
+                "added": len(self.added),
+                "removed": len(self.removed),
+                "changed": len(self.changed),
+                "unchanged": self.unchanged,
+                "changedEmployees": len(self.changed_employees)
+            },
+            "changedEmployees": cut(sorted(self.changed_employees.values()))
+        }
+
+def diff_workbooks(old: Workbook, new: Workbook):
+    if old.id == new.id:
+        # Same id, same content (ids are content hashes with the workbook cache)
+        return WorkbookDiff(old.id, new.id, [], [], [], len(new.ticket_index), {})
+    old_rows = all_rows(old)
+    new_rows = all_rows(new)
+    added, removed, changed = [], [], []
+    unchanged = 0
+    changed_employees = {}
+
+    def note_employees(rows, row_ids):
+        for index in row_ids:
+            name = str(rows[index][EMPLOYEE_COLUMN]).strip()
+            if name:
+                changed_employees.setdefault(normalize_name(name), name)
+
+    for ticket_number, new_ids in new.ticket_index.items():
+        old_ids = old.ticket_index.get(ticket_number, None)
+        if old_ids is None:
+            added.append(ticket_number)
+            note_employees(new_rows, new_ids)
+        elif [old_rows[i] for i in old_ids] != [new_rows[i] for i in new_ids]:
+            changed.append(ticket_number)
+            note_employees(old_rows, old_ids)
+            note_employees(new_rows, new_ids)
+        else:
+            unchanged += 1
+
+    for ticket_number, old_ids in old.ticket_index.items():
+        if ticket_number not in new.ticket_index:
+            removed.append(ticket_number)
+            note_employees(old_rows, old_ids)
+
+    return WorkbookDiff(old.id, new.id, added, removed, changed, unchanged, changed_employees)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+"""Paged, filtered and sorted access to a workbook's rows.
+
+The Data View used to download every row and filter and sort them in the
+renderer on each keystroke. It now asks for one page at a time:
+
+    GET /api/workbooks/<id>/rows?offset=0&limit=100&sort=3&dir=desc&q=smith
+
+Everything here works on dictionary codes (see workbook_cache.py): a column
+is a small list of distinct values plus one integer code per row. So
+
+* sorting ranks the distinct values once, with numbers before text and
+  blanks last, then stable-argsorts the per-row ranks; the permutation is
+  cached per column and direction
+* filtering tests q against each column's distinct values, not every cell,
+  and ORs the matching codes into a row mask
+* the last few (q, sort, dir) orderings are kept, so paging through one
+  result does not repeat either step
+"""
+
+import collections
+import threading
+
+import numpy as np
+
+from workbook_cache import encode_column
+
+ASCENDING = 'asc'
+DESCENDING = 'desc'
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# (q, sort, dir) orderings kept for paging
+MAX_CACHED_ORDERINGS = 8
+
+def sort_key(value):
+    """Numbers (and text that parses as one) first in numeric order, then text ignoring case, then blanks"""
+    if isinstance(value, bool):
+        return (1, 0.0, str(value).casefold())
+    if isinstance(value, (int, float)):
+        return (0, float(value), '')
+    text = str(value).strip()
+    if not text:
+        return (2, 0.0, '')
+    try:
+        number = float(text)
+    except ValueError:
+        return (1, 0.0, text.casefold())
+    if number != number:  # 'nan' is text to a person reading the sheet
+        return (1, 0.0, text.casefold())
+    return (0, number, '')
+
+def value_text(value):
+    """A cell as the Data View shows and searches it"""
+    return '' if value is None else str(value).casefold()
+
+class RowView:
+    """Sort permutations and filter masks for one workbook, built on first use"""
+
+    def __init__(self, workbook):
+        self.workbook = workbook
+        self.length = len(workbook.rows)
+        self.width = len(workbook.headers)
+        self._columns = {}
+        self._permutations = {}
+        self._orderings = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def _encoded(self, column):
+        """(codes, distinct values) for column"""
+        encoded = self._columns.get(column)
+        if encoded is None:
+            rows = self.workbook.rows
+            if hasattr(rows, 'codes'):
+                encoded = (rows.codes(column), list(rows.dictionary(column)))
+            else:
+                encoded = encode_column(self.workbook.column(column))
+            self._columns[column] = encoded
+        return encoded
+
+    def _permutation(self, column, direction):
+        key = (column, direction)
+        permutation = self._permutations.get(key)
+        if permutation is None:
+            codes, values = self._encoded(column)
+            keys = [sort_key(value) for value in values]
+            order = sorted(range(len(values)), key=keys.__getitem__)
+            ranks = np.empty(len(values), dtype=np.int64)
+            ranks[order] = np.arange(len(values))
+            if direction == DESCENDING:
+                # Reverse the non-blank values only; blanks stay at the bottom
+                filled = sum(1 for k in keys if k[0] != 2)
+                ranks = np.where(ranks < filled, filled - 1 - ranks, ranks)
+            permutation = np.argsort(ranks[codes], kind='stable')
+            self._permutations[key] = permutation
+        return permutation
+
+    def permutations(self):
+        """Sort permutations built so far, by (column, direction)"""
+        with self._lock:
+            return dict(self._permutations)
+
+    def preload(self, column, direction, permutation):
+        """Use a permutation saved by a previous run, e.g. a memory-mapped array"""
+        if len(permutation) == self.length:
+            with self._lock:
+                self._permutations.setdefault((column, direction), permutation)
+
+    def _mask(self, query):
+        """Rows with at least one cell containing query, ignoring case"""
+        mask = np.zeros(self.length, dtype=bool)
+        for column in range(self.width):
+            codes, values = self._encoded(column)
+            hits = np.fromiter((query in value_text(value) for value in values), dtype=bool, count=len(values))
+            if hits.any():
+                mask |= hits[codes]
+        return mask
+
+    def ordering(self, query='', sort=None, direction=ASCENDING):
+        """Row indexes matching query in display order"""
+        query = query.strip().casefold()
+        key = (query, sort, direction)
+        with self._lock:
+            ordering = self._orderings.get(key)
+            if ordering is not None:
+                self._orderings.move_to_end(key)
+                return ordering
+            ordering = self._permutation(sort, direction) if sort is not None else np.arange(self.length)
+            if query:
+                ordering = ordering[self._mask(query)[ordering]]
+            self._orderings[key] = ordering
+            while len(self._orderings) > MAX_CACHED_ORDERINGS:
+                self._orderings.popitem(last=False)
+            return ordering
+
+    def page(self, offset=0, limit=DEFAULT_PAGE_SIZE, query='', sort=None, direction=ASCENDING):
+        ordering = self.ordering(query, sort, direction)
+        indexes = ordering[offset:offset + limit].tolist()
+        return {
+            "total": self.length,
+            "filtered": len(ordering),
+            "rows": [{"rowIndex": index + 1, "cells": self.workbook.rows[index]} for index in indexes]
+        }
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+
+"""Server-side ingestion of the HR tracker workbook.
+
+The workbook is parsed with openpyxl in read-only mode, which streams the
+sheet XML row by row instead of building the whole workbook in memory. Only
+the "in progress" sheet is read. Parsed sheets are kept in a WorkbookStore and
+the UI refers to them by id.
+
+Sheet layout (same rules as the original in-renderer parser in FileUpload.js):
+
+* row 1 - merged group headers ("General Information", ...); a merged value
+          sits in the first column of its merge and the rest are empty
+* row 2 - column headers ("Ticket #", "Workforce", ...)
+* rows 3+ - data, ticket number in column A and employee name in column F
+"""
+
+import copy
+import datetime
+import hashlib
+import io
+import logging
+import threading
+import time
+import uuid
+
+from employee_search import EmployeeSuggester, normalize_name
+
+logger = logging.getLogger(__name__)
+
+TICKET_COLUMN = 0    # Column A
+EMPLOYEE_COLUMN = 5  # Column F
+# The UI always shows at least columns A-G
+MIN_COLUMNS = 7
+
+class WorkbookError(Exception):
+    """Raised when an upload is not a usable tracker workbook"""
+
+def find_in_progress_sheet(sheet_names):
+    for name in sheet_names:
+        lowered = name.lower()
+        if 'in progress' in lowered or 'inprogress' in lowered:
+            return name
+    return None
+
+def cell_value(value):
+    """Convert a cell to the JSON value SheetJS would have produced"""
+    if value is None:
+        return ''
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        # SheetJS returns Excel serial numbers for dates and DataView formats them
+        from openpyxl.utils.datetime import to_excel
+        return to_excel(value)
+    if isinstance(value, datetime.time):
+        return value.isoformat()
+    return value
+
+def is_blank(value):
+    return value == '' or (isinstance(value, str) and not value.strip())
+
+def header_groups(merged_headers):
+    """Spans of the row-1 group headers, each running until the next non-empty cell"""
+    groups = []
+    for index, title in enumerate(merged_headers):
+        if not is_blank(title):
+            if groups:
+                groups[-1]['end'] = index - 1
+            groups.append({"title": str(title), "start": index, "end": index})
+    if groups:
+        groups[-1]['end'] = len(merged_headers) - 1
+    return groups
+
+class RowIndex:
+    """Row ids grouped by key, stored flat so it can be saved as arrays.
+
+    The rows for keys[i] are row_ids[offsets[i]:offsets[i + 1]]; offsets and
+    row_ids may be lists or (memory-mapped) NumPy arrays.
+    """
+
+    def __init__(self, keys, offsets, row_ids):
+        self.keys = keys
+        self.offsets = offsets
+        self.row_ids = row_ids
+        self._positions = {key: position for position, key in enumerate(keys)}
+
+    @classmethod
+    def from_groups(cls, groups):
+        """Build from a dict of key -> list of row ids"""
+        offsets = [0]
+        row_ids = []
+        for rows in groups.values():
+            row_ids.extend(rows)
+            offsets.append(len(row_ids))
+        return cls(list(groups), offsets, row_ids)
+
+    def get(self, key, default=()):
+        position = self._positions.get(key)
+        if position is None:
+            return default
+        rows = self.row_ids[self.offsets[position]:self.offsets[position + 1]]
+        return rows.tolist() if hasattr(rows, 'tolist') else rows
+
+    def __contains__(self, key):
+        return key in self._positions
+
+    def __len__(self):
+        return len(self.keys)
+
+    def items(self):
+        for key in self.keys:
+            yield key, self.get(key)
+
+class Workbook:
+    """A parsed "in progress" sheet.
+
+    Employee names and ticket numbers are indexed once at ingestion, so
+    looking up an employee's rows or suggesting names does not scan the sheet.
+    rows is a list of lists, or the memory-mapped ColumnarRows from
+    workbook_cache.py; both support len(), indexing and column().
+    """
+
+    def __init__(self, workbook_id, filename, sheet_name, merged_headers, headers, rows, indexes=None):
+        self.id = workbook_id
+        self.filename = filename
+        self.sheet_name = sheet_name
+        self.merged_headers = merged_headers
+        self.headers = headers
+        self.rows = rows
+        self.uploaded_at = time.time()
+        # (employees, normalized name -> row ids, ticket number -> row ids);
+        # the workbook cache passes them in rather than rebuilding them
+        self.employees, self.name_index, self.ticket_index = indexes or self._build_indexes()
+        # WorkbookDiff against the workbook uploaded before this one, if any
+        self.diff = None
+        self._suggester = None
+        self._suggester_lock = threading.Lock()
+        self._row_view = None
+        self._row_view_lock = threading.Lock()
+
+    def reuploaded(self, filename, uploaded_at=None):
+        """A copy for a new upload of the same bytes; the rows and indexes are shared, the diff is not.
+
+        Requests still reading this workbook keep seeing it unchanged.
+        """
+        workbook = copy.copy(self)
+        workbook.filename = filename
+        workbook.uploaded_at = uploaded_at or time.time()
+        workbook.diff = None
+        return workbook
+
+    def column(self, index):
+        if hasattr(self.rows, 'column'):
+            return self.rows.column(index)
+        return [row[index] for row in self.rows]
+
+    def _build_indexes(self):
+        """Index every row and collect unique employees (first occurrence wins) with their first ticket"""
+        employees = []
+        listed = set()
+        names = {}
+        tickets = {}
+        columns = zip(self.column(TICKET_COLUMN), self.column(EMPLOYEE_COLUMN))
+        for index, (ticket_value, name_value) in enumerate(columns):
+            ticket_number = str(ticket_value).strip()
+            name = str(name_value).strip()
+            if ticket_number:
+                tickets.setdefault(ticket_number, []).append(index)
+            if not name:
+                continue
+            key = normalize_name(name)
+            names.setdefault(key, []).append(index)
+            if ticket_number and key not in listed:
+                listed.add(key)
+                employees.append({"name": name, "ticketNumber": ticket_number, "rowIndex": index + 2})
+        return employees, RowIndex.from_groups(names), RowIndex.from_groups(tickets)
+
+    @property
+    def suggester(self):
+        """Autocomplete index, built on first use so cached workbooks open quickly"""
+        if self._suggester is None:
+            with self._suggester_lock:
+                if self._suggester is None:
+                    self._suggester = EmployeeSuggester(self.employees)
+        return self._suggester
+
+    @property
+    def row_view(self):
+        """Sorted and filtered pages of rows for the Data View, see workbook_rows.py"""
+        if self._row_view is None:
+            with self._row_view_lock:
+                if self._row_view is None:
+                    from workbook_rows import RowView
+                    self._row_view = RowView(self)
+        return self._row_view
+
+    def _records(self, indexes):
+        return [{"ticketNumber": self.rows[index][TICKET_COLUMN], "fullRow": self.rows[index], "rowIndex": index + 1}
+                for index in indexes]
+
+    def employee_records(self, name):
+        """Rows whose employee column matches name, ignoring case and extra whitespace"""
+        return self._records(self.name_index.get(normalize_name(name), ()))
+
+    def ticket_records(self, ticket_number):
+        return self._records(self.ticket_index.get(str(ticket_number).strip(), ()))
+
+    def summary(self):
+        return {
+            "id": self.id,
+            "filename": self.filename,
+            "sheetName": self.sheet_name,
+            "headers": self.headers,
+            "mergedHeaders": self.merged_headers,
+            "headerGroups": header_groups(self.merged_headers),
+            "rowCount": len(self.rows),
+            "employeeCount": len(self.employees),
+            "ticketCount": len(self.ticket_index),
+            "uploadedAt": self.uploaded_at
+        }
+
+    def to_dict(self):
+        rows = self.rows.tolist() if hasattr(self.rows, 'tolist') else self.rows
+        return dict(self.summary(), rows=rows)
+
+def detect_range(value_rows):
+    """Trim and pad rows of cell values to the sheet's real data range.
+
+    Tracks the last non-blank column instead of trusting the sheet dimensions,
+    and only materialises blank rows that have data after them. Returns the
+    rows, every one padded or cut to the same width.
+    """
+    rows = []
+    pending_blank_rows = 0
+    last_column = -1
+    for values in value_rows:
+        last = len(values) - 1
+        while last >= 0 and is_blank(values[last]):
+            last -= 1
+        if last < 0:
+            pending_blank_rows += 1
+            continue
+        if pending_blank_rows:
+            rows.extend([] for _ in range(pending_blank_rows))
+            pending_blank_rows = 0
+        last_column = max(last_column, last)
+        rows.append(values)
+
+    width = max(last_column + 1, MIN_COLUMNS)
+    for values in rows:
+        if len(values) < width:
+            values.extend([''] * (width - len(values)))
+        elif len(values) > width:
+            del values[width:]
+    return rows
+
+def sheet_values(sheet):
+    """Each row of a read-only worksheet as a list of JSON cell values"""
+    for row in sheet.iter_rows(values_only=True):
+        yield [cell_value(value) for value in row]
+
+def open_in_progress_sheet(source):
+    """(openpyxl workbook, sheet name) for an .xlsx file or file-like object; close the workbook when done"""
+    from openpyxl import load_workbook  # slow to import; only needed once a workbook arrives
+
+    try:
+        workbook = load_workbook(source, read_only=True, data_only=True)
+    except Exception as e:
+        raise WorkbookError(f"Could not open workbook: {e}")
+    sheet_name = find_in_progress_sheet(workbook.sheetnames)
+    if sheet_name is None:
+        workbook.close()
+        raise WorkbookError(f"No \"in progress\" sheet found. Available sheets: {', '.join(workbook.sheetnames)}")
+    return workbook, sheet_name
+
+def parse_workbook(source, filename=None, workbook_id=None):
+    """Stream the "in progress" sheet out of an .xlsx file or file-like object"""
+    workbook, sheet_name = open_in_progress_sheet(source)
+    try:
+        rows = detect_range(sheet_values(workbook[sheet_name]))
+    finally:
+        workbook.close()
+
+    if len(rows) <= 2:
+        raise WorkbookError('The "in progress" sheet appears to be empty or contains no data.')
+
+    return Workbook(workbook_id or uuid.uuid4().hex, filename, sheet_name, rows[0], rows[1], rows[2:])
+
+class WorkbookStore:
+    """Parsed workbooks by id. Keeps the most recent uploads only.
+
+    With a WorkbookCache (workbook_cache.py) ids are content hashes, repeat
+    uploads skip parsing, and workbooks evicted here or uploaded to another
+    worker process are reopened from disk.
+    """
+
+    def __init__(self, max_workbooks=5, cache=None):
+        self.max_workbooks = max_workbooks
+        self.cache = cache
+        self._workbooks = {}
+        self._lock = threading.Lock()
+
+    def ingest(self, data, filename):
+        """Parse uploaded bytes, reusing an earlier parse of the same bytes.
+
+        Returns (workbook, tier) where tier is 'memory', 'disk' or None when parsed.
+        """
+        if self.cache is None:
+            return self.add(parse_workbook(io.BytesIO(data), filename)), None
+
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            workbook = self._workbooks.get(digest)
+        tier = 'memory'
+        if workbook is not None:
+            self.cache.touch(digest, force=True)
+        else:
+            workbook, tier = self.cache.load(digest), 'disk'
+        if workbook is None:
+            workbook, tier = self.cache.store(parse_workbook(io.BytesIO(data), filename, digest)), None
+        workbook = self.add(workbook.reuploaded(filename))
+        self.cache.set_latest(workbook)
+        return workbook, tier
+
+    def add(self, workbook: Workbook):
+        with self._lock:
+            self._workbooks[workbook.id] = workbook
+            while len(self._workbooks) > self.max_workbooks:
+                oldest = min(self._workbooks.values(), key=lambda w: w.uploaded_at)
+                del self._workbooks[oldest.id]
+        logger.info(f"Stored workbook {workbook.id}: {len(workbook.rows)} rows, {len(workbook.employees)} employees")
+        return workbook
+
+    def get(self, workbook_id):
+        with self._lock:
+            workbook = self._workbooks.get(workbook_id)
+        if self.cache is not None:
+            if workbook is not None:
+                self.cache.touch(workbook_id)
+            else:
+                workbook = self.cache.load(workbook_id)
+                if workbook is not None:
+                    self.add(workbook)
+        return workbook
+
+    def latest(self):
+        """The most recent upload. With the cache that is the one any worker saw last, not just this one."""
+        with self._lock:
+            local = max(self._workbooks.values(), key=lambda w: w.uploaded_at) if self._workbooks else None
+        if self.cache is None:
+            return local
+        pointer = self.cache.latest()
+        if pointer is None or (local is not None and local.uploaded_at >= pointer['uploadedAt']):
+            if local is not None:
+                self.cache.touch(local.id)
+            return local
+        # Uploaded to another worker since: open it from the cache
+        with self._lock:
+            workbook = self._workbooks.get(pointer['id'])
+        if workbook is None:
+            workbook = self.cache.load(pointer['id'])
+        if workbook is None:
+            return local  # pruned from the cache in the meantime
+        return self.add(workbook.reuploaded(pointer['filename'], pointer['uploadedAt']))
+
+    def list(self):
+        with self._lock:
+            workbooks = sorted(self._workbooks.values(), key=lambda w: w.uploaded_at, reverse=True)
+        return [workbook.summary() for workbook in workbooks]
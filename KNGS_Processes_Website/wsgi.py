@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+
+"""WSGI entry point for production serving: gunicorn -c gunicorn.conf.py wsgi:app
+
+Importing this module pulls in Flask, and import_heavy_modules() the
+Microsoft Graph SDK, which the service otherwise loads lazily. With
+preload_app enabled the gunicorn master does that once and every worker
+shares the imported modules copy-on-write. The Graph engine owns threads and
+event loops, which do not survive fork(), so each worker starts its own engine
+in the post_fork hook of gunicorn.conf.py.
+"""
+
+import email_service
+
+email_service.init_config()
+email_service.import_heavy_modules()
+app = email_service.app